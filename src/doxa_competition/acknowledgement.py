@@ -0,0 +1,147 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
+
+import pulsar
+
+CompletionCallback = Callable[[Optional[Exception]], None]
+
+
+@dataclass
+class AcknowledgementPolicy:
+    """Determines when and how the competition runner acknowledges Pulsar messages.
+
+    Attributes:
+        after_processing (bool): Whether to acknowledge messages only once they have
+            been handled successfully (negatively acknowledging them on failure so that
+            they are redelivered) rather than as soon as they are received.
+        window (float): The time in seconds for which acknowledgements are collected
+            before being sent together. Acknowledgements are sent immediately if 0.
+        cumulative (bool): Whether to acknowledge all messages on a topic up to the
+            latest handled message in one go when a window ends. This requires an
+            exclusive or failover subscription and events to be handled one at a time.
+    """
+
+    after_processing: bool = False
+    window: float = 0.0
+    cumulative: bool = False
+
+
+ACK_ON_RECEIVE = AcknowledgementPolicy()
+ACK_AFTER_PROCESSING = AcknowledgementPolicy(after_processing=True)
+
+
+class Acknowledger:
+    """Acknowledges messages received by a consumer according to an acknowledgement policy."""
+
+    policy: AcknowledgementPolicy
+    _consumer: pulsar.Consumer
+    _pending: Dict[str, List[pulsar.Message]]
+    _unresolved: Dict[str, Set[bytes]]
+
+    def __init__(
+        self, consumer: pulsar.Consumer, policy: AcknowledgementPolicy
+    ) -> None:
+        self.policy = policy
+        self._consumer = consumer
+        self._pending = {}
+        self._unresolved = {}
+
+    def acknowledge(self, message: pulsar.Message) -> None:
+        """Acknowledges a message, either immediately or at the end of the current window.
+
+        Args:
+            message (pulsar.Message): The message to acknowledge.
+        """
+
+        topic = message.topic_name()
+        self._unresolved.get(topic, set()).discard(message.message_id().serialize())
+
+        if self.policy.window > 0:
+            self._pending.setdefault(topic, []).append(message)
+        elif self.policy.cumulative and not self._unresolved.get(topic):
+            self._consumer.acknowledge_cumulative(message)
+        else:
+            self._consumer.acknowledge(message)
+
+    def negative_acknowledge(self, message: pulsar.Message) -> None:
+        """Negatively acknowledges a message so that it is redelivered.
+
+        Until the message has been handled successfully, messages on the same topic
+        are acknowledged individually, since a cumulative acknowledgement would
+        otherwise cover it as well.
+
+        Args:
+            message (pulsar.Message): The message to negatively acknowledge.
+        """
+
+        if self.policy.cumulative:
+            self._unresolved.setdefault(message.topic_name(), set()).add(
+                message.message_id().serialize()
+            )
+
+        self._consumer.negative_acknowledge(message)
+
+    def track(self, messages: List[pulsar.Message]) -> Optional[CompletionCallback]:
+        """Returns a callback to be called once the given messages have been handled,
+        if messages are acknowledged after processing.
+
+        Args:
+            messages (List[pulsar.Message]): The messages being handled.
+
+        Returns:
+            Optional[CompletionCallback]: The completion callback, if required.
+        """
+
+        if not self.policy.after_processing:
+            return None
+
+        def complete(error: Optional[Exception]) -> None:
+            for message in messages:
+                if error is None:
+                    self.acknowledge(message)
+                else:
+                    self.negative_acknowledge(message)
+
+        return complete
+
+    def _send(
+        self, cumulative: List[pulsar.Message], individual: List[pulsar.Message]
+    ) -> None:
+        for message in cumulative:
+            self._consumer.acknowledge_cumulative(message)
+
+        for message in individual:
+            self._consumer.acknowledge(message)
+
+    async def flush(self) -> None:
+        """Sends any acknowledgements collected during the current window."""
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+
+        cumulative = []
+        individual = []
+        for topic, messages in pending.items():
+            if self.policy.cumulative and not self._unresolved.get(topic):
+                cumulative.append(messages[-1])
+            else:
+                individual.extend(messages)
+
+        # acknowledging blocks until the broker has received the acknowledgement
+        await asyncio.get_event_loop().run_in_executor(
+            None, self._send, cumulative, individual
+        )
+
+    async def run(self) -> None:
+        """Periodically sends collected acknowledgements until cancelled."""
+
+        while True:
+            await asyncio.sleep(self.policy.window)
+
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[ERROR] Unable to acknowledge messages: {str(e)}")
@@ -0,0 +1,17 @@
+import click
+
+from doxa_competition.service import run
+from doxa_competition.worker import serve
+
+
+@click.group()
+def cli():
+    """The DOXA Competition Framework command line interface."""
+
+
+cli.add_command(run)
+cli.add_command(serve)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+@dataclass
+class ReadCachePolicy:
+    """Determines how long the results of reads from Umpire are reused for.
+
+    Attributes:
+        ttl (float): The time in seconds for which a result is reused.
+        max_size (int): The maximum number of results kept, after which the least
+            recently used results are evicted.
+    """
+
+    ttl: float = 1.0
+    max_size: int = 1024
+
+
+class RequestCoalescer:
+    """Coalesces identical concurrent requests, so that callers requesting the same
+    key while a request is in flight share its result rather than making their own.
+
+    Results may also be cached for a short time, in which case they are evicted in
+    least recently used order once the cache is full. Failures are never cached.
+
+    Results are shared between callers and should not be modified.
+    """
+
+    cache: Optional[ReadCachePolicy]
+    _in_flight: Dict[Hashable, asyncio.Future]
+    _results: "OrderedDict[Hashable, Tuple[Any, float]]"
+
+    def __init__(self, cache: Optional[ReadCachePolicy] = None) -> None:
+        """Creates a new request coalescer.
+
+        Args:
+            cache (Optional[ReadCachePolicy], optional): How results are cached,
+                if at all. Defaults to None.
+        """
+
+        self.cache = cache
+        self._in_flight = {}
+        self._results = OrderedDict()
+
+    def _get_cached(self, key: Hashable) -> Tuple[bool, Any]:
+        if key not in self._results:
+            return False, None
+
+        result, expires_at = self._results[key]
+        if time.monotonic() >= expires_at:
+            del self._results[key]
+            return False, None
+
+        self._results.move_to_end(key)
+        return True, result
+
+    def _store(self, key: Hashable, result: Any) -> None:
+        if self.cache is None or self.cache.ttl <= 0:
+            return
+
+        self._results[key] = (result, time.monotonic() + self.cache.ttl)
+        self._results.move_to_end(key)
+
+        while len(self._results) > self.cache.max_size:
+            self._results.popitem(last=False)
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the result for a key, sharing an in-flight request or a cached
+        result where possible.
+
+        Args:
+            key (Hashable): The key identifying the request.
+            fetch (Callable[[], Awaitable[Any]]): Makes the request.
+
+        Returns:
+            Any: The result.
+        """
+
+        hit, result = self._get_cached(key)
+        if hit:
+            return result
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self._in_flight[key] = asyncio.ensure_future(
+                self._fetch(key, fetch)
+            )
+
+        # a caller being cancelled must not cancel the request for everyone else
+        return await asyncio.shield(future)
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        task = asyncio.current_task()
+
+        try:
+            result = await fetch()
+        finally:
+            # the key is no longer ours if it was invalidated in the meantime
+            invalidated = self._in_flight.get(key) is not task
+            if not invalidated:
+                del self._in_flight[key]
+
+        if not invalidated:
+            self._store(key, result)
+
+        return result
+
+    def invalidate(self, key: Hashable) -> None:
+        """Discards the cached result for a key, e.g. after a write.
+
+        Callers already waiting on a request in flight still receive its result,
+        but later callers make a new request, as it may have been made before the write.
+
+        Args:
+            key (Hashable): The key.
+        """
+
+        self._results.pop(key, None)
+        self._in_flight.pop(key, None)
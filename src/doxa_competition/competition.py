@@ -1,7 +1,12 @@
-from typing import List
+from typing import Callable, Hashable, List, Optional
 
 from doxa_competition.context import CompetitionContext
-from doxa_competition.event.handler import EventHandler, Extension
+from doxa_competition.event import Event
+from doxa_competition.event.handler import (
+    EventHandler,
+    Extension,
+    PartitionKeyFunction,
+)
 from doxa_competition.event.handlers import AgentEventHandler, EvaluationEventHandler
 from doxa_competition.event.router import EventRouter
 
@@ -54,5 +59,66 @@ class Competition:
             handler.set_context(context)
 
             routes = handler.extract_routes()
+            partition_keys = handler.extract_partition_keys()
             for topic, topic_handler in routes.items():
-                router.add_route(f"competition-{tag}-{topic}", topic_handler)
+                router.add_route(
+                    f"competition-{tag}-{topic}",
+                    flush_results_after(context, topic_handler),
+                    partition_key=scope_partition_key(tag, partition_keys.get(topic)),
+                )
+
+            batch_routes = handler.extract_batch_routes()
+            for topic, batch_topic_handler in batch_routes.items():
+                router.add_batch_route(
+                    f"competition-{tag}-{topic}",
+                    flush_results_after(context, batch_topic_handler),
+                )
+
+
+def scope_partition_key(
+    tag: str, partition_key: Optional[PartitionKeyFunction]
+) -> Optional[PartitionKeyFunction]:
+    """Scopes a partition key function to a competition, so that keys
+    (e.g. enrolment IDs) from different competitions never collide.
+
+    Args:
+        tag (str): The competition tag.
+        partition_key (Optional[PartitionKeyFunction]): The partition key function.
+
+    Returns:
+        Optional[PartitionKeyFunction]: The scoped partition key function.
+    """
+
+    if partition_key is None:
+        return None
+
+    def scoped_partition_key(event: Event) -> Optional[Hashable]:
+        key = partition_key(event)
+        return (tag, key) if key is not None else None
+
+    return scoped_partition_key
+
+
+def flush_results_after(context: CompetitionContext, handler: Callable) -> Callable:
+    """Wraps a topic handler so that any agent results it buffered are
+    written to Umpire once it has finished.
+
+    If these writes fail, they stay buffered and are retried later, so the
+    handler still succeeds (and its events are acknowledged). Otherwise, its
+    events would be redelivered and their additions applied twice.
+
+    Args:
+        context (CompetitionContext): The competition context.
+        handler (Callable): The topic handler or batch topic handler.
+
+    Returns:
+        Callable: The wrapped handler.
+    """
+
+    async def handle(events):
+        try:
+            await handler(events)
+        finally:
+            await context.try_flush_results()
+
+    return handle
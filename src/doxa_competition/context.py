@@ -1,14 +1,17 @@
+import asyncio
 import json
 from dataclasses import dataclass
-from typing import List
+from typing import Awaitable, Callable, Hashable, Iterable, List, Optional, Union
 
 import pulsar
 from grpclib.client import Channel
 
 from doxa_competition.proto.umpire.agent import (
     AddToAgentResultRequest,
+    AddToAgentResultsRequest,
     GetAgentResultsRequest,
     SetAgentResultRequest,
+    SetAgentResultsRequest,
     UmpireAgentServiceStub,
 )
 from doxa_competition.proto.umpire.evaluation import (
@@ -19,12 +22,41 @@ from doxa_competition.proto.umpire.evaluation import (
 from doxa_competition.proto.umpire.scheduling import (
     EvaluationSubmission,
     ScheduleEvaluationBatchRequest,
+    ScheduleEvaluationBatchResponse,
     UmpireSchedulingServiceStub,
 )
 from doxa_competition.proto.umpire.scoreboard import (
     GetCompetitionResultsRequest,
     UmpireScoreboardServiceStub,
 )
+from doxa_competition.coalescing import ReadCachePolicy, RequestCoalescer
+from doxa_competition.evaluation_results import (
+    DEFAULT_PAGE_SIZE,
+    EvaluationResultCursor,
+    decode_resume_token,
+)
+from doxa_competition.leaderboard import Leaderboard
+from doxa_competition.producers import (
+    ProducerPool,
+    PublishTracker,
+    log_publish_error,
+)
+from doxa_competition.result_table import EvaluationResultTable
+from doxa_competition.results import (
+    AgentResultUpdate,
+    ResultBuffer,
+    ResultBufferPolicy,
+)
+from doxa_competition.scheduling import (
+    LANE_DEFAULT,
+    PriorityPolicy,
+    PriorityScheduler,
+    ScheduledEvaluations,
+    SchedulingCoalescer,
+    SchedulingPolicy,
+)
+from doxa_competition.scoreboard import ScoreboardCache
+from doxa_competition.umpire import UmpireClient
 from doxa_competition.utils import send_pulsar_message
 
 
@@ -37,36 +69,147 @@ class SchedulableEvaluation:
 class CompetitionContext:
     competition_tag: str
     _pulsar_client: pulsar.Client
-    _umpire_channel: Channel
+    _umpire: UmpireClient
+    _producer_pool: Optional[ProducerPool] = None
+    _owns_producer_pool: bool = False
+    _publish_tracker: Optional[PublishTracker] = None
+    _result_buffer: Optional[ResultBuffer] = None
+    _scoreboard_cache: Optional[ScoreboardCache] = None
+    _scheduling_coalescer: Optional[SchedulingCoalescer] = None
+    _priority_scheduler: Optional[PriorityScheduler] = None
+    _read_coalescer: Optional[RequestCoalescer] = None
 
     def __init__(
         self,
         competition_tag: str,
         pulsar_client: pulsar.Client,
-        umpire_channel: Channel,
+        umpire: Union[UmpireClient, Channel],
+        producer_pool: Optional[ProducerPool] = None,
+        result_buffering: Optional[ResultBufferPolicy] = None,
+        scoreboard_ttl: Optional[float] = None,
+        scheduling: Optional[SchedulingPolicy] = None,
+        read_cache: Optional[ReadCachePolicy] = None,
+        priority_scheduling: Optional[PriorityPolicy] = None,
     ) -> None:
         self.competition_tag = competition_tag
         self._pulsar_client = pulsar_client
-        self._umpire_channel = umpire_channel
+        self._umpire = UmpireClient.wrap(umpire)
+        self._producer_pool = producer_pool
+        self._read_coalescer = RequestCoalescer(cache=read_cache)
+
+        if result_buffering is not None:
+            self._result_buffer = ResultBuffer(
+                self._send_agent_results,
+                self._send_agent_additions,
+                policy=result_buffering,
+            )
+
+        if scoreboard_ttl is not None:
+            self._scoreboard_cache = ScoreboardCache(
+                self._fetch_competition_results, ttl=scoreboard_ttl
+            )
+
+        if scheduling is not None:
+            self._scheduling_coalescer = SchedulingCoalescer(
+                self._submit_evaluations, policy=scheduling
+            )
+
+        if priority_scheduling is not None:
+            self._priority_scheduler = PriorityScheduler(
+                self._submit_evaluations, policy=priority_scheduling
+            )
+
+    def _send_pulsar_message(
+        self, topic: str, body: dict, properties: dict, partition_key: str = None
+    ) -> None:
+        """Sends a Pulsar message, reusing a pooled producer if a producer pool is available.
+
+        If the pool batches messages, the message is sent asynchronously (and published
+        by the next flush at the latest) rather than blocking the event loop until its
+        batch is published.
+
+        Args:
+            topic (str): The full topic name.
+            body (dict): The JSON message to be encoded.
+            properties (dict): Any additional message properties.
+            partition_key (str, optional): The message key. Defaults to None.
+        """
+
+        if self._producer_pool is not None:
+            if self._producer_pool.batching is not None:
+                self._get_publish_tracker().track(
+                    self._producer_pool.send_async(
+                        topic,
+                        body,
+                        properties if properties is not None else {},
+                        partition_key=partition_key,
+                    )
+                ).add_done_callback(log_publish_error)
+                return
 
-    def emit_event(self, topic: str, body: dict, properties: dict = None) -> None:
+            self._producer_pool.send(topic, body, properties, partition_key)
+            return
+
+        send_pulsar_message(
+            client=self._pulsar_client,
+            topic=topic,
+            body=body,
+            properties=properties,
+            partition_key=partition_key,
+        )
+
+    def _get_producer_pool(self) -> ProducerPool:
+        """Returns the producer pool, creating one owned by the context if none was provided.
+
+        Returns:
+            ProducerPool: The producer pool.
+        """
+
+        if self._producer_pool is None:
+            self._producer_pool = ProducerPool(self._pulsar_client)
+            self._owns_producer_pool = True
+
+        return self._producer_pool
+
+    def _get_publish_tracker(self) -> PublishTracker:
+        if self._publish_tracker is None:
+            self._publish_tracker = PublishTracker()
+
+        return self._publish_tracker
+
+    def emit_event(
+        self,
+        topic: str,
+        body: dict,
+        properties: dict = None,
+        partition_key: str = None,
+    ) -> None:
         """Sends a Pulsar message.
 
+        If the producer pool batches messages, the message is sent asynchronously, so
+        any failure is logged rather than raised (or raised by `flush` if still pending).
+
         Args:
             topic (str): The topic.
             body (dict): The message body to be JSON-encoded.
             properties (dict, optional): Any additional optional properties. Defaults to None.
+            partition_key (str, optional): The message key (e.g. an enrolment ID), used to route
+                related messages to the same competition runner process. Defaults to None.
         """
 
-        send_pulsar_message(
-            client=self._pulsar_client,
+        self._send_pulsar_message(
             topic=f"persistent://public/default/{topic}",
             body=body,
             properties=properties,
+            partition_key=partition_key,
         )
 
     def emit_competition_event(
-        self, topic_name: str, body: dict, properties: dict = None
+        self,
+        topic_name: str,
+        body: dict,
+        properties: dict = None,
+        partition_key: str = None,
     ) -> None:
         """Emits a competition event.
 
@@ -74,71 +217,416 @@ class CompetitionContext:
             topic_name (str): The competition topic name.
             body (dict): The message body to be JSON-encoded.
             properties (dict, optional): Any additional optional properties. Defaults to None.
+            partition_key (str, optional): The message key (e.g. an enrolment ID), used to route
+                related messages to the same competition runner process. Defaults to None.
         """
 
-        send_pulsar_message(
-            client=self._pulsar_client,
+        self._send_pulsar_message(
             topic=f"persistent://public/default/competition-{self.competition_tag}-{topic_name}",
             body=body,
             properties=properties if properties is not None else {},
+            partition_key=partition_key,
+        )
+
+    def emit_event_async(
+        self,
+        topic: str,
+        body: dict,
+        properties: dict = None,
+        partition_key: str = None,
+    ) -> asyncio.Future:
+        """Sends a Pulsar message without waiting for it to be published.
+
+        Args:
+            topic (str): The topic.
+            body (dict): The message body to be JSON-encoded.
+            properties (dict, optional): Any additional optional properties. Defaults to None.
+            partition_key (str, optional): The message key (e.g. an enrolment ID), used to route
+                related messages to the same competition runner process. Defaults to None.
+
+        Returns:
+            asyncio.Future: Resolves to the message ID once the message has been published,
+                or fails with a PublishError.
+        """
+
+        return self._get_publish_tracker().track(
+            self._get_producer_pool().send_async(
+                f"persistent://public/default/{topic}",
+                body,
+                properties if properties is not None else {},
+                partition_key=partition_key,
+            )
         )
 
-    async def schedule_evaluation(self, agent_ids: List[int], metadata: dict = None):
+    def emit_competition_event_async(
+        self,
+        topic_name: str,
+        body: dict,
+        properties: dict = None,
+        partition_key: str = None,
+    ) -> asyncio.Future:
+        """Emits a competition event without waiting for it to be published.
+
+        Args:
+            topic_name (str): The competition topic name.
+            body (dict): The message body to be JSON-encoded.
+            properties (dict, optional): Any additional optional properties. Defaults to None.
+            partition_key (str, optional): The message key (e.g. an enrolment ID), used to route
+                related messages to the same competition runner process. Defaults to None.
+
+        Returns:
+            asyncio.Future: Resolves to the message ID once the message has been published,
+                or fails with a PublishError.
+        """
+
+        return self.emit_event_async(
+            f"competition-{self.competition_tag}-{topic_name}",
+            body,
+            properties,
+            partition_key=partition_key,
+        )
+
+    async def flush_results(self) -> None:
+        """Writes any buffered agent results to Umpire."""
+
+        if self._result_buffer is not None:
+            await self._result_buffer.flush()
+
+    async def try_flush_results(self) -> bool:
+        """Writes any buffered agent results to Umpire, leaving them buffered
+        to be retried later (rather than raising an error) if this fails.
+
+        Returns:
+            bool: Whether the results were written.
+        """
+
+        if self._result_buffer is None:
+            return True
+
+        return await self._result_buffer.try_flush()
+
+    async def flush(self) -> None:
+        """Writes any buffered agent results and waits for every event
+        emitted asynchronously to be published.
+
+        Raises:
+            PublishError: Raised if any of these events could not be published.
+        """
+
+        await self.flush_results()
+
+        if self._publish_tracker is None or not self._publish_tracker.pending():
+            return
+
+        # publish batched messages straight away rather than waiting for the batching delay
+        if self._producer_pool is not None:
+            await asyncio.get_event_loop().run_in_executor(
+                None, self._producer_pool.flush
+            )
+
+        await self._publish_tracker.wait()
+
+    async def schedule_evaluation(
+        self, agent_ids: List[int], metadata: dict = None, lane: str = LANE_DEFAULT
+    ):
         return await self.schedule_evaluation_batch(
-            [SchedulableEvaluation(agent_ids, metadata if metadata is not None else {})]
+            [
+                SchedulableEvaluation(
+                    agent_ids, metadata if metadata is not None else {}
+                )
+            ],
+            lane=lane,
         )
 
-    async def schedule_evaluation_batch(self, evaluations: List[SchedulableEvaluation]):
-        return await UmpireSchedulingServiceStub(
-            self._umpire_channel
-        ).schedule_evaluation_batch(
+    async def schedule_evaluation_batch(
+        self, evaluations: List[SchedulableEvaluation], lane: str = LANE_DEFAULT
+    ):
+        """Schedules a batch of evaluations.
+
+        Args:
+            evaluations (List[SchedulableEvaluation]): The evaluations.
+            lane (str, optional): The priority lane in which the evaluations are queued,
+                if priority scheduling is enabled (e.g. "activation" for new agents or
+                "background" for large sweeps). Defaults to "default".
+
+        Returns:
+            Union[ScheduleEvaluationBatchResponse, ScheduledEvaluations]: The response to the
+                batch request, or every batch in which the evaluations were submitted if they
+                were coalesced or queued (which both have a `batch_id`, for the first batch).
+        """
+
+        submissions = [
+            EvaluationSubmission(evaluation.agent_ids, json.dumps(evaluation.metadata))
+            for evaluation in evaluations
+        ]
+
+        if self._priority_scheduler is not None:
+            return await self._priority_scheduler.schedule(submissions, lane)
+
+        if self._scheduling_coalescer is not None:
+            return await self._scheduling_coalescer.schedule(submissions)
+
+        return await self._submit_evaluations(submissions)
+
+    async def _submit_evaluations(self, submissions: List[EvaluationSubmission]):
+        return await self._umpire.call(
+            UmpireSchedulingServiceStub,
+            "schedule_evaluation_batch",
             ScheduleEvaluationBatchRequest(
                 competition_tag=self.competition_tag,
-                evaluations=[
-                    EvaluationSubmission(
-                        evaluation.agent_ids, json.dumps(evaluation.metadata)
-                    )
-                    for evaluation in evaluations
-                ],
-            )
+                evaluations=submissions,
+            ),
         )
 
     async def get_competition_results(self):
-        return await UmpireScoreboardServiceStub(
-            self._umpire_channel
-        ).get_competition_results(GetCompetitionResultsRequest(self.competition_tag))
+        if self._scoreboard_cache is not None:
+            return await self._scoreboard_cache.get()
+
+        return await self._coalesce(
+            ("competition_results",), self._fetch_competition_results
+        )
+
+    async def _fetch_competition_results(self):
+        if self._result_buffer is not None:
+            await self._result_buffer.wait_for_flush()
+
+        response = await self._umpire.call(
+            UmpireScoreboardServiceStub,
+            "get_competition_results",
+            GetCompetitionResultsRequest(self.competition_tag),
+        )
+
+        # buffered results would otherwise be missing from the scoreboard, and are
+        # applied rather than flushed so that reads do not defeat the batching
+        if self._result_buffer is not None:
+            response = self._result_buffer.apply_to_scoreboard(response)
+
+        return response
+
+    async def get_leaderboard(self, metric: str) -> Leaderboard:
+        """Returns a leaderboard ranking the agents in the competition by a metric.
+
+        If the scoreboard is cached, the leaderboard is kept up to date as results are
+        written through the context, so it can be reused across events.
+
+        Args:
+            metric (str): The metric by which agents are ranked.
+
+        Returns:
+            Leaderboard: The leaderboard.
+        """
+
+        if self._scoreboard_cache is not None:
+            return await self._scoreboard_cache.get_leaderboard(metric)
+
+        return Leaderboard.from_scoreboard(
+            (await self.get_competition_results()).scoreboard, metric
+        )
 
     async def get_agent_results(self, agent_id: int):
-        return (
-            await UmpireAgentServiceStub(self._umpire_channel).get_agent_results(
-                GetAgentResultsRequest(agent_id)
+        return await self._coalesce(
+            ("agent_results", agent_id), lambda: self._fetch_agent_results(agent_id)
+        )
+
+    async def _fetch_agent_results(self, agent_id: int):
+        if self._result_buffer is not None:
+            await self._result_buffer.wait_for_flush()
+
+        results = (
+            await self._umpire.call(
+                UmpireAgentServiceStub,
+                "get_agent_results",
+                GetAgentResultsRequest(agent_id),
             )
         ).results
 
+        # buffered results would otherwise be missing
+        if self._result_buffer is not None:
+            results = self._result_buffer.apply_to_agent_results(agent_id, results)
+
+        return results
+
+    async def _coalesce(self, key: Hashable, fetch: Callable[[], Awaitable]):
+        """Makes a read request, sharing the result with identical concurrent requests.
+
+        Args:
+            key (Hashable): The key identifying the request.
+            fetch (Callable[[], Awaitable]): Makes the request.
+        """
+
+        if self._read_coalescer is None:
+            return await fetch()
+
+        return await self._read_coalescer.get(key, fetch)
+
+    def _invalidate_reads(self, agent_ids: Iterable[int]) -> None:
+        """Ensures that reads made after agent results are written are not served
+        from requests made before."""
+
+        if self._read_coalescer is None:
+            return
+
+        self._read_coalescer.invalidate(("competition_results",))
+        for agent_id in set(agent_ids):
+            self._read_coalescer.invalidate(("agent_results", agent_id))
+
     async def set_agent_result(self, agent_id: int, metric: str, result: int):
-        return await UmpireAgentServiceStub(self._umpire_channel).set_agent_result(
-            SetAgentResultRequest(agent_id, metric, result)
+        if self._result_buffer is not None:
+            response = await self._result_buffer.set(agent_id, metric, result)
+        else:
+            response = await self._umpire.call(
+                UmpireAgentServiceStub,
+                "set_agent_result",
+                SetAgentResultRequest(agent_id, metric, result),
+            )
+
+        if self._scoreboard_cache is not None:
+            self._scoreboard_cache.set_result(agent_id, metric, result)
+
+        self._invalidate_reads([agent_id])
+
+        return response
+
+    async def set_agent_results(self, results: List[AgentResultUpdate]):
+        # batch writes must go through the buffer too, or an older buffered write
+        # to the same result would be flushed after them and overwrite them
+        if self._result_buffer is not None:
+            response = await self._result_buffer.set_many(results)
+        else:
+            response = await self._send_agent_results(results)
+
+        if self._scoreboard_cache is not None:
+            for update in results:
+                self._scoreboard_cache.set_result(
+                    update.agent_id, update.metric, update.result
+                )
+
+        self._invalidate_reads(update.agent_id for update in results)
+
+        return response
+
+    async def _send_agent_results(self, results: List[AgentResultUpdate]):
+        return await self._umpire.call(
+            UmpireAgentServiceStub,
+            "set_agent_results",
+            SetAgentResultsRequest(
+                [
+                    SetAgentResultRequest(update.agent_id, update.metric, update.result)
+                    for update in results
+                ]
+            ),
         )
 
     async def add_to_agent_result(self, agent_id: int, metric: str, result: int):
-        return await UmpireAgentServiceStub(self._umpire_channel).add_to_agent_result(
-            AddToAgentResultRequest(agent_id, metric, result)
+        if self._result_buffer is not None:
+            response = await self._result_buffer.add(agent_id, metric, result)
+        else:
+            response = await self._umpire.call(
+                UmpireAgentServiceStub,
+                "add_to_agent_result",
+                AddToAgentResultRequest(agent_id, metric, result),
+            )
+
+        if self._scoreboard_cache is not None:
+            self._scoreboard_cache.add_to_result(agent_id, metric, result)
+
+        self._invalidate_reads([agent_id])
+
+        return response
+
+    async def add_to_agent_results(self, results: List[AgentResultUpdate]):
+        if self._result_buffer is not None:
+            response = await self._result_buffer.add_many(results)
+        else:
+            response = await self._send_agent_additions(results)
+
+        if self._scoreboard_cache is not None:
+            for update in results:
+                self._scoreboard_cache.add_to_result(
+                    update.agent_id, update.metric, update.result
+                )
+
+        self._invalidate_reads(update.agent_id for update in results)
+
+        return response
+
+    async def _send_agent_additions(self, results: List[AgentResultUpdate]):
+        return await self._umpire.call(
+            UmpireAgentServiceStub,
+            "add_to_agent_results",
+            AddToAgentResultsRequest(
+                [
+                    AddToAgentResultRequest(
+                        update.agent_id, update.metric, update.result
+                    )
+                    for update in results
+                ]
+            ),
         )
 
-    async def get_competition_evaluation_results(self):
-        return (
-            await UmpireEvaluationServiceStub(
-                self._umpire_channel
-            ).get_competition_evaluation_results(
-                GetCompetitionEvaluationResultsRequest(self.competition_tag)
+    async def get_competition_evaluation_results(self, columnar: bool = False):
+        """Returns every evaluation result in the competition.
+
+        Args:
+            columnar (bool, optional): Whether to return the results as a compact
+                EvaluationResultTable (which requires NumPy) rather than a list of
+                messages. Defaults to False.
+        """
+
+        results = (
+            await self._umpire.call(
+                UmpireEvaluationServiceStub,
+                "get_competition_evaluation_results",
+                GetCompetitionEvaluationResultsRequest(self.competition_tag),
             )
         ).results
 
+        if columnar:
+            return EvaluationResultTable.from_results(results)
+
+        return results
+
+    def iter_competition_evaluation_results(
+        self,
+        resume_token: Optional[str] = None,
+        since: str = "",
+        page_size: int = DEFAULT_PAGE_SIZE,
+        stream: bool = False,
+    ) -> EvaluationResultCursor:
+        """Returns an asynchronous iterator over the evaluation results in the competition,
+        which are fetched in pages rather than all at once.
+
+        Args:
+            resume_token (Optional[str], optional): The resume token of an earlier cursor,
+                so as to only fetch results added since. Defaults to None.
+            since (str, optional): Only results created at or after this ISO 8601 time are
+                fetched, unless resuming. Defaults to "".
+            page_size (int, optional): The number of results fetched at once. Defaults to 1000.
+            stream (bool, optional): Whether to fetch results over a single server stream.
+                Defaults to False.
+
+        Returns:
+            EvaluationResultCursor: The cursor.
+        """
+
+        after_id = 0
+        if resume_token is not None:
+            after_id, since = decode_resume_token(resume_token)
+
+        return EvaluationResultCursor(
+            self.competition_tag,
+            self._umpire,
+            after_id=after_id,
+            since=since,
+            page_size=page_size,
+            stream=stream,
+        )
+
     async def set_evaluation_result(
         self, evaluation_id: int, agent_id: int, metric: str, result: int
     ):
-        return await UmpireEvaluationServiceStub(
-            self._umpire_channel
-        ).set_evaluation_result(
-            SetEvaluationResultRequest(evaluation_id, agent_id, metric, result)
+        return await self._umpire.call(
+            UmpireEvaluationServiceStub,
+            "set_evaluation_result",
+            SetEvaluationResultRequest(evaluation_id, agent_id, metric, result),
         )
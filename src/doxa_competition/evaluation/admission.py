@@ -0,0 +1,159 @@
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Hashable, Optional
+
+
+class AdmissionController:
+    """Limits the number of evaluations handled at once by a worker process.
+
+    Up to `max_concurrency` evaluations run at a time, and up to `max_queue_size`
+    more may wait for a slot. Beyond that, evaluations are rejected straight away
+    so that Umpire can send them to another worker, rather than being accepted
+    and then timing out together.
+    """
+
+    max_concurrency: Optional[int]
+    max_queue_size: int
+    _admitted: int
+    _running: int
+    _admitted_by: Counter
+    _running_by: Counter
+    _closed: bool
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    def __init__(
+        self, max_concurrency: Optional[int] = None, max_queue_size: int = 0
+    ) -> None:
+        """Creates a new admission controller.
+
+        Args:
+            max_concurrency (Optional[int], optional): The maximum number of evaluations
+                run at once, if limited at all. Defaults to None.
+            max_queue_size (int, optional): The maximum number of evaluations waiting
+                for a slot. Defaults to 0.
+        """
+
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("The maximum concurrency must be at least 1.")
+
+        if max_queue_size < 0:
+            raise ValueError("The maximum queue size must not be negative.")
+
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self._admitted = 0
+        self._running = 0
+        self._admitted_by = Counter()
+        self._running_by = Counter()
+        self._closed = False
+
+    @property
+    def running(self) -> int:
+        """The number of evaluations currently running."""
+
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        """The number of admitted evaluations waiting for a slot."""
+
+        return self._admitted - self._running
+
+    def running_for(self, label: Hashable) -> int:
+        """The number of evaluations with a label currently running."""
+
+        return self._running_by[label]
+
+    def queued_for(self, label: Hashable) -> int:
+        """The number of admitted evaluations with a label waiting for a slot."""
+
+        return self._admitted_by[label] - self._running_by[label]
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def try_admit(self, label: Hashable = None) -> bool:
+        """Reserves a slot or a place in the queue for an evaluation.
+
+        Args:
+            label (Hashable, optional): A label for the evaluation (e.g. its competition tag)
+                by which evaluations are counted. Defaults to None.
+
+        Returns:
+            bool: Whether the evaluation was admitted, in which case it must then be run.
+        """
+
+        if self._closed:
+            return False
+
+        if (
+            self.max_concurrency is not None
+            and self._admitted >= self.max_concurrency + self.max_queue_size
+        ):
+            return False
+
+        self._admitted += 1
+        self._admitted_by[label] += 1
+        return True
+
+    async def run(
+        self,
+        evaluation: Awaitable,
+        label: Hashable = None,
+        on_abandoned: Optional[Callable[[], Awaitable]] = None,
+    ) -> None:
+        """Runs an admitted evaluation once a slot is free.
+
+        Args:
+            evaluation (Awaitable): The evaluation.
+            label (Hashable, optional): The label with which the evaluation was admitted.
+                Defaults to None.
+            on_abandoned (Optional[Callable[[], Awaitable]], optional): Called if the evaluation
+                is cancelled before it starts (e.g. while queued during shutdown), since it has
+                already been accepted and so Umpire must be told that it will not be run.
+                Defaults to None.
+        """
+
+        started = False
+
+        try:
+            if self.max_concurrency is None:
+                started = True
+                self._running += 1
+                self._running_by[label] += 1
+                await evaluation
+                return
+
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async with self._semaphore:
+                started = True
+                self._running += 1
+                self._running_by[label] += 1
+                await evaluation
+        finally:
+            self._admitted -= 1
+            self._admitted_by[label] -= 1
+
+            if started:
+                self._running -= 1
+                self._running_by[label] -= 1
+            else:
+                # e.g. cancelled while queued during shutdown
+                if asyncio.iscoroutine(evaluation):
+                    evaluation.close()
+
+                if on_abandoned is not None:
+                    try:
+                        await on_abandoned()
+                    except Exception as e:
+                        print(
+                            f"[ERROR] Unable to abandon a queued evaluation: {str(e)}"
+                        )
+
+    def close(self) -> None:
+        """Stops admitting evaluations, e.g. as the worker is shutting down."""
+
+        self._closed = True
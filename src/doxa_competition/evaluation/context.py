@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Dict, List, Optional
 
 from doxa_competition.evaluation.node import Node
+from doxa_competition.events import EvaluationParticipant
 
 
 class EvaluationContext:
@@ -19,7 +20,7 @@ class EvaluationContext:
         id: int,
         batch_id: int,
         queued_at: datetime,
-        participants: List[dict],
+        participants: List[EvaluationParticipant],
         extra: dict = None,
         timeouts: Optional[Dict[str, float]] = None,
     ) -> None:
@@ -28,14 +29,14 @@ class EvaluationContext:
         self.queued_at = queued_at
         self.nodes = [
             Node(
-                participant_index=participant["participant_index"],
-                agent_id=participant["agent_id"],
-                agent_metadata=participant["agent_metadata"],
-                enrolment_id=participant["enrolment_id"],
-                endpoint=participant["endpoint"],
-                storage_endpoint=participant["storage_endpoint"],
-                upload_id=participant["upload_id"],
-                auth_token=participant["auth_token"],
+                participant_index=participant.participant_index,
+                agent_id=participant.agent_id,
+                agent_metadata=participant.agent_metadata,
+                enrolment_id=participant.enrolment_id,
+                endpoint=participant.endpoint,
+                storage_endpoint=participant.storage_endpoint,
+                upload_id=participant.upload_id,
+                auth_token=participant.auth_token,
                 timeouts=timeouts,
             )
             for participant in participants
@@ -1,8 +1,9 @@
 import asyncio
 import json
+import time
 import traceback
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional, Union
 
 import pulsar
 from grpclib.client import Channel
@@ -11,10 +12,22 @@ from doxa_competition.context import CompetitionContext
 from doxa_competition.evaluation.context import EvaluationContext
 from doxa_competition.evaluation.errors import AgentError, AgentTimeoutError
 from doxa_competition.events import EvaluationEvent
+from doxa_competition.metrics import (
+    EVALUATION_ERRORS,
+    EVALUATION_PHASE_SECONDS,
+    PULSAR_PUBLISH_SECONDS,
+)
+from doxa_competition.producers import (
+    BatchingPolicy,
+    ProducerPool,
+    log_publish_error,
+    send_pulsar_message_async,
+)
 from doxa_competition.proto.umpire.scheduling import (
     CompleteEvaluationRequest,
     UmpireSchedulingServiceStub,
 )
+from doxa_competition.umpire import UmpireClient
 
 
 class EvaluationDriver(CompetitionContext):
@@ -23,27 +36,80 @@ class EvaluationDriver(CompetitionContext):
     competition_tag: str
     _pulsar_client: pulsar.Client
     _event_producer: pulsar.Producer
-    _umpire_channel: Channel
+    _owns_event_producer: bool
+    _umpire: UmpireClient
 
     autofetch: bool = True
     autoshutdown: bool = True
 
     timeouts: Dict[str, float] = {}
 
+    # how evaluation events emitted asynchronously are batched, if at all
+    event_batching: Optional[BatchingPolicy] = None
+
     def __init__(
         self,
         competition_tag: str,
         pulsar_client: pulsar.Client,
+        event_producer: Optional[pulsar.Producer] = None,
+        producer_pool: Optional[ProducerPool] = None,
     ) -> None:
+        """Creates a new evaluation driver.
+
+        Args:
+            competition_tag (str): The competition tag.
+            pulsar_client (pulsar.Client): The Pulsar client.
+            event_producer (Optional[pulsar.Producer], optional): A producer for the evaluation
+                events of the competition shared between drivers, which is left open when the
+                driver is torn down. Defaults to creating one for the driver.
+            producer_pool (Optional[ProducerPool], optional): A producer pool shared between
+                drivers for other events. Defaults to None.
+        """
+
         self.competition_tag = competition_tag
         self._pulsar_client = pulsar_client
+        self._producer_pool = producer_pool
 
-        self._event_producer = self._pulsar_client.create_producer(
-            f"persistent://public/default/competition-{self.competition_tag}-evaluation-events"
+        self._owns_event_producer = event_producer is None
+        self._event_producer = (
+            event_producer
+            if event_producer is not None
+            else self.make_event_producer(pulsar_client, competition_tag)
         )
 
-    async def startup(self, umpire_channel: Channel):
-        self._umpire_channel = umpire_channel
+    @classmethod
+    def make_event_producer(
+        cls, pulsar_client: pulsar.Client, competition_tag: str
+    ) -> pulsar.Producer:
+        """Creates a producer for the evaluation events of a competition,
+        which may be shared by every driver for the competition.
+
+        Args:
+            pulsar_client (pulsar.Client): The Pulsar client.
+            competition_tag (str): The competition tag.
+
+        Returns:
+            pulsar.Producer: The producer.
+        """
+
+        return pulsar_client.create_producer(
+            f"persistent://public/default/competition-{competition_tag}-evaluation-events",
+            **(
+                cls.event_batching.get_producer_options()
+                if cls.event_batching is not None
+                else {}
+            ),
+        )
+
+    async def startup(self, umpire: Union[UmpireClient, Channel]):
+        """Starts up the evaluation driver.
+
+        Args:
+            umpire (Union[UmpireClient, Channel]): The Umpire client, which is shared
+                and so left open when the driver is torn down.
+        """
+
+        self._umpire = UmpireClient.wrap(umpire)
 
     async def handle(self, context: EvaluationContext) -> None:
         """Handles the evaluation process according to the specific competition
@@ -73,6 +139,8 @@ class EvaluationDriver(CompetitionContext):
         if error_type:
             event_type += f"_{error_type.upper()}"
 
+        EVALUATION_ERRORS.inc(competition=self.competition_tag, type=event_type)
+
         body = extra if extra else {}
 
         try:
@@ -164,11 +232,17 @@ class EvaluationDriver(CompetitionContext):
 
         if self.autofetch:
             # fetch agents from their respective storage nodes
-            await self._context.fetch_agents()
+            with EVALUATION_PHASE_SECONDS.time(
+                competition=self.competition_tag, phase="fetch_agents"
+            ):
+                await self._context.fetch_agents()
 
         # call userland code to handle the evaluation
         try:
-            await self.handle(self._context)
+            with EVALUATION_PHASE_SECONDS.time(
+                competition=self.competition_tag, phase="handle"
+            ):
+                await self.handle(self._context)
         except asyncio.TimeoutError as e:
             self._handle_agent_timeout_error(e)
         except AgentTimeoutError as e:
@@ -188,21 +262,83 @@ class EvaluationDriver(CompetitionContext):
         the internal evaluation event producer available throughout the
         lifetime of the evaluation driver.
 
+        If event batching is enabled, the event is sent asynchronously (and published
+        by the time the driver is torn down) rather than blocking the event loop until
+        its batch is published.
+
+        Args:
+            body (dict): The event body.
+            properties (dict, optional): Any optional properties in addition. Defaults to {}.
+        """
+
+        if self.event_batching is not None:
+            # waiting for the event's batch to be published would block the event loop
+            self.emit_evaluation_event_async(
+                event_type, body, properties
+            ).add_done_callback(log_publish_error)
+            return
+
+        with PULSAR_PUBLISH_SECONDS.time(mode="sync"):
+            self._event_producer.send(
+                json.dumps(
+                    {
+                        "evaluation_id": self._context.id,
+                        "event_type": event_type,
+                        "body": body,
+                    }
+                ).encode("utf-8"),
+                properties if properties is not None else {},
+            )
+
+    def emit_evaluation_event_async(
+        self, event_type: str, body: dict, properties: dict = None
+    ) -> asyncio.Future:
+        """Emits an evaluation event specific to the competition without
+        waiting for it to be published, e.g. for frequent per-turn events.
+
+        Events are published in the order in which they are emitted, and any
+        pending events are published before the evaluation driver is torn down.
+
         Args:
+            event_type (str): The event type.
             body (dict): The event body.
             properties (dict, optional): Any optional properties in addition. Defaults to {}.
+
+        Returns:
+            asyncio.Future: Resolves to the message ID once the event has been published,
+                or fails with a PublishError.
         """
 
-        self._event_producer.send(
-            json.dumps(
-                {
-                    "evaluation_id": self._context.id,
-                    "event_type": event_type,
-                    "body": body,
-                }
-            ).encode("utf-8"),
+        start = time.monotonic()
+        future = send_pulsar_message_async(
+            self._event_producer,
+            {
+                "evaluation_id": self._context.id,
+                "event_type": event_type,
+                "body": body,
+            },
             properties if properties is not None else {},
         )
+        future.add_done_callback(
+            lambda _: PULSAR_PUBLISH_SECONDS.observe(
+                time.monotonic() - start, mode="async"
+            )
+        )
+
+        return self._get_publish_tracker().track(future)
+
+    async def flush(self) -> None:
+        """Waits for every event emitted asynchronously to be published.
+
+        Raises:
+            PublishError: Raised if any of these events could not be published.
+        """
+
+        if self._publish_tracker is None or not self._publish_tracker.pending():
+            return
+
+        await asyncio.get_event_loop().run_in_executor(None, self._event_producer.flush)
+        await super().flush()
 
     async def set_result(self, agent_id: int, metric: str, result: int):
         return await self.set_evaluation_result(
@@ -214,20 +350,38 @@ class EvaluationDriver(CompetitionContext):
 
         if self.autoshutdown:
             # clean up Hearth node instances
-            await self._context.release_nodes()
+            with EVALUATION_PHASE_SECONDS.time(
+                competition=self.competition_tag, phase="release"
+            ):
+                await self._context.release_nodes()
 
         try:
-            self._event_producer.close()
-        except:
-            print("[ERROR] Unable to close event producer.")
+            await self.flush()
+        except Exception as e:
+            print(f"[ERROR] Unable to publish evaluation events: {str(e)}")
+
+        loop = asyncio.get_event_loop()
+
+        # closing blocks until the broker responds
+        if self._owns_event_producer:
+            try:
+                await loop.run_in_executor(None, self._event_producer.close)
+            except:
+                print("[ERROR] Unable to close event producer.")
+
+        if self._owns_producer_pool:
+            await loop.run_in_executor(None, self._producer_pool.close)
 
         try:
-            await UmpireSchedulingServiceStub(self._umpire_channel).complete_evaluation(
-                CompleteEvaluationRequest(evaluation_id=self._context.id)
-            )
+            with EVALUATION_PHASE_SECONDS.time(
+                competition=self.competition_tag, phase="complete"
+            ):
+                await self._umpire.call(
+                    UmpireSchedulingServiceStub,
+                    "complete_evaluation",
+                    CompleteEvaluationRequest(evaluation_id=self._context.id),
+                )
         except Exception as e:
             print(
                 f"[ERROR] An error occurred while notifying Umpire of the completion of evaluation {self._context.id}: {str(e)}"
             )
-        finally:
-            self._umpire_channel.close()
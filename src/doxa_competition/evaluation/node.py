@@ -1,11 +1,13 @@
 import asyncio
 import os
-from typing import AsyncIterable, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from typing import AsyncIterable, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlsplit
 
 from grpclib.client import Channel
 
 from doxa_competition.evaluation.errors import AgentError
+from doxa_competition.metrics import NODE_RPC_ERRORS, NODE_RPC_SECONDS
 from doxa_competition.proto.nodeapi import (
     CaptureOutputRequest,
     DownloadApplicationRequest,
@@ -20,6 +22,18 @@ from doxa_competition.utils import is_valid_filename
 DEFAULT_TIMEOUT = 30  # 30 secs
 
 
+@contextmanager
+def observe_rpc(method: str) -> Iterator[None]:
+    """Records the latency of a unary RPC to a node and whether it failed."""
+
+    try:
+        with NODE_RPC_SECONDS.time(method=method):
+            yield
+    except Exception:
+        NODE_RPC_ERRORS.inc(method=method)
+        raise
+
+
 class Node:
     """The DOXA Competition Framework representation of a Hearth node."""
 
@@ -83,31 +97,33 @@ class Node:
             return True
 
     async def fetch_agent(self):
-        return await self.node_api.download_application(
-            DownloadApplicationRequest(
-                endpoint=f"{self.storage_endpoint}download/{self.upload_id}",
-                endpoint_bearer="",
-                gzip=self.is_gzip(),
-            ),
-            metadata={"x-hearth-auth": self.auth_token},
-            timeout=self.timeouts["FETCH_AGENT"],
-        )
+        with observe_rpc("download_application"):
+            return await self.node_api.download_application(
+                DownloadApplicationRequest(
+                    endpoint=f"{self.storage_endpoint}download/{self.upload_id}",
+                    endpoint_bearer="",
+                    gzip=self.is_gzip(),
+                ),
+                metadata={"x-hearth-auth": self.auth_token},
+                timeout=self.timeouts["FETCH_AGENT"],
+            )
 
     async def run_command(self, args: List[str], environment: List[str] = None):
-        return await self.node_api.spawn_application(
-            SpawnApplicationRequest(
-                args=args,
-                mode=0,
-                capture_stdout=True,
-                capture_stderr=True,
-                working_dir="/app",
-                uid=1000,
-                gid=1000,
-                env_vars=environment if environment is not None else [],
-            ),
-            metadata={"x-hearth-auth": self.auth_token},
-            timeout=self.timeouts["RUN_COMMAND"],
-        )
+        with observe_rpc("spawn_application"):
+            return await self.node_api.spawn_application(
+                SpawnApplicationRequest(
+                    args=args,
+                    mode=0,
+                    capture_stdout=True,
+                    capture_stderr=True,
+                    working_dir="/app",
+                    uid=1000,
+                    gid=1000,
+                    env_vars=environment if environment is not None else [],
+                ),
+                metadata={"x-hearth-auth": self.auth_token},
+                timeout=self.timeouts["RUN_COMMAND"],
+            )
 
     async def run_python_application(self, args: List[str] = None):
         if not is_valid_filename(self.agent_metadata.get("entrypoint", "")):
@@ -138,11 +154,14 @@ class Node:
             async for line in lines:
                 yield WriteInputRequest(data=line.encode("utf-8"))
 
-        return await self.node_api.write_input(
-            wrapper(),
-            metadata={"x-hearth-auth": self.auth_token},
-            timeout=timeout if timeout is not None else self.timeouts["WRITE_STDIN"],
-        )
+        with observe_rpc("write_input"):
+            return await self.node_api.write_input(
+                wrapper(),
+                metadata={"x-hearth-auth": self.auth_token},
+                timeout=timeout
+                if timeout is not None
+                else self.timeouts["WRITE_STDIN"],
+            )
 
     async def read_stdout(self, timeout: Optional[float] = None):
         async for response in self.node_api.capture_output(
@@ -199,10 +218,11 @@ class Node:
 
     async def release(self):
         try:
-            await self.node_api.shutdown_node(
-                ShutdownNodeRequest(),
-                metadata={"x-hearth-auth": self.auth_token},
-                timeout=self.timeouts["RELEASE"],
-            )
+            with observe_rpc("shutdown_node"):
+                await self.node_api.shutdown_node(
+                    ShutdownNodeRequest(),
+                    metadata={"x-hearth-auth": self.auth_token},
+                    timeout=self.timeouts["RELEASE"],
+                )
         finally:
             self.node_channel.close()
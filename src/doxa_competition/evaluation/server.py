@@ -1,20 +1,86 @@
+import asyncio
+import os
+import shutil
+import tempfile
 from datetime import datetime
-from typing import Dict, Type
+from typing import Dict, Optional, Type
 from uuid import uuid4
 
 from sanic import Sanic
 from sanic.log import logger
 from sanic.request import Request
-from sanic.response import json
+from sanic.response import json, text
 
 from doxa_competition.evaluation import EvaluationDriver
+from doxa_competition.evaluation.admission import AdmissionController
 from doxa_competition.events import EvaluationEvent
+from doxa_competition.metrics import (
+    EVALUATIONS_ADMITTED,
+    EVALUATIONS_QUEUED,
+    EVALUATIONS_REJECTED,
+    EVALUATIONS_RUNNING,
+    REGISTRY,
+    aggregate_snapshots,
+    clear_snapshots,
+    read_snapshots,
+    render_prometheus,
+)
+from doxa_competition.producers import ProducerPool
 from doxa_competition.proto.umpire.scheduling import (
+    CompleteEvaluationRequest,
     DeregisterDriverRequest,
     RegisterDriverRequest,
     UmpireSchedulingServiceStub,
 )
-from doxa_competition.utils import make_pulsar_client, make_umpire_channel
+from doxa_competition.retries import RetryPolicy
+from doxa_competition.umpire import UmpireClient
+from doxa_competition.utils import make_pulsar_client, make_umpire_client
+from doxa_competition.validation import Field, FieldError, Schema, ValidationError
+
+# the directory shared by worker processes for their metrics snapshots
+METRICS_DIR_VARIABLE = "DOXA_METRICS_DIR"
+
+
+def is_iso_timestamp(value: str) -> bool:
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+
+    return True
+
+
+PARTICIPANT_SCHEMA = Schema(
+    [
+        Field("participant_index", int),
+        Field("agent_id", int),
+        Field("agent_metadata", dict),
+        Field("enrolment_id", int),
+        Field("endpoint", str),
+        Field("storage_endpoint", str),
+        Field("upload_id", int),
+        Field("auth_token", str),
+    ]
+)
+
+EVALUATION_SCHEMA = Schema(
+    [
+        Field("id", int),
+        Field("competition_tag", str),
+        Field("batch_id", int),
+        Field(
+            "queued_at",
+            str,
+            check=is_iso_timestamp,
+            message="must be an ISO 8601 timestamp",
+        ),
+        Field("participants", list, items=PARTICIPANT_SCHEMA, min_items=1),
+        Field("extra", dict, required=False),
+    ]
+)
+
+# compiled once, rather than interpreting the schema for every evaluation
+validate_evaluation_payload = EVALUATION_SCHEMA.compile()
 
 
 def make_evaluation_event(request: Request) -> EvaluationEvent:
@@ -27,49 +93,34 @@ def make_evaluation_event(request: Request) -> EvaluationEvent:
         EvaluationEvent: The resulting event.
     """
 
-    # {
-    #     "id": ...,
-    #     "competition_tag": ...,
-    #     "batch_id": ...,
-    #     "queued_at": ...,
-    #     "participants": [{
-    #         "participant_index": ...,
-    #         "agent_id": ...,
-    #         "agent_metadata": {...},
-    #         "enrolment_id": ...,
-    #         "endpoint": ...,
-    #         "auth_token": ...,
-    #     }, ...],
-    # }
-
-    assert "id" in request.json
-    assert "competition_tag" in request.json
-    assert "batch_id" in request.json
-    assert "queued_at" in request.json
-    assert "participants" in request.json
-    assert isinstance(request.json["participants"], list)
-    assert len(request.json["participants"]) > 0
-
-    for participant in request.json["participants"]:
-        assert isinstance(participant, dict)
-        assert "participant_index" in participant
-        assert "agent_id" in participant
-        assert "agent_metadata" in participant
-        assert isinstance(participant["agent_metadata"], dict)
-        assert "enrolment_id" in participant
-        assert "endpoint" in participant
-        assert "storage_endpoint" in participant
-        assert "upload_id" in participant
-        assert "auth_token" in participant
-
-    return EvaluationEvent(body=request.json)
+    return parse_evaluation_payload(request.json)
+
+
+def parse_evaluation_payload(payload: dict) -> EvaluationEvent:
+    """Validates and creates an evaluation event from an evaluation payload.
+
+    Args:
+        payload (dict): The evaluation payload.
+
+    Raises:
+        ValidationError: Raised if the payload is not valid.
+
+    Returns:
+        EvaluationEvent: The resulting event.
+    """
+
+    errors = validate_evaluation_payload(payload)
+    if errors:
+        raise ValidationError(errors)
+
+    return EvaluationEvent(body=payload)
 
 
 async def process_evaluation(
-    driver: EvaluationDriver, event: EvaluationEvent, umpire_channel_connection: dict
+    driver: EvaluationDriver, event: EvaluationEvent, umpire: UmpireClient
 ):
     try:
-        await driver.startup(make_umpire_channel(**umpire_channel_connection))
+        await driver.startup(umpire)
         await driver._handle(event)
     except Exception as e:
         driver._handle_error(e, "INTERNAL")
@@ -77,6 +128,19 @@ async def process_evaluation(
         await driver.teardown()
 
 
+async def abandon_evaluation(event: EvaluationEvent, umpire: UmpireClient):
+    """Tells Umpire that an accepted evaluation will not be run, e.g. because it was
+    still queued when the worker shut down, so that its slot is not leaked."""
+
+    logger.warn(f"Abandoning queued evaluation {event.evaluation_id}.")
+
+    await umpire.call(
+        UmpireSchedulingServiceStub,
+        "complete_evaluation",
+        CompleteEvaluationRequest(evaluation_id=event.evaluation_id),
+    )
+
+
 def make_server(
     drivers: Dict[str, Type[EvaluationDriver]],
     driver_endpoint: str,
@@ -84,21 +148,47 @@ def make_server(
     pulsar_path: str,
     umpire_host: str,
     umpire_port: int,
+    umpire_channels: int = 1,
+    umpire_timeout: Optional[float] = None,
+    umpire_keepalive: Optional[float] = None,
+    umpire_retry: Optional[RetryPolicy] = None,
+    max_evaluations: Optional[int] = None,
+    max_queued_evaluations: int = 0,
+    retry_after: int = 1,
+    max_batch_size: int = 1000,
+    metrics_dir: Optional[str] = None,
+    metrics_interval: float = 5.0,
 ):
     driver_uuid = uuid4()
     start_time = datetime.now()
 
     app = Sanic("doxa-competition-worker")
     app.ctx.pulsar_client = make_pulsar_client(pulsar_path=pulsar_path)
-    app.ctx.umpire_channel_connection = {"host": umpire_host, "port": umpire_port}
+    app.ctx.umpire_client_options = {
+        "host": umpire_host,
+        "port": umpire_port,
+        "channels": umpire_channels,
+        "timeout": umpire_timeout,
+        "keepalive_time": umpire_keepalive,
+        "retry": umpire_retry,
+    }
 
     logger.info(f"Driver {str(driver_uuid)} is starting with {workers} workers.")
 
     @app.main_process_start
     async def startup_handler(app, loop):
-        app.ctx.umpire_channel = make_umpire_channel(host=umpire_host, port=umpire_port)
-        app.ctx.umpire_scheduling = UmpireSchedulingServiceStub(app.ctx.umpire_channel)
-        await app.ctx.umpire_scheduling.register_driver(
+        # worker processes inherit the environment of the main process
+        app.ctx.created_metrics_dir = None
+        if metrics_dir is not None:
+            os.makedirs(metrics_dir, exist_ok=True)
+            clear_snapshots(metrics_dir)
+            os.environ[METRICS_DIR_VARIABLE] = metrics_dir
+        elif METRICS_DIR_VARIABLE not in os.environ:
+            app.ctx.created_metrics_dir = tempfile.mkdtemp(prefix="doxa-metrics-")
+            os.environ[METRICS_DIR_VARIABLE] = app.ctx.created_metrics_dir
+
+        app.ctx.umpire = make_umpire_client(**app.ctx.umpire_client_options)
+        await app.ctx.umpire.scheduling.register_driver(
             RegisterDriverRequest(
                 runtime_id=str(driver_uuid),
                 competition_tags=list(drivers.keys()),
@@ -111,7 +201,7 @@ def make_server(
     @app.main_process_stop
     async def shutdown_handler(app, loop):
         try:
-            await app.ctx.umpire_scheduling.deregister_driver(
+            await app.ctx.umpire.scheduling.deregister_driver(
                 DeregisterDriverRequest(
                     runtime_id=str(driver_uuid),
                 )
@@ -120,7 +210,80 @@ def make_server(
         except:
             logger.error("Failed to deregister from Umpire.")
 
-        app.ctx.umpire_channel.close()
+        app.ctx.umpire.close()
+
+        if app.ctx.created_metrics_dir is not None:
+            shutil.rmtree(app.ctx.created_metrics_dir, ignore_errors=True)
+
+    @app.before_server_start
+    async def worker_startup_handler(app, loop):
+        # each worker process limits its own evaluations
+        app.ctx.admission = AdmissionController(
+            max_concurrency=max_evaluations, max_queue_size=max_queued_evaluations
+        )
+
+        # connections are shared by every evaluation in the worker process,
+        # rather than being set up and torn down for each one
+        app.ctx.worker_umpire = make_umpire_client(**app.ctx.umpire_client_options)
+        app.ctx.producer_pool = ProducerPool(app.ctx.pulsar_client)
+        app.ctx.event_producers = {
+            tag: driver.make_event_producer(app.ctx.pulsar_client, tag)
+            for tag, driver in drivers.items()
+        }
+
+        def collect_evaluations():
+            for tag in drivers:
+                EVALUATIONS_RUNNING.set(
+                    app.ctx.admission.running_for(tag), competition=tag
+                )
+                EVALUATIONS_QUEUED.set(
+                    app.ctx.admission.queued_for(tag), competition=tag
+                )
+
+        REGISTRY.add_collector(collect_evaluations)
+
+        app.ctx.metrics_dir = metrics_dir or os.environ.get(METRICS_DIR_VARIABLE)
+        if app.ctx.metrics_dir is None:
+            # e.g. running in a single process
+            app.ctx.metrics_dir = tempfile.mkdtemp(prefix="doxa-metrics-")
+            os.environ[METRICS_DIR_VARIABLE] = app.ctx.metrics_dir
+        else:
+            os.makedirs(app.ctx.metrics_dir, exist_ok=True)
+
+        app.add_task(write_metrics_snapshots(app))
+
+    async def write_metrics_snapshots(app: Sanic):
+        # other workers read this snapshot when they are scraped
+        while True:
+            try:
+                REGISTRY.write_snapshot(app.ctx.metrics_dir)
+            except OSError as e:
+                logger.error(f"Failed to write a metrics snapshot: {str(e)}")
+
+            await asyncio.sleep(metrics_interval)
+
+    @app.before_server_stop
+    async def worker_shutdown_handler(app, loop):
+        app.ctx.admission.close()
+
+    @app.after_server_stop
+    async def worker_cleanup_handler(app, loop):
+        for tag, producer in app.ctx.event_producers.items():
+            try:
+                producer.flush()
+                producer.close()
+            except:
+                logger.error(f"Failed to close the event producer for {tag}.")
+
+        app.ctx.producer_pool.close()
+        app.ctx.worker_umpire.close()
+
+        try:
+            # only the latest snapshot of each process is kept, so its
+            # counters are still included until the server is restarted
+            REGISTRY.write_snapshot(app.ctx.metrics_dir)
+        except OSError:
+            pass
 
     @app.get("/status")
     async def status_handler(request: Request):
@@ -130,34 +293,138 @@ def make_server(
                 "competitions": list(drivers.keys()),
                 "started_at": start_time.isoformat(),
                 "workers": workers,
+                "evaluations": {
+                    "running": request.app.ctx.admission.running,
+                    "queued": request.app.ctx.admission.queued,
+                },
             }
         )
 
+    @app.get("/metrics")
+    async def metrics_handler(request: Request):
+        # the metrics of this worker are always up to date, and those
+        # of other workers are at most one snapshot interval old
+        REGISTRY.write_snapshot(request.app.ctx.metrics_dir)
+        snapshot = aggregate_snapshots(read_snapshots(request.app.ctx.metrics_dir))
+
+        return text(
+            render_prometheus(snapshot),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    def parse_evaluation(payload: dict) -> EvaluationEvent:
+        event = parse_evaluation_payload(payload)
+
+        if event.competition_tag not in drivers:
+            logger.warn(
+                f"Failed to process evaluation for competition {event.competition_tag}"
+            )
+            raise ValidationError(
+                [FieldError("competition_tag", "is not handled by this driver")]
+            )
+
+        return event
+
+    def start_evaluation(app: Sanic, event: EvaluationEvent) -> int:
+        """Admits an evaluation and starts handling it in the background.
+
+        Args:
+            app (Sanic): The app.
+            event (EvaluationEvent): The evaluation event.
+
+        Returns:
+            int: The HTTP status for the evaluation.
+        """
+
+        admission = app.ctx.admission
+        if not admission.try_admit(event.competition_tag):
+            # Umpire may send the evaluation to another worker instead
+            logger.warn(f"Rejected evaluation {event.evaluation_id} at capacity.")
+            status = 503 if admission.closed else 429
+            EVALUATIONS_REJECTED.inc(competition=event.competition_tag, status=status)
+            return status
+
+        EVALUATIONS_ADMITTED.inc(competition=event.competition_tag)
+        logger.info(f"Handling evaluation {event.evaluation_id}")
+        app.add_task(
+            admission.run(
+                process_evaluation(
+                    driver=drivers[event.competition_tag](
+                        event.competition_tag,
+                        app.ctx.pulsar_client,
+                        event_producer=app.ctx.event_producers[event.competition_tag],
+                        producer_pool=app.ctx.producer_pool,
+                    ),
+                    event=event,
+                    umpire=app.ctx.worker_umpire,
+                ),
+                event.competition_tag,
+                on_abandoned=lambda: abandon_evaluation(event, app.ctx.worker_umpire),
+            )
+        )
+
+        return 200
+
     @app.post("/evaluation")
     async def evaluation_handler(request: Request):
         try:
-            event = make_evaluation_event(request)
-
-            if event.competition_tag not in drivers:
-                logger.warn(
-                    f"Failed to process evaluation for competition {event.competition_tag}"
-                )
-                raise ValueError
+            event = parse_evaluation(request.json)
+        except ValidationError as e:
+            return json({"success": False, "errors": e.to_list()}, status=400)
         except:
             return json({"success": False}, status=400)
 
-        logger.info(f"Handling evaluation {event.evaluation_id}")
-        request.app.add_task(
-            process_evaluation(
-                driver=drivers[event.competition_tag](
-                    event.competition_tag,
-                    request.app.ctx.pulsar_client,
-                ),
-                event=event,
-                umpire_channel_connection=app.ctx.umpire_channel_connection,
+        status = start_evaluation(request.app, event)
+        if status != 200:
+            return json(
+                {"success": False},
+                status=status,
+                headers={"Retry-After": str(retry_after)},
             )
-        )
 
         return json({"success": True})
 
+    @app.post("/evaluations")
+    async def evaluations_handler(request: Request):
+        payloads = request.json
+        if (
+            not isinstance(payloads, list)
+            or not payloads
+            or len(payloads) > max_batch_size
+        ):
+            return json({"success": False}, status=400)
+
+        # every evaluation is validated before any are admitted
+        events = []
+        for payload in payloads:
+            try:
+                events.append(parse_evaluation(payload))
+            except ValidationError as e:
+                events.append(e)
+
+        results = []
+        for payload, event in zip(payloads, events):
+            if isinstance(event, ValidationError):
+                results.append(
+                    {
+                        "id": payload.get("id") if isinstance(payload, dict) else None,
+                        "success": False,
+                        "status": 400,
+                        "errors": event.to_list(),
+                    }
+                )
+                continue
+
+            status = start_evaluation(request.app, event)
+            results.append(
+                {"id": event.evaluation_id, "success": status == 200, "status": status}
+            )
+
+        rejected = any(result["status"] in (429, 503) for result in results)
+
+        return json(
+            {"success": True, "results": results},
+            headers={"Retry-After": str(retry_after)} if rejected else None,
+        )
+
     return app
@@ -0,0 +1,162 @@
+import base64
+import json
+from typing import AsyncIterator, List, Tuple
+
+from doxa_competition.proto.umpire.evaluation import (
+    EvaluationResult,
+    GetCompetitionEvaluationResultsRequest,
+    UmpireEvaluationServiceStub,
+)
+from doxa_competition.umpire import UmpireClient
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def encode_resume_token(after_id: int, since: str) -> str:
+    """Encodes the position of a cursor as an opaque resume token.
+
+    Args:
+        after_id (int): The ID of the last result seen.
+        since (str): The earliest creation time of results being fetched.
+
+    Returns:
+        str: The resume token.
+    """
+
+    return base64.urlsafe_b64encode(
+        json.dumps({"after_id": after_id, "since": since}).encode("utf-8")
+    ).decode("ascii")
+
+
+def decode_resume_token(token: str) -> Tuple[int, str]:
+    """Decodes a resume token.
+
+    Args:
+        token (str): The resume token.
+
+    Returns:
+        Tuple[int, str]: The ID of the last result seen and the earliest
+            creation time of results being fetched.
+    """
+
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        return int(position["after_id"]), str(position["since"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("The resume token is not valid.") from e
+
+
+class EvaluationResultCursor:
+    """Iterates asynchronously over the evaluation results in a competition,
+    fetching them from Umpire page by page (or as a stream) in order of ID.
+
+    Its resume token can be stored (e.g. at the end of a handler's run) and passed
+    to `CompetitionContext.iter_competition_evaluation_results` later on, so that
+    only results that have been added since are fetched.
+
+    Versions of Umpire without paging ignore the cursor's position and return every
+    result in the competition in one response, so pagination is not available there.
+    Results at or before the cursor's position are still skipped on the client, so
+    that resuming never replays old results, but they are all fetched regardless.
+    """
+
+    competition_tag: str
+    after_id: int
+    since: str
+    page_size: int
+    stream: bool
+    _umpire: UmpireClient
+
+    def __init__(
+        self,
+        competition_tag: str,
+        umpire: UmpireClient,
+        after_id: int = 0,
+        since: str = "",
+        page_size: int = DEFAULT_PAGE_SIZE,
+        stream: bool = False,
+    ) -> None:
+        """Creates a new evaluation result cursor.
+
+        Args:
+            competition_tag (str): The competition tag.
+            umpire (UmpireClient): The Umpire client.
+            after_id (int, optional): Only results with a greater ID are fetched. Defaults to 0.
+            since (str, optional): Only results created at or after this ISO 8601 time are
+                fetched. Defaults to "".
+            page_size (int, optional): The number of results fetched at once. Defaults to 1000.
+            stream (bool, optional): Whether to fetch results over a single server stream
+                rather than requesting each page in turn. Defaults to False.
+        """
+
+        if page_size < 1:
+            raise ValueError("The page size must be at least 1.")
+
+        self.competition_tag = competition_tag
+        self.after_id = after_id
+        self.since = since
+        self.page_size = page_size
+        self.stream = stream
+        self._umpire = umpire
+
+    @property
+    def resume_token(self) -> str:
+        """A token from which to resume fetching results after the last result seen.
+
+        Returns:
+            str: The resume token.
+        """
+
+        return encode_resume_token(self.after_id, self.since)
+
+    def _take_new_results(
+        self, results: List[EvaluationResult]
+    ) -> List[EvaluationResult]:
+        # Umpire versions without paging ignore `after_id` and send old results too
+        after_id = self.after_id
+        new_results = [result for result in results if result.id > after_id]
+
+        if new_results:
+            self.after_id = max(result.id for result in new_results)
+
+        return new_results
+
+    def _make_request(self) -> GetCompetitionEvaluationResultsRequest:
+        return GetCompetitionEvaluationResultsRequest(
+            competition_tag=self.competition_tag,
+            after_id=self.after_id,
+            since=self.since,
+            page_size=self.page_size,
+        )
+
+    async def _iterate_pages(self) -> AsyncIterator[EvaluationResult]:
+        while True:
+            # each page is fetched with the client's deadline and retry policy,
+            # so that a transient failure does not abort the whole iteration
+            response = await self._umpire.call(
+                UmpireEvaluationServiceStub,
+                "get_competition_evaluation_results",
+                self._make_request(),
+            )
+
+            for result in self._take_new_results(response.results):
+                yield result
+
+            # versions of Umpire without paging return every result at once
+            # and never set `next_after_id`
+            if not response.results or response.next_after_id == 0:
+                break
+
+            self.after_id = response.next_after_id
+
+    async def _iterate_stream(self) -> AsyncIterator[EvaluationResult]:
+        stub = self._umpire.evaluation
+
+        async for response in stub.stream_competition_evaluation_results(
+            self._make_request()
+        ):
+            for result in self._take_new_results(response.results):
+                yield result
+
+    def __aiter__(self) -> AsyncIterator[EvaluationResult]:
+        return self._iterate_stream() if self.stream else self._iterate_pages()
@@ -5,6 +5,8 @@ class Event:
     so as to be more useful to competition implementers.
     """
 
+    __slots__ = ("body", "properties", "timestamp")
+
     body: dict
     properties: dict
     timestamp: int
@@ -0,0 +1,170 @@
+import asyncio
+import traceback
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from doxa_competition.acknowledgement import CompletionCallback
+from doxa_competition.event import Event
+from doxa_competition.event.handler import BatchTopicHandler, TopicHandler
+
+
+PendingEvent = Tuple[str, TopicHandler, Event, Optional[CompletionCallback]]
+
+
+class EventDispatcher:
+    """Runs topic handlers as concurrent tasks, bounding the number of
+    events that may be in flight at any one time.
+
+    Events may be dispatched with a partition key, in which case events
+    sharing the same key are handled one at a time in the order they were
+    dispatched, while events with different keys are handled in parallel.
+
+    The dispatcher must be created from within a running event loop.
+    """
+
+    max_concurrency: int
+    _semaphore: asyncio.Semaphore
+    _tasks: Set[asyncio.Task]
+    _partitions: Dict[Hashable, Deque[PendingEvent]]
+    _in_flight: int
+
+    def __init__(self, max_concurrency: int = 1) -> None:
+        if max_concurrency < 1:
+            raise ValueError("The maximum concurrency must be at least 1.")
+
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = set()
+        self._partitions = {}
+        self._in_flight = 0
+
+    async def dispatch(
+        self,
+        topic: str,
+        handler: TopicHandler,
+        event: Event,
+        key: Hashable = None,
+        callback: Optional[CompletionCallback] = None,
+    ) -> None:
+        """Schedules a topic handler to be called with an event.
+
+        This waits until there is spare capacity, so callers receiving
+        events in a loop are naturally slowed down when the dispatcher
+        is saturated. Events waiting behind another event with the same
+        partition key count towards the in-flight limit.
+
+        Args:
+            topic (str): The topic on which the event was received.
+            handler (TopicHandler): The resolved topic handler.
+            event (Event): The event to be handled.
+            key (Hashable, optional): The partition key of the event. Defaults to None.
+            callback (Optional[CompletionCallback], optional): Called with None once the event
+                has been handled successfully, or with the exception raised otherwise.
+                Defaults to None.
+        """
+
+        await self._semaphore.acquire()
+        self._in_flight += 1
+
+        if key is None:
+            self._spawn(self._handle(topic, handler, event, callback))
+            return
+
+        if key in self._partitions:
+            # a task is already draining this partition, so it will pick
+            # the event up once the earlier events have been handled
+            self._partitions[key].append((topic, handler, event, callback))
+            return
+
+        self._partitions[key] = deque([(topic, handler, event, callback)])
+        self._spawn(self._drain(key))
+
+    async def dispatch_batch(
+        self,
+        topic: str,
+        handler: BatchTopicHandler,
+        events: List[Event],
+        callback: Optional[CompletionCallback] = None,
+    ) -> None:
+        """Calls a batch topic handler with a list of events once every event
+        dispatched before it has been handled, and waits for it to finish.
+
+        Waiting for earlier events preserves ordering across partition keys,
+        since a batch may contain events for any number of keys.
+
+        Args:
+            topic (str): The topic on which the events were received.
+            handler (BatchTopicHandler): The resolved batch topic handler.
+            events (List[Event]): The events to be handled, in order.
+            callback (Optional[CompletionCallback], optional): Called with None once the events
+                have been handled successfully, or with the exception raised otherwise.
+                Defaults to None.
+        """
+
+        await self.join()
+
+        try:
+            await handler(events)
+        except Exception as e:
+            print(
+                f"[ERROR] An error occurred while handling a batch of {len(events)} events on {topic}."
+            )
+            traceback.print_exc()
+
+            if callback is not None:
+                callback(e)
+        else:
+            if callback is not None:
+                callback(None)
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key: Hashable) -> None:
+        queue = self._partitions[key]
+
+        try:
+            while queue:
+                await self._handle(*queue.popleft())
+        finally:
+            del self._partitions[key]
+
+    async def _handle(
+        self,
+        topic: str,
+        handler: TopicHandler,
+        event: Event,
+        callback: Optional[CompletionCallback],
+    ) -> None:
+        try:
+            await handler(event)
+        except Exception as e:
+            print(f"[ERROR] An error occurred while handling an event on {topic}.")
+            traceback.print_exc()
+
+            if callback is not None:
+                callback(e)
+        else:
+            if callback is not None:
+                callback(None)
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def in_flight(self) -> int:
+        """Returns the number of events currently being handled or
+        waiting behind an earlier event with the same partition key.
+
+        Returns:
+            int: The number of in-flight events.
+        """
+
+        return self._in_flight
+
+    async def join(self) -> None:
+        """Waits for all in-flight events to be handled."""
+
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -1,9 +1,11 @@
-from typing import Callable, Dict
+from typing import Callable, Dict, Hashable, List, Optional
 
 from doxa_competition.context import CompetitionContext
 from doxa_competition.event import Event
 
 TopicHandler = Callable[[Event], None]
+BatchTopicHandler = Callable[[List[Event]], None]
+PartitionKeyFunction = Callable[[Event], Optional[Hashable]]
 
 
 class EventHandler:
@@ -41,6 +43,34 @@ class EventHandler:
 
         raise NotImplementedError
 
+    def extract_batch_routes(self) -> Dict[str, BatchTopicHandler]:
+        """Extracts batch routes handled by the event handler.
+
+        When the competition runner receives messages in batches, consecutive
+        events on a topic with a batch topic handler are passed to it as a list.
+        Topics without a batch topic handler fall back to their topic handler,
+        which is called once per event.
+
+        Returns:
+            Dict[str, BatchTopicHandler]: The batch route mappings.
+        """
+
+        return {}
+
+    def extract_partition_keys(self) -> Dict[str, PartitionKeyFunction]:
+        """Extracts the partition key functions of routes handled by the event handler.
+
+        When events are handled concurrently, events on these routes that share
+        a partition key are handled in order, while events with different keys
+        (or without a key) may be handled in parallel. Routes without a partition
+        key function are not ordered.
+
+        Returns:
+            Dict[str, PartitionKeyFunction]: The partition key function mappings.
+        """
+
+        return {}
+
 
 class Extension(EventHandler):
     """Competitions may implement "extensions" that allow competition services
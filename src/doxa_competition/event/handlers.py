@@ -1,8 +1,16 @@
-from typing import Dict
+from typing import Dict, Hashable, List, Optional
 
+from doxa_competition.context import SchedulableEvaluation
 from doxa_competition.event import Event
-from doxa_competition.event.handler import EventHandler, Extension, TopicHandler
+from doxa_competition.event.handler import (
+    BatchTopicHandler,
+    EventHandler,
+    Extension,
+    PartitionKeyFunction,
+    TopicHandler,
+)
 from doxa_competition.events import AgentEvent
+from doxa_competition.scheduling import LANE_ACTIVATION
 
 
 class AgentEventHandler(EventHandler):
@@ -52,6 +60,67 @@ class AgentEventHandler(EventHandler):
             )
         )
 
+    async def on_activation_batch(self, events: List[AgentEvent]) -> None:
+        """Handles a batch of agent activation events in one go.
+
+        Competition developers may implement this method to handle many
+        activations at once (e.g. to schedule all of their evaluations in a
+        single request) when the competition runner receives messages in
+        batches. By default, each activation is handled with on_activation().
+
+        Args:
+            events (List[AgentEvent]): The activation events to be handled, in order.
+        """
+
+        for event in events:
+            await self.on_activation(event)
+
+    async def _on_activation_batch(self, events: List[Event]) -> None:
+        """Handles a batch of agent activation events, as well as
+        agent deactivations where a user already has an active agent.
+
+        Activations are passed to on_activation_batch() in runs, so that
+        a deactivation is never handled before an activation that was
+        received earlier.
+
+        Args:
+            events (List[Event]): The activation events to be handled, in order.
+        """
+
+        activations = []
+
+        for event in events:
+            assert "activating_agent" in event.body
+
+            if (
+                "deactivating_agent" in event.body
+                and event.body["deactivating_agent"] is not None
+            ):
+                if activations:
+                    await self.on_activation_batch(activations)
+                    activations = []
+
+                await self.on_deactivation(
+                    AgentEvent(
+                        event.message_id,
+                        event.body["deactivating_agent"],
+                        event.properties,
+                        event.timestamp,
+                    )
+                )
+
+            activations.append(
+                AgentEvent(
+                    event.message_id,
+                    event.body["activating_agent"],
+                    event.properties,
+                    event.timestamp,
+                )
+            )
+
+        if activations:
+            await self.on_activation_batch(activations)
+
     async def _on_deactivation(self, event: Event) -> None:
         await self.on_deactivation(
             AgentEvent(
@@ -72,12 +141,44 @@ class AgentEventHandler(EventHandler):
         """
         pass
 
+    def get_enrolment_key(self, event: Event) -> Optional[Hashable]:
+        """Returns the enrolment ID of the agent(s) in an activation or
+        deactivation event, so that events for the same enrolment are
+        handled in order when events are handled concurrently.
+
+        Args:
+            event (Event): An activation or deactivation event.
+
+        Returns:
+            Optional[Hashable]: The enrolment ID, if present.
+        """
+
+        for field in ("activating_agent", "deactivating_agent"):
+            agent = event.body.get(field)
+            if isinstance(agent, dict) and "enrolment_id" in agent:
+                return agent["enrolment_id"]
+
+        return None
+
     def extract_routes(self) -> Dict[str, TopicHandler]:
         return {
             "activation-events": self._on_activation,
             "deactivation-events": self._on_deactivation,
         }
 
+    def extract_batch_routes(self) -> Dict[str, BatchTopicHandler]:
+        # only take activations in batches if the competition handles them in batches
+        if type(self).on_activation_batch is AgentEventHandler.on_activation_batch:
+            return {}
+
+        return {"activation-events": self._on_activation_batch}
+
+    def extract_partition_keys(self) -> Dict[str, PartitionKeyFunction]:
+        return {
+            "activation-events": self.get_enrolment_key,
+            "deactivation-events": self.get_enrolment_key,
+        }
+
 
 class SimpleAgentEventHandler(AgentEventHandler):
     """
@@ -87,7 +188,13 @@ class SimpleAgentEventHandler(AgentEventHandler):
     """
 
     async def on_activation(self, event: Event) -> None:
-        await self.context.schedule_evaluation([event.agent_id])
+        await self.context.schedule_evaluation([event.agent_id], lane=LANE_ACTIVATION)
+
+    async def on_activation_batch(self, events: List[AgentEvent]) -> None:
+        await self.context.schedule_evaluation_batch(
+            [SchedulableEvaluation([event.agent_id], {}) for event in events],
+            lane=LANE_ACTIVATION,
+        )
 
 
 class EvaluationEventHandler(EventHandler):
@@ -104,9 +211,30 @@ class EvaluationEventHandler(EventHandler):
 
         raise NotImplementedError
 
+    async def handle_batch(self, events: List[Event]) -> None:
+        """Handles a batch of (competition-specific) evaluation events in one go.
+
+        Competition developers may implement this method to handle many
+        evaluation events at once when the competition runner receives
+        messages in batches. By default, each event is handled with handle().
+
+        Args:
+            events (List[Event]): The DOXA events to be handled, in order.
+        """
+
+        for event in events:
+            await self.handle(event)
+
     def extract_routes(self) -> Dict[str, TopicHandler]:
         return {"evaluation-events": self.handle}
 
+    def extract_batch_routes(self) -> Dict[str, BatchTopicHandler]:
+        # only take events in batches if the competition handles them in batches
+        if type(self).handle_batch is EvaluationEventHandler.handle_batch:
+            return {}
+
+        return {"evaluation-events": self.handle_batch}
+
 
 class ApatheticEvaluationEventHandler(EvaluationEventHandler):
     """
@@ -117,6 +245,9 @@ class ApatheticEvaluationEventHandler(EvaluationEventHandler):
     async def handle(self, event: Event) -> None:
         pass
 
+    async def handle_batch(self, events: List[Event]) -> None:
+        pass
+
 
 class BatchCompletionHandler(Extension):
     def handle(self, event: Event):
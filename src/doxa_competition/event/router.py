@@ -1,22 +1,37 @@
-from typing import Dict, List, Pattern, Union
+from typing import Dict, List, Optional, Pattern, Union
 
-from doxa_competition.event.handler import TopicHandler
+from doxa_competition.event.handler import (
+    BatchTopicHandler,
+    PartitionKeyFunction,
+    TopicHandler,
+)
 
 
 class EventRouter:
     """Routes DOXA events to their respective registered handlers."""
 
     routes: Dict[str, TopicHandler]
+    batch_routes: Dict[str, BatchTopicHandler]
+    partition_keys: Dict[str, PartitionKeyFunction]
 
     def __init__(self) -> None:
         self.routes = {}
-
-    def add_route(self, topic: str, handler: TopicHandler) -> None:
+        self.batch_routes = {}
+        self.partition_keys = {}
+
+    def add_route(
+        self,
+        topic: str,
+        handler: TopicHandler,
+        partition_key: PartitionKeyFunction = None,
+    ) -> None:
         """Registers a new route.
 
         Args:
             topic (str): The topic to handle.
             handler (TopicHandler): The handler callable.
+            partition_key (PartitionKeyFunction, optional): A function returning the key
+                by which events on the topic are ordered. Defaults to None.
 
         Raises:
             ValueError: Topics cannot have multiple registered handlers.
@@ -29,6 +44,31 @@ class EventRouter:
 
         self.routes[topic] = handler
 
+        if partition_key is not None:
+            self.partition_keys[topic] = partition_key
+
+    def add_batch_route(self, topic: str, handler: BatchTopicHandler) -> None:
+        """Registers a new batch route for a topic that already has a route.
+
+        Args:
+            topic (str): The topic to handle.
+            handler (BatchTopicHandler): The batch handler callable.
+
+        Raises:
+            ValueError: Batch routes require a (per-event) route and
+                topics cannot have multiple registered batch handlers.
+        """
+
+        if topic not in self.routes:
+            raise ValueError(f"The topic '{topic}' has no associated topic handler.")
+
+        if topic in self.batch_routes:
+            raise ValueError(
+                f"The topic '{topic}' already has an associated batch topic handler."
+            )
+
+        self.batch_routes[topic] = handler
+
     def resolve(self, topic: str) -> TopicHandler:
         """Resolves a topic to a callable.
 
@@ -48,6 +88,30 @@ class EventRouter:
 
         return self.routes[topic]
 
+    def resolve_batch(self, topic: str) -> Optional[BatchTopicHandler]:
+        """Resolves a topic to its batch handler, if it has one.
+
+        Args:
+            topic (str): The topic to resolve (stripped of the "persistent://public/default/" prefix).
+
+        Returns:
+            Optional[BatchTopicHandler]: The resolved batch handler.
+        """
+
+        return self.batch_routes.get(topic)
+
+    def resolve_partition_key(self, topic: str) -> Optional[PartitionKeyFunction]:
+        """Resolves a topic to its partition key function, if it has one.
+
+        Args:
+            topic (str): The topic to resolve (stripped of the "persistent://public/default/" prefix).
+
+        Returns:
+            Optional[PartitionKeyFunction]: The resolved partition key function.
+        """
+
+        return self.partition_keys.get(topic)
+
     def get_topics(self) -> Union[List[str], Pattern]:
         """Returns a list of topics with registered handlers.
 
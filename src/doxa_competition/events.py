@@ -1,9 +1,61 @@
+from typing import List
+
 from pulsar import MessageId
 
 from doxa_competition.event import Event
 
 
+class EvaluationParticipant:
+    """A participant in an evaluation, as sent by Umpire."""
+
+    __slots__ = (
+        "participant_index",
+        "agent_id",
+        "agent_metadata",
+        "enrolment_id",
+        "endpoint",
+        "storage_endpoint",
+        "upload_id",
+        "auth_token",
+    )
+
+    participant_index: int
+    agent_id: int
+    agent_metadata: dict
+    enrolment_id: int
+    endpoint: str
+    storage_endpoint: str
+    upload_id: int
+    auth_token: str
+
+    def __init__(self, body: dict) -> None:
+        self.participant_index = body["participant_index"]
+        self.agent_id = body["agent_id"]
+        self.agent_metadata = body["agent_metadata"]
+        self.enrolment_id = body["enrolment_id"]
+        self.endpoint = body["endpoint"]
+        self.storage_endpoint = body["storage_endpoint"]
+        self.upload_id = body["upload_id"]
+        self.auth_token = body["auth_token"]
+
+
 class EvaluationEvent(Event):
+    __slots__ = (
+        "evaluation_id",
+        "competition_tag",
+        "batch_id",
+        "queued_at",
+        "participants",
+        "extra",
+    )
+
+    evaluation_id: int
+    competition_tag: str
+    batch_id: int
+    queued_at: str
+    participants: List[EvaluationParticipant]
+    extra: dict
+
     def __init__(self, body: dict) -> None:
         super().__init__(body, None, None)
 
@@ -11,7 +63,9 @@ class EvaluationEvent(Event):
         self.competition_tag = body["competition_tag"]
         self.batch_id = body["batch_id"]
         self.queued_at = body["queued_at"]
-        self.participants = body["participants"]
+        self.participants = [
+            EvaluationParticipant(participant) for participant in body["participants"]
+        ]
         self.extra = body.get("extra", {})
 
 
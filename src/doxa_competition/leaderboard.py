@@ -0,0 +1,300 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from doxa_competition.proto.umpire.scoreboard import AgentResults
+
+# agents are ordered by descending score, with ties broken by ascending agent ID
+Key = Tuple[int, int]
+
+# buckets are split once they grow to twice this size
+BUCKET_SIZE = 512
+
+
+class Leaderboard:
+    """An in-memory leaderboard ranking agents by a single metric.
+
+    Agents are kept in sorted buckets, with a Fenwick tree over the bucket sizes,
+    so that ranks can be looked up and updated in logarithmic time rather than
+    by sorting the whole scoreboard.
+
+    Ranks start from 1 for the agent with the highest score.
+    """
+
+    metric: str
+    _scores: Dict[int, int]
+    _buckets: List[List[Key]]
+    _maxes: List[Key]
+    _tree: List[int]
+
+    def __init__(self, metric: str) -> None:
+        """Creates a new empty leaderboard.
+
+        Args:
+            metric (str): The metric by which agents are ranked.
+        """
+
+        self.metric = metric
+        self._scores = {}
+        self._buckets = []
+        self._maxes = []
+        self._tree = [0]
+
+    @classmethod
+    def from_scoreboard(
+        cls, scoreboard: List[AgentResults], metric: str
+    ) -> "Leaderboard":
+        """Creates a leaderboard from a competition scoreboard, leaving out
+        any agents without a result for the metric.
+
+        Args:
+            scoreboard (List[AgentResults]): The scoreboard.
+            metric (str): The metric by which agents are ranked.
+
+        Returns:
+            Leaderboard: The leaderboard.
+        """
+
+        leaderboard = cls(metric)
+        leaderboard._scores = {
+            results.agent_id: results.results[metric]
+            for results in scoreboard
+            if metric in results.results
+        }
+
+        keys = sorted(
+            (-score, agent_id) for agent_id, score in leaderboard._scores.items()
+        )
+        leaderboard._buckets = [
+            keys[i : i + BUCKET_SIZE] for i in range(0, len(keys), BUCKET_SIZE)
+        ]
+        leaderboard._rebuild()
+
+        return leaderboard
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, agent_id: int) -> bool:
+        return agent_id in self._scores
+
+    def _rebuild(self) -> None:
+        """Rebuilds the bucket index after buckets have been split or removed."""
+
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+
+        self._tree = [0] * (len(self._buckets) + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            self._tree[i] += len(bucket)
+
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def _add_to_bucket_size(self, bucket: int, change: int) -> None:
+        i = bucket + 1
+        while i < len(self._tree):
+            self._tree[i] += change
+            i += i & -i
+
+    def _count_before(self, bucket: int) -> int:
+        """Returns the number of agents in the buckets before a given bucket."""
+
+        count = 0
+        i = bucket
+        while i > 0:
+            count += self._tree[i]
+            i -= i & -i
+
+        return count
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """Returns the bucket and the position within the bucket of the agent at an index."""
+
+        bucket = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+
+        while step:
+            if bucket + step < len(self._tree) and self._tree[bucket + step] <= index:
+                bucket += step
+                index -= self._tree[bucket]
+
+            step >>= 1
+
+        return bucket, index
+
+    def _insert(self, key: Key) -> None:
+        if not self._buckets:
+            self._buckets.append([key])
+            self._rebuild()
+            return
+
+        i = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+
+        if len(bucket) >= 2 * BUCKET_SIZE:
+            self._buckets[i : i + 1] = [bucket[:BUCKET_SIZE], bucket[BUCKET_SIZE:]]
+            self._rebuild()
+        else:
+            self._add_to_bucket_size(i, 1)
+
+    def _delete(self, key: Key) -> None:
+        i = bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect_left(bucket, key)]
+
+        if not bucket:
+            del self._buckets[i]
+            self._rebuild()
+        else:
+            self._maxes[i] = bucket[-1]
+            self._add_to_bucket_size(i, -1)
+
+    def _index(self, key: Key) -> int:
+        """Returns the number of agents ordered before a key."""
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            return len(self._scores)
+
+        return self._count_before(i) + bisect_left(self._buckets[i], key)
+
+    def _iterate(self, index: int) -> Iterator[Tuple[int, int]]:
+        """Yields agent IDs and scores in rank order starting from an index."""
+
+        if index >= len(self._scores):
+            return
+
+        bucket, position = self._locate(index)
+
+        for keys in self._buckets[bucket:]:
+            for score, agent_id in keys[position:]:
+                yield agent_id, -score
+
+            position = 0
+
+    def update(self, agent_id: int, score: int) -> None:
+        """Adds an agent to the leaderboard or updates its score.
+
+        Args:
+            agent_id (int): The agent ID.
+            score (int): The agent's result for the metric.
+        """
+
+        previous = self._scores.get(agent_id)
+        if previous == score:
+            return
+
+        if previous is not None:
+            self._delete((-previous, agent_id))
+
+        self._scores[agent_id] = score
+        self._insert((-score, agent_id))
+
+    def remove(self, agent_id: int) -> None:
+        """Removes an agent from the leaderboard if present.
+
+        Args:
+            agent_id (int): The agent ID.
+        """
+
+        score = self._scores.pop(agent_id, None)
+        if score is not None:
+            self._delete((-score, agent_id))
+
+    def score_of(self, agent_id: int) -> Optional[int]:
+        """Returns the score of an agent.
+
+        Args:
+            agent_id (int): The agent ID.
+
+        Returns:
+            Optional[int]: The score, or None if the agent is not on the leaderboard.
+        """
+
+        return self._scores.get(agent_id)
+
+    def rank_of(self, agent_id: int) -> Optional[int]:
+        """Returns the rank of an agent.
+
+        Args:
+            agent_id (int): The agent ID.
+
+        Returns:
+            Optional[int]: The rank, or None if the agent is not on the leaderboard.
+        """
+
+        score = self._scores.get(agent_id)
+        if score is None:
+            return None
+
+        return self._index((-score, agent_id)) + 1
+
+    def top_k(self, k: int) -> List[Tuple[int, int]]:
+        """Returns the highest ranked agents.
+
+        Args:
+            k (int): The number of agents.
+
+        Returns:
+            List[Tuple[int, int]]: The agent IDs and scores, in rank order.
+        """
+
+        agents = []
+        for agent in self._iterate(0):
+            if len(agents) >= k:
+                break
+
+            agents.append(agent)
+
+        return agents
+
+    def neighbours(self, agent_id: int, k: int) -> List[Tuple[int, int]]:
+        """Returns the agents ranked immediately above and below an agent,
+        e.g. for matchmaking against similarly ranked agents.
+
+        Args:
+            agent_id (int): The agent ID.
+            k (int): The maximum number of agents on either side.
+
+        Returns:
+            List[Tuple[int, int]]: The agent IDs and scores of up to k agents ranked above
+                and up to k agents ranked below the agent, in rank order and excluding the
+                agent itself, or an empty list if the agent is not on the leaderboard.
+        """
+
+        rank = self.rank_of(agent_id)
+        if rank is None:
+            return []
+
+        start = max(rank - 1 - k, 0)
+
+        agents = []
+        for agent in self._iterate(start):
+            if len(agents) >= rank - 1 - start + 1 + k:
+                break
+
+            agents.append(agent)
+
+        return [agent for agent in agents if agent[0] != agent_id]
+
+    def range(self, score_lo: int, score_hi: int) -> List[Tuple[int, int]]:
+        """Returns the agents with scores within a range.
+
+        Args:
+            score_lo (int): The lowest score (inclusive).
+            score_hi (int): The highest score (inclusive).
+
+        Returns:
+            List[Tuple[int, int]]: The agent IDs and scores, in rank order.
+        """
+
+        agents = []
+        for agent_id, score in self._iterate(self._index((-score_hi, float("-inf")))):
+            if score < score_lo:
+                break
+
+            agents.append((agent_id, score))
+
+        return agents
@@ -0,0 +1,382 @@
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# in seconds, from quick RPCs to whole evaluations
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+    math.inf,
+)
+
+SNAPSHOT_PREFIX = "metrics-"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def make_label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Metric:
+    """A metric in a registry, to which samples are recorded by label."""
+
+    __slots__ = ("registry", "name")
+
+    def __init__(self, registry: "MetricsRegistry", name: str) -> None:
+        self.registry = registry
+        self.name = name
+
+
+class Counter(Metric):
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = make_label_key(labels)
+        samples = self.registry._samples[self.name]
+        samples[key] = samples.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    def set(self, value: float, **labels: str) -> None:
+        self.registry._samples[self.name][make_label_key(labels)] = value
+
+
+class Histogram(Metric):
+    def observe(self, value: float, **labels: str) -> None:
+        key = make_label_key(labels)
+        samples = self.registry._samples[self.name]
+
+        sample = samples.get(key)
+        if sample is None:
+            buckets = self.registry._buckets[self.name]
+            sample = samples[key] = {"buckets": [0] * len(buckets), "sum": 0.0}
+
+        for i, bound in enumerate(self.registry._buckets[self.name]):
+            if value <= bound:
+                sample["buckets"][i] += 1
+                break
+
+        sample["sum"] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes the time taken by a block of code, even if it raises an exception."""
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+
+class MetricsRegistry:
+    """Holds the metrics of a process, which can be written to a snapshot file
+    so that the metrics of several worker processes can be aggregated."""
+
+    _types: Dict[str, Tuple[str, str]]
+    _buckets: Dict[str, Sequence[float]]
+    _samples: Dict[str, dict]
+    _collectors: List[Callable[[], None]]
+
+    def __init__(self) -> None:
+        self._types = {}
+        self._buckets = {}
+        self._samples = {}
+        self._collectors = []
+
+    def _declare(self, name: str, metric_type: str, description: str) -> None:
+        if name in self._types:
+            raise ValueError(f"The metric {name} has already been declared.")
+
+        self._types[name] = (metric_type, description)
+        self._samples[name] = {}
+
+    def counter(self, name: str, description: str) -> Counter:
+        self._declare(name, "counter", description)
+        return Counter(self, name)
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        self._declare(name, "gauge", description)
+        return Gauge(self, name)
+
+    def histogram(
+        self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        if not buckets or buckets[-1] != math.inf:
+            buckets = tuple(buckets) + (math.inf,)
+
+        self._declare(name, "histogram", description)
+        self._buckets[name] = tuple(buckets)
+        return Histogram(self, name)
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Adds a function that updates metrics (e.g. gauges) just before each snapshot.
+
+        Args:
+            collector (Callable[[], None]): The collector.
+        """
+
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        """Returns the current value of every metric in a JSON-serialisable form.
+
+        Returns:
+            dict: The snapshot.
+        """
+
+        for collector in self._collectors:
+            collector()
+
+        return {
+            "pid": os.getpid(),
+            "metrics": {
+                name: {
+                    "type": metric_type,
+                    "help": description,
+                    "buckets": [
+                        "+Inf" if bound == math.inf else bound
+                        for bound in self._buckets.get(name, ())
+                    ],
+                    "samples": [
+                        [dict(key), value] for key, value in self._samples[name].items()
+                    ],
+                }
+                for name, (metric_type, description) in self._types.items()
+            },
+        }
+
+    def write_snapshot(self, directory: str) -> str:
+        """Writes a snapshot to a file named after the process in a directory
+        shared by the worker processes, replacing any earlier snapshot.
+
+        Args:
+            directory (str): The directory.
+
+        Returns:
+            str: The path to the snapshot file.
+        """
+
+        path = os.path.join(directory, f"{SNAPSHOT_PREFIX}{os.getpid()}.json")
+        temporary_path = f"{path}.tmp"
+
+        with open(temporary_path, "w") as f:
+            json.dump(self.snapshot(), f)
+
+        # readers never see a partially written snapshot
+        os.replace(temporary_path, path)
+        return path
+
+
+def is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+def read_snapshots(directory: str) -> List[dict]:
+    """Reads every snapshot in a directory.
+
+    Args:
+        directory (str): The directory.
+
+    Returns:
+        List[dict]: The snapshots.
+    """
+
+    snapshots = []
+
+    for filename in os.listdir(directory):
+        if not filename.startswith(SNAPSHOT_PREFIX) or not filename.endswith(".json"):
+            continue
+
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    return snapshots
+
+
+def clear_snapshots(directory: str) -> None:
+    """Removes every snapshot in a directory, e.g. those left by an earlier run.
+
+    Args:
+        directory (str): The directory.
+    """
+
+    for filename in os.listdir(directory):
+        if filename.startswith(SNAPSHOT_PREFIX):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+
+
+def aggregate_snapshots(snapshots: List[dict]) -> dict:
+    """Aggregates the snapshots of several processes by summing samples with the
+    same labels. Counters and histograms of processes that have exited are kept,
+    but their gauges are dropped.
+
+    Args:
+        snapshots (List[dict]): The snapshots.
+
+    Returns:
+        dict: The aggregated snapshot.
+    """
+
+    metrics: Dict[str, dict] = {}
+    values: Dict[str, Dict[LabelKey, object]] = {}
+
+    for snapshot in snapshots:
+        alive = is_process_alive(snapshot.get("pid", 0))
+
+        for name, metric in snapshot["metrics"].items():
+            if name not in metrics:
+                metrics[name] = {**metric, "samples": []}
+                values[name] = {}
+
+            if metric["type"] == "gauge" and not alive:
+                continue
+
+            for labels, value in metric["samples"]:
+                key = make_label_key(labels)
+                existing = values[name].get(key)
+
+                if existing is None:
+                    values[name][key] = (
+                        {"buckets": list(value["buckets"]), "sum": value["sum"]}
+                        if isinstance(value, dict)
+                        else value
+                    )
+                elif isinstance(value, dict):
+                    existing["buckets"] = [
+                        a + b for a, b in zip(existing["buckets"], value["buckets"])
+                    ]
+                    existing["sum"] += value["sum"]
+                else:
+                    values[name][key] = existing + value
+
+    for name, metric in metrics.items():
+        metric["samples"] = [[dict(key), value] for key, value in values[name].items()]
+
+    return {"metrics": metrics}
+
+
+def format_labels(
+    labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None
+) -> str:
+    items = sorted(labels.items())
+    if extra is not None:
+        items.append(extra)
+
+    if not items:
+        return ""
+
+    escaped = (
+        (
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in items
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshot: dict) -> str:
+    """Renders a snapshot in the Prometheus text exposition format.
+
+    Args:
+        snapshot (dict): The snapshot.
+
+    Returns:
+        str: The rendered metrics.
+    """
+
+    lines = []
+
+    for name, metric in sorted(snapshot["metrics"].items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+
+        for labels, value in metric["samples"]:
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+                continue
+
+            # buckets are stored individually but exposed cumulatively
+            count = 0
+            for bound, bucket in zip(metric["buckets"], value["buckets"]):
+                count += bucket
+                lines.append(
+                    f"{name}_bucket{format_labels(labels, ('le', str(bound)))} {count}"
+                )
+
+            lines.append(
+                f"{name}_sum{format_labels(labels)} {format_value(value['sum'])}"
+            )
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+EVALUATIONS_RUNNING = REGISTRY.gauge(
+    "doxa_evaluations_running", "The number of evaluations currently running."
+)
+EVALUATIONS_QUEUED = REGISTRY.gauge(
+    "doxa_evaluations_queued", "The number of admitted evaluations waiting for a slot."
+)
+EVALUATIONS_ADMITTED = REGISTRY.counter(
+    "doxa_evaluations_admitted_total", "The number of evaluations admitted."
+)
+EVALUATIONS_REJECTED = REGISTRY.counter(
+    "doxa_evaluations_rejected_total",
+    "The number of evaluations rejected, by competition and HTTP status.",
+)
+EVALUATION_PHASE_SECONDS = REGISTRY.histogram(
+    "doxa_evaluation_phase_seconds",
+    "The time taken by each phase of evaluations (fetch_agents, handle, release and complete).",
+)
+EVALUATION_ERRORS = REGISTRY.counter(
+    "doxa_evaluation_errors_total",
+    "The number of errors in evaluations, by _ERROR event type.",
+)
+NODE_RPC_SECONDS = REGISTRY.histogram(
+    "doxa_node_rpc_seconds", "The latency of unary RPCs to Hearth nodes."
+)
+NODE_RPC_ERRORS = REGISTRY.counter(
+    "doxa_node_rpc_errors_total", "The number of failed unary RPCs to Hearth nodes."
+)
+PULSAR_PUBLISH_SECONDS = REGISTRY.histogram(
+    "doxa_pulsar_publish_seconds",
+    "The time taken to publish evaluation events to Pulsar.",
+)
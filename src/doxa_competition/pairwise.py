@@ -0,0 +1,297 @@
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from doxa_competition.proto.umpire.evaluation import EvaluationResult
+from doxa_competition.ratings import Outcome
+from doxa_competition.utils import import_numpy
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class PairwiseMatrix:
+    """A sparse matrix of head-to-head records between agents, maintained
+    incrementally as evaluation outcomes arrive.
+
+    Records are only kept for pairs of agents that have actually played each other,
+    in a dictionary of opponents for each agent, so looking up the record between two
+    agents takes constant time and memory grows with the number of distinct pairings
+    rather than with the square of the number of agents. Queries over all opponents
+    of an agent return NumPy arrays indexed by a dense mapping of agent IDs.
+    """
+
+    pending_ttl: float
+    max_tracked: int
+    _index: Dict[int, int]
+    _agent_ids: List[int]
+    # maps each agent's index to its wins, draws and losses against each opponent's index
+    _records: Dict[int, Dict[int, List[int]]]
+    _pending: "OrderedDict[int, Tuple[float, Dict[int, float]]]"
+    _finished: "OrderedDict[int, None]"
+
+    def __init__(self, pending_ttl: float = 3600.0, max_tracked: int = 100000) -> None:
+        """Creates a new pairwise matrix.
+
+        Args:
+            pending_ttl (float, optional): The time in seconds after which an evaluation
+                still missing results (e.g. because an agent errored) is dropped.
+                Defaults to 3600.
+            max_tracked (int, optional): The maximum number of incomplete evaluations and
+                of recorded evaluation IDs remembered, beyond which the oldest are dropped.
+                Defaults to 100000.
+        """
+
+        self._np = import_numpy()
+        self.pending_ttl = pending_ttl
+        self.max_tracked = max_tracked
+        self._index = {}
+        self._agent_ids = []
+        self._records = {}
+        self._pending = OrderedDict()
+        self._finished = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._agent_ids)
+
+    def __contains__(self, agent_id: int) -> bool:
+        return agent_id in self._index
+
+    def index_of(self, agent_id: int) -> int:
+        """Returns the dense index of an agent, adding the agent if it is new.
+
+        Args:
+            agent_id (int): The agent ID.
+
+        Returns:
+            int: The index.
+        """
+
+        index = self._index.get(agent_id)
+        if index is None:
+            index = self._index[agent_id] = len(self._agent_ids)
+            self._agent_ids.append(agent_id)
+            self._records[index] = {}
+
+        return index
+
+    def _add_game(self, a: int, b: int, draw: bool) -> None:
+        # the record is kept from both sides so that either row can be read directly
+        record = self._records[a].setdefault(b, [0, 0, 0])
+        opponent_record = self._records[b].setdefault(a, [0, 0, 0])
+
+        if draw:
+            record[1] += 1
+            opponent_record[1] += 1
+        else:
+            record[0] += 1
+            opponent_record[2] += 1
+
+    def add_outcomes(self, outcomes: Iterable[Outcome]) -> None:
+        """Records the outcomes of evaluations, in which agents with higher scores
+        beat agents with lower scores and agents with equal scores draw.
+
+        Args:
+            outcomes (Iterable[Outcome]): The outcomes.
+        """
+
+        for outcome in outcomes:
+            participants = [
+                (self.index_of(agent_id), score)
+                for agent_id, score in outcome.scores.items()
+            ]
+
+            for i, (a, score_a) in enumerate(participants):
+                for b, score_b in participants[i + 1 :]:
+                    if score_a >= score_b:
+                        self._add_game(a, b, draw=score_a == score_b)
+                    else:
+                        self._add_game(b, a, draw=False)
+
+    def add_results(
+        self, results: Iterable[EvaluationResult], metric: str, participants: int = 2
+    ) -> int:
+        """Records the outcomes of evaluations from their results, e.g. as they are
+        fetched from Umpire page by page.
+
+        Results for an evaluation may be spread across calls: an evaluation is only
+        recorded once there are results for the given number of participants. Results
+        for an evaluation that has already been recorded are ignored, and evaluations
+        still missing results after `pending_ttl` seconds are dropped.
+
+        Args:
+            results (Iterable[EvaluationResult]): The evaluation results.
+            metric (str): The metric giving each agent's score in an evaluation.
+            participants (int, optional): The number of agents in each evaluation. Defaults to 2.
+
+        Returns:
+            int: The number of evaluations recorded.
+        """
+
+        complete = []
+        now = time.monotonic()
+
+        for result in results:
+            if result.metric != metric or result.evaluation_id in self._finished:
+                continue
+
+            pending = self._pending.get(result.evaluation_id)
+            if pending is None:
+                pending = self._pending[result.evaluation_id] = (now, {})
+
+            scores = pending[1]
+            scores[result.agent_id] = result.result
+
+            if len(scores) >= participants:
+                del self._pending[result.evaluation_id]
+                self._finish(result.evaluation_id)
+                complete.append(Outcome(scores))
+
+        self._evict_pending(now)
+        self.add_outcomes(complete)
+        return len(complete)
+
+    def _finish(self, evaluation_id: int) -> None:
+        self._finished[evaluation_id] = None
+
+        while len(self._finished) > self.max_tracked:
+            self._finished.popitem(last=False)
+
+    def _evict_pending(self, now: float) -> None:
+        # evaluations are kept in the order their first result arrived
+        while self._pending:
+            evaluation_id, (first_seen, _) = next(iter(self._pending.items()))
+
+            if (
+                now - first_seen < self.pending_ttl
+                and len(self._pending) <= self.max_tracked
+            ):
+                break
+
+            del self._pending[evaluation_id]
+            self._finish(evaluation_id)
+
+    def pending(self) -> int:
+        """Returns the number of evaluations still missing results.
+
+        Returns:
+            int: The number of evaluations.
+        """
+
+        return len(self._pending)
+
+    def record(self, agent_id: int, opponent_id: int) -> Tuple[int, int, int]:
+        """Returns the head-to-head record of an agent against an opponent.
+
+        Args:
+            agent_id (int): The agent ID.
+            opponent_id (int): The opponent's agent ID.
+
+        Returns:
+            Tuple[int, int, int]: The number of wins, draws and losses of the agent.
+        """
+
+        a = self._index.get(agent_id)
+        b = self._index.get(opponent_id)
+        if a is None or b is None:
+            return 0, 0, 0
+
+        wins, draws, losses = self._records[a].get(b, (0, 0, 0))
+        return wins, draws, losses
+
+    def games_between(self, agent_id: int, opponent_id: int) -> int:
+        """Returns the number of games played between two agents.
+
+        Args:
+            agent_id (int): The agent ID.
+            opponent_id (int): The opponent's agent ID.
+
+        Returns:
+            int: The number of games.
+        """
+
+        return sum(self.record(agent_id, opponent_id))
+
+    def games_against(self, agent_id: int) -> "np.ndarray":
+        """Returns the number of games an agent has played against every agent,
+        in the order of `agent_ids`.
+
+        Args:
+            agent_id (int): The agent ID.
+
+        Returns:
+            np.ndarray: The number of games against each agent.
+        """
+
+        np = self._np
+
+        games = np.zeros(len(self._agent_ids), dtype=np.int32)
+        a = self._index.get(agent_id)
+        if a is None or not self._records[a]:
+            return games
+
+        row = self._records[a]
+        games[np.fromiter(row.keys(), dtype=np.int64, count=len(row))] = np.fromiter(
+            (sum(record) for record in row.values()), dtype=np.int32, count=len(row)
+        )
+
+        return games
+
+    @property
+    def agent_ids(self) -> List[int]:
+        return self._agent_ids
+
+    def least_played_opponents(
+        self,
+        agent_id: int,
+        k: int,
+        candidates: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, int]]:
+        """Returns the opponents an agent has played the fewest games against,
+        e.g. so as to schedule evaluations that fill gaps in coverage.
+
+        Args:
+            agent_id (int): The agent ID.
+            k (int): The number of opponents.
+            candidates (Optional[Iterable[int]], optional): The agent IDs of the possible
+                opponents (e.g. the active agents), which may include agents that have not
+                played at all. Defaults to every other agent that has played.
+
+        Returns:
+            List[Tuple[int, int]]: The agent IDs of the opponents and the number of games
+                played against each, from the fewest games to the most.
+        """
+
+        np = self._np
+
+        if candidates is None:
+            opponent_ids = np.array(self._agent_ids, dtype=np.int64)
+            games = self.games_against(agent_id)
+        else:
+            opponent_ids = np.fromiter(candidates, dtype=np.int64)
+
+            # agents without a row have not played anyone yet
+            indices = np.array(
+                [
+                    self._index.get(opponent_id, -1)
+                    for opponent_id in opponent_ids.tolist()
+                ],
+                dtype=np.int64,
+            )
+            known = indices >= 0
+
+            games = np.zeros(len(opponent_ids), dtype=np.int32)
+            games[known] = self.games_against(agent_id)[indices[known]]
+
+        mask = opponent_ids != agent_id
+        opponent_ids = opponent_ids[mask]
+        games = games[mask]
+
+        k = min(k, len(opponent_ids))
+        if k <= 0:
+            return []
+
+        # a stable sort keeps ties in the order the opponents were given
+        order = np.argsort(games, kind="stable")[:k]
+
+        return list(zip(opponent_ids[order].tolist(), games[order].tolist()))
@@ -0,0 +1,413 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import pulsar
+
+DEFAULT_MAX_PRODUCERS = 64
+DEFAULT_IDLE_TIMEOUT = 5 * 60  # 5 minutes
+
+
+@dataclass
+class BatchingPolicy:
+    """Determines how messages sent asynchronously are batched by Pulsar producers.
+
+    A batch is published as soon as any one of its limits is reached.
+
+    Attributes:
+        max_messages (int): The maximum number of messages in a batch.
+        max_bytes (int): The maximum size of a batch in bytes.
+        max_delay (float): The maximum time in seconds a message waits to be published.
+    """
+
+    max_messages: int = 1000
+    max_bytes: int = 128 * 1024
+    max_delay: float = 0.01
+
+    def get_producer_options(self) -> dict:
+        """Returns the corresponding options for creating a Pulsar producer.
+
+        Returns:
+            dict: The producer options.
+        """
+
+        return {
+            "batching_enabled": True,
+            "batching_max_messages": self.max_messages,
+            "batching_max_allowed_size_in_bytes": self.max_bytes,
+            "batching_max_publish_delay_ms": max(int(self.max_delay * 1000), 1),
+        }
+
+
+class PublishError(Exception):
+    """Raised when a message sent asynchronously could not be published."""
+
+    def __init__(self, topic: str, result: pulsar.Result, *args: object) -> None:
+        super().__init__(f"Unable to publish a message to {topic}: {result}.", *args)
+        self.topic = topic
+        self.result = result
+
+
+def send_pulsar_message_async(
+    producer: pulsar.Producer,
+    body: dict,
+    properties: dict,
+    partition_key: str = None,
+) -> asyncio.Future:
+    """Sends a JSON-encoded Pulsar message without blocking the event loop.
+
+    Args:
+        producer (pulsar.Producer): The producer.
+        body (dict): The JSON message to be encoded.
+        properties (dict): Any additional message properties.
+        partition_key (str, optional): The message key. Defaults to None.
+
+    Returns:
+        asyncio.Future: Resolves to the message ID once the message has been
+            published, or fails with a PublishError.
+    """
+
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+    topic = producer.topic()
+
+    def resolve(result: pulsar.Result, message_id: pulsar.MessageId) -> None:
+        if future.cancelled():
+            return
+
+        if result == pulsar.Result.Ok:
+            future.set_result(message_id)
+        else:
+            future.set_exception(PublishError(topic, result))
+
+    # the callback is called from one of the Pulsar client's threads
+    producer.send_async(
+        json.dumps(body).encode("utf-8"),
+        lambda result, message_id: loop.call_soon_threadsafe(
+            resolve, result, message_id
+        ),
+        properties,
+        partition_key=partition_key,
+    )
+
+    return future
+
+
+class PublishTracker:
+    """Keeps track of messages sent asynchronously until they are published."""
+
+    _futures: Set[asyncio.Future]
+
+    def __init__(self) -> None:
+        self._futures = set()
+
+    def track(self, future: asyncio.Future) -> asyncio.Future:
+        """Tracks a pending message.
+
+        Args:
+            future (asyncio.Future): The future of the message being published.
+
+        Returns:
+            asyncio.Future: The same future.
+        """
+
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        return future
+
+    def pending(self) -> int:
+        """Returns the number of messages that have not been published yet.
+
+        Returns:
+            int: The number of pending messages.
+        """
+
+        return len(self._futures)
+
+    async def wait(self) -> None:
+        """Waits for every pending message to be published.
+
+        Raises:
+            PublishError: Raised with the first failure if any message could not be published.
+        """
+
+        if not self._futures:
+            return
+
+        results = await asyncio.gather(*self._futures, return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+
+def chain_future(source: asyncio.Future, target: asyncio.Future) -> None:
+    """Resolves a future with the outcome of another once it is done.
+
+    Args:
+        source (asyncio.Future): The future whose outcome is copied.
+        target (asyncio.Future): The future resolved.
+    """
+
+    def copy(source: asyncio.Future) -> None:
+        if target.done():
+            return
+
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    source.add_done_callback(copy)
+
+
+def log_publish_error(future: asyncio.Future) -> None:
+    """Logs the failure of a message sent asynchronously on behalf of a caller
+    that does not wait for it, e.g. as a done callback.
+
+    Args:
+        future (asyncio.Future): The future of the message being published.
+    """
+
+    if not future.cancelled() and future.exception() is not None:
+        print(f"[ERROR] {str(future.exception())}")
+
+
+# a message waiting for its topic's producer to be created
+WaitingMessage = Tuple[dict, dict, Optional[str], asyncio.Future]
+
+
+class ProducerPool:
+    """A pool of long-lived Pulsar producers keyed by topic.
+
+    Creating a producer involves a topic lookup and a handshake with the broker,
+    so producers are kept around for reuse. Producers that have not been used for
+    a while, or that are the least recently used once the pool is full, are closed.
+
+    When sending asynchronously, producers are created and closed off the event loop,
+    since both block until the broker responds.
+    """
+
+    max_producers: int
+    idle_timeout: float
+    batching: Optional[BatchingPolicy]
+    _client: pulsar.Client
+    _producers: "OrderedDict[str, Tuple[pulsar.Producer, float]]"
+    _waiting: Dict[str, List[WaitingMessage]]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        client: pulsar.Client,
+        max_producers: int = DEFAULT_MAX_PRODUCERS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        batching: Optional[BatchingPolicy] = None,
+    ) -> None:
+        """Creates a new producer pool.
+
+        Args:
+            client (pulsar.Client): The Pulsar client owning the producers.
+            max_producers (int, optional): The maximum number of open producers. Defaults to 64.
+            idle_timeout (float, optional): The time in seconds after which unused producers
+                are closed. Defaults to 5 minutes.
+            batching (Optional[BatchingPolicy], optional): How messages sent asynchronously
+                are batched, if at all. Defaults to None.
+        """
+
+        if max_producers < 1:
+            raise ValueError("The pool must allow at least one producer.")
+
+        self.max_producers = max_producers
+        self.idle_timeout = idle_timeout
+        self.batching = batching
+        self._client = client
+        self._producers = OrderedDict()
+        self._waiting = {}
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> List[Tuple[str, pulsar.Producer]]:
+        evicted = []
+
+        # producers are kept in order of last use, so idle ones are at the front
+        while self._producers:
+            topic, (producer, last_used) = next(iter(self._producers.items()))
+
+            if (
+                len(self._producers) < self.max_producers
+                and now - last_used < self.idle_timeout
+            ):
+                break
+
+            del self._producers[topic]
+            evicted.append((topic, producer))
+
+        return evicted
+
+    def _close_producers(self, producers: List[Tuple[str, pulsar.Producer]]) -> None:
+        for topic, producer in producers:
+            self._close_producer(topic, producer)
+
+    def _close_producer(self, topic: str, producer: pulsar.Producer) -> None:
+        try:
+            producer.close()
+        except Exception as e:
+            print(f"[ERROR] Unable to close the producer for {topic}: {str(e)}")
+
+    def get(self, topic: str) -> pulsar.Producer:
+        """Returns a producer for a topic, creating one if necessary.
+
+        Args:
+            topic (str): The full topic name.
+
+        Returns:
+            pulsar.Producer: The producer.
+        """
+
+        now = time.monotonic()
+        evicted = []
+
+        with self._lock:
+            if topic in self._producers:
+                producer, _ = self._producers.pop(topic)
+            else:
+                evicted = self._evict(now)
+                producer = self._client.create_producer(
+                    topic,
+                    **(
+                        self.batching.get_producer_options()
+                        if self.batching is not None
+                        else {}
+                    ),
+                )
+
+            self._producers[topic] = (producer, now)
+
+        if evicted:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # already off the event loop
+                self._close_producers(evicted)
+            else:
+                loop.run_in_executor(None, self._close_producers, evicted)
+
+        return producer
+
+    def _get_existing(self, topic: str) -> Optional[pulsar.Producer]:
+        with self._lock:
+            entry = self._producers.pop(topic, None)
+            if entry is None:
+                return None
+
+            self._producers[topic] = (entry[0], time.monotonic())
+            return entry[0]
+
+    def send(
+        self, topic: str, body: dict, properties: dict, partition_key: str = None
+    ) -> None:
+        """Sends a JSON-encoded Pulsar message for a given topic.
+
+        Args:
+            topic (str): The full topic name.
+            body (dict): The JSON message to be encoded.
+            properties (dict): Any additional message properties.
+            partition_key (str, optional): The message key. Defaults to None.
+        """
+
+        self.get(topic).send(
+            json.dumps(body).encode("utf-8"), properties, partition_key=partition_key
+        )
+
+    def send_async(
+        self, topic: str, body: dict, properties: dict, partition_key: str = None
+    ) -> asyncio.Future:
+        """Sends a JSON-encoded Pulsar message for a given topic without
+        blocking the event loop.
+
+        Args:
+            topic (str): The full topic name.
+            body (dict): The JSON message to be encoded.
+            properties (dict): Any additional message properties.
+            partition_key (str, optional): The message key. Defaults to None.
+
+        Returns:
+            asyncio.Future: Resolves to the message ID once the message has been
+                published, or fails with a PublishError.
+        """
+
+        # messages sent while the producer is being created wait behind it in order
+        producer = self._get_existing(topic) if topic not in self._waiting else None
+        if producer is not None:
+            return send_pulsar_message_async(
+                producer, body, properties, partition_key=partition_key
+            )
+
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+
+        waiting = self._waiting.get(topic)
+        if waiting is None:
+            waiting = self._waiting[topic] = []
+
+            creating = loop.run_in_executor(None, self.get, topic)
+            creating.add_done_callback(
+                lambda creating: self._send_waiting(topic, creating)
+            )
+
+        waiting.append((body, properties, partition_key, future))
+        return future
+
+    def _send_waiting(self, topic: str, creating: asyncio.Future) -> None:
+        waiting = self._waiting.pop(topic)
+
+        try:
+            producer = creating.result()
+        except BaseException as e:
+            for _, _, _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+
+            return
+
+        for body, properties, partition_key, future in waiting:
+            chain_future(
+                send_pulsar_message_async(
+                    producer, body, properties, partition_key=partition_key
+                ),
+                future,
+            )
+
+    def flush(self) -> None:
+        """Publishes any batched messages, blocking until they have been persisted."""
+
+        with self._lock:
+            producers = list(self._producers.items())
+
+        for topic, (producer, _) in producers:
+            try:
+                producer.flush()
+            except Exception as e:
+                print(f"[ERROR] Unable to flush the producer for {topic}: {str(e)}")
+
+    def evict_idle(self) -> None:
+        """Closes any producers that have been idle for longer than the idle timeout."""
+
+        with self._lock:
+            evicted = self._evict(time.monotonic())
+
+        self._close_producers(evicted)
+
+    def close(self) -> None:
+        """Closes every producer in the pool."""
+
+        with self._lock:
+            producers, self._producers = self._producers, OrderedDict()
+
+        for topic, (producer, _) in producers.items():
+            self._close_producer(topic, producer)
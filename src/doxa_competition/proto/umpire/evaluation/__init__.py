@@ -4,6 +4,7 @@
 from dataclasses import dataclass
 from typing import (
     TYPE_CHECKING,
+    AsyncIterator,
     Dict,
     List,
     Optional,
@@ -32,12 +33,33 @@ class EvaluationResult(betterproto.Message):
 
 @dataclass(eq=False, repr=False)
 class GetCompetitionEvaluationResultsRequest(betterproto.Message):
+    """
+    Results are returned in order of ascending ID. When streaming, each
+    response holds up to page_size results.
+    """
+
     competition_tag: str = betterproto.string_field(1)
+    after_id: int = betterproto.int32_field(2)
+    """Only results with a greater ID are returned (0 for all results)."""
+
+    since: str = betterproto.string_field(3)
+    """
+    Only results created at or after this ISO 8601 time are returned (empty for
+    all results).
+    """
+
+    page_size: int = betterproto.int32_field(4)
+    """The maximum number of results per response (0 for no limit)."""
 
 
 @dataclass(eq=False, repr=False)
 class GetCompetitionEvaluationResultsResponse(betterproto.Message):
     results: List["EvaluationResult"] = betterproto.message_field(1)
+    next_after_id: int = betterproto.int32_field(2)
+    """
+    The after_id with which to request the next page, or 0 if there are no more
+    results.
+    """
 
 
 @dataclass(eq=False, repr=False)
@@ -71,6 +93,24 @@ class UmpireEvaluationServiceStub(betterproto.ServiceStub):
             metadata=metadata,
         )
 
+    async def stream_competition_evaluation_results(
+        self,
+        get_competition_evaluation_results_request: "GetCompetitionEvaluationResultsRequest",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> AsyncIterator["GetCompetitionEvaluationResultsResponse"]:
+        async for response in self._unary_stream(
+            "/umpire.evaluation.UmpireEvaluationService/StreamCompetitionEvaluationResults",
+            get_competition_evaluation_results_request,
+            GetCompetitionEvaluationResultsResponse,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        ):
+            yield response
+
     async def set_evaluation_result(
         self,
         set_evaluation_result_request: "SetEvaluationResultRequest",
@@ -96,6 +136,13 @@ class UmpireEvaluationServiceBase(ServiceBase):
     ) -> "GetCompetitionEvaluationResultsResponse":
         raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
 
+    async def stream_competition_evaluation_results(
+        self,
+        get_competition_evaluation_results_request: "GetCompetitionEvaluationResultsRequest",
+    ) -> AsyncIterator["GetCompetitionEvaluationResultsResponse"]:
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+        yield GetCompetitionEvaluationResultsResponse()
+
     async def set_evaluation_result(
         self, set_evaluation_result_request: "SetEvaluationResultRequest"
     ) -> "SetEvaluationResultResponse":
@@ -109,6 +156,17 @@ class UmpireEvaluationServiceBase(ServiceBase):
         response = await self.get_competition_evaluation_results(request)
         await stream.send_message(response)
 
+    async def __rpc_stream_competition_evaluation_results(
+        self,
+        stream: "grpclib.server.Stream[GetCompetitionEvaluationResultsRequest, GetCompetitionEvaluationResultsResponse]",
+    ) -> None:
+        request = await stream.recv_message()
+        await self._call_rpc_handler_server_stream(
+            self.stream_competition_evaluation_results,
+            stream,
+            request,
+        )
+
     async def __rpc_set_evaluation_result(
         self,
         stream: "grpclib.server.Stream[SetEvaluationResultRequest, SetEvaluationResultResponse]",
@@ -125,6 +183,12 @@ class UmpireEvaluationServiceBase(ServiceBase):
                 GetCompetitionEvaluationResultsRequest,
                 GetCompetitionEvaluationResultsResponse,
             ),
+            "/umpire.evaluation.UmpireEvaluationService/StreamCompetitionEvaluationResults": grpclib.const.Handler(
+                self.__rpc_stream_competition_evaluation_results,
+                grpclib.const.Cardinality.UNARY_STREAM,
+                GetCompetitionEvaluationResultsRequest,
+                GetCompetitionEvaluationResultsResponse,
+            ),
             "/umpire.evaluation.UmpireEvaluationService/SetEvaluationResult": grpclib.const.Handler(
                 self.__rpc_set_evaluation_result,
                 grpclib.const.Cardinality.UNARY_UNARY,
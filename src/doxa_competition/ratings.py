@@ -0,0 +1,460 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from doxa_competition.context import CompetitionContext
+from doxa_competition.event import Event
+from doxa_competition.proto.umpire.evaluation import EvaluationResult
+from doxa_competition.results import AgentResultUpdate
+from doxa_competition.utils import import_numpy
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+@dataclass
+class Outcome:
+    """The outcome of an evaluation, in which agents with higher scores beat agents
+    with lower scores and agents with equal scores draw.
+
+    Attributes:
+        scores (Dict[int, float]): The score of each participating agent.
+    """
+
+    scores: Dict[int, float]
+
+
+def outcomes_from_evaluation_results(
+    results: Iterable[EvaluationResult], metric: str
+) -> List[Outcome]:
+    """Forms evaluation outcomes from evaluation results, e.g. those returned by
+    `CompetitionContext.get_competition_evaluation_results`.
+
+    Args:
+        results (Iterable[EvaluationResult]): The evaluation results.
+        metric (str): The metric giving each agent's score in an evaluation.
+
+    Returns:
+        List[Outcome]: The outcomes, in order of evaluation ID.
+    """
+
+    scores: Dict[int, Dict[int, float]] = defaultdict(dict)
+    for result in results:
+        if result.metric == metric:
+            scores[result.evaluation_id][result.agent_id] = result.result
+
+    return [Outcome(scores[evaluation_id]) for evaluation_id in sorted(scores)]
+
+
+def outcomes_from_evaluation_events(
+    events: Iterable[Event], event_type: str, key: str = "scores"
+) -> List[Outcome]:
+    """Forms evaluation outcomes from the events handled by an `EvaluationEventHandler`,
+    e.g. a batch of events given to `handle_batch`.
+
+    Only events of the given type are used, whose bodies should hold the score of each
+    agent keyed by agent ID, as emitted by an evaluation driver with
+    `self.emit_evaluation_event(event_type, {key: {agent_id: score, ...}})`.
+
+    Args:
+        events (Iterable[Event]): The evaluation events.
+        event_type (str): The type of the events giving the scores at the end of an evaluation.
+        key (str, optional): The key in the event body under which scores are given.
+            Defaults to "scores".
+
+    Returns:
+        List[Outcome]: The outcomes, in the order of the events.
+    """
+
+    outcomes = []
+
+    for event in events:
+        if event.body.get("event_type") != event_type:
+            continue
+
+        scores = event.body.get("body", {}).get(key)
+        if not scores:
+            continue
+
+        # agent IDs become strings as JSON object keys
+        outcomes.append(
+            Outcome({int(agent_id): float(score) for agent_id, score in scores.items()})
+        )
+
+    return outcomes
+
+
+class RatingSystem:
+    """The base class for rating systems keeping ratings in NumPy arrays indexed by
+    a dense mapping of agent IDs.
+
+    Each batch of outcomes is split into pairwise games, and every agent's rating is
+    updated at once from the ratings at the start of the batch, rather than replaying
+    the games one by one.
+    """
+
+    metric: str
+    _index: Dict[int, int]
+    _agent_ids: List[int]
+    _ratings: "np.ndarray"
+    _changed: "np.ndarray"
+
+    def __init__(self, metric: str = "rating") -> None:
+        """Creates a new rating system.
+
+        Args:
+            metric (str, optional): The agent result metric under which ratings are
+                written. Defaults to "rating".
+        """
+
+        self._np = import_numpy()
+        self.metric = metric
+        self._index = {}
+        self._agent_ids = []
+        self._ratings = self._np.zeros(0)
+        self._changed = self._np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._agent_ids)
+
+    def __contains__(self, agent_id: int) -> bool:
+        return agent_id in self._index
+
+    def _grow(self, size: int) -> None:
+        """Extends the arrays to hold ratings for a number of agents."""
+
+        self._ratings = self._np.concatenate(
+            [self._ratings, self._np.full(size - len(self._ratings), self.initial())]
+        )
+        self._changed = self._np.concatenate(
+            [self._changed, self._np.zeros(size - len(self._changed), dtype=bool)]
+        )
+
+    def initial(self) -> float:
+        """Returns the rating of a new agent.
+
+        Returns:
+            float: The initial rating.
+        """
+
+        raise NotImplementedError()
+
+    def index_of(self, agent_id: int) -> int:
+        """Returns the dense index of an agent, adding the agent if it is new.
+
+        Args:
+            agent_id (int): The agent ID.
+
+        Returns:
+            int: The index.
+        """
+
+        index = self._index.get(agent_id)
+        if index is None:
+            index = self._index[agent_id] = len(self._agent_ids)
+            self._agent_ids.append(agent_id)
+
+            if index >= len(self._ratings):
+                self._grow(max(2 * len(self._ratings), 16))
+
+        return index
+
+    def rating_of(self, agent_id: int) -> Optional[float]:
+        """Returns the rating of an agent.
+
+        Args:
+            agent_id (int): The agent ID.
+
+        Returns:
+            Optional[float]: The rating, or None if the agent has not been rated yet.
+        """
+
+        index = self._index.get(agent_id)
+        return float(self._ratings[index]) if index is not None else None
+
+    def set_rating(self, agent_id: int, rating: float) -> None:
+        """Sets the rating of an agent, e.g. when restoring ratings written previously.
+
+        Args:
+            agent_id (int): The agent ID.
+            rating (float): The rating.
+        """
+
+        index = self.index_of(agent_id)
+        self._ratings[index] = rating
+
+    def _pairs(
+        self, outcomes: Iterable[Outcome]
+    ) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Splits outcomes into pairwise games.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The indices of the first and second
+                agents and the score of the first agent (1 for a win, 0.5 for a draw and
+                0 for a loss) in each game.
+        """
+
+        first, second, scores = [], [], []
+
+        for outcome in outcomes:
+            participants = [
+                (self.index_of(agent_id), score)
+                for agent_id, score in outcome.scores.items()
+            ]
+
+            for i, (a, score_a) in enumerate(participants):
+                for b, score_b in participants[i + 1 :]:
+                    first.append(a)
+                    second.append(b)
+                    scores.append(
+                        1.0 if score_a > score_b else 0.5 if score_a == score_b else 0.0
+                    )
+
+        return (
+            self._np.array(first, dtype=self._np.int64),
+            self._np.array(second, dtype=self._np.int64),
+            self._np.array(scores, dtype=self._np.float64),
+        )
+
+    def update(self, outcomes: Iterable[Outcome]) -> int:
+        """Updates ratings with a batch of outcomes.
+
+        Args:
+            outcomes (Iterable[Outcome]): The outcomes.
+
+        Returns:
+            int: The number of games played.
+        """
+
+        first, second, scores = self._pairs(outcomes)
+        if len(scores) == 0:
+            return 0
+
+        self._apply(first, second, scores)
+
+        self._changed[first] = True
+        self._changed[second] = True
+
+        return len(scores)
+
+    def _apply(
+        self, first: "np.ndarray", second: "np.ndarray", scores: "np.ndarray"
+    ) -> None:
+        raise NotImplementedError()
+
+    def _get_results(self, indices: "np.ndarray") -> List[AgentResultUpdate]:
+        """Returns the agent results to be written for agents whose ratings have changed."""
+
+        return [
+            AgentResultUpdate(self._agent_ids[index], self.metric, int(round(rating)))
+            for index, rating in zip(indices.tolist(), self._ratings[indices].tolist())
+        ]
+
+    async def write(self, context: CompetitionContext) -> int:
+        """Writes the ratings that have changed since they were last written to Umpire
+        in a single batch.
+
+        Args:
+            context (CompetitionContext): The competition context.
+
+        Returns:
+            int: The number of agents whose ratings were written.
+        """
+
+        indices = self._np.flatnonzero(self._changed[: len(self._agent_ids)])
+        if len(indices) == 0:
+            return 0
+
+        await context.set_agent_results(self._get_results(indices))
+        self._changed[indices] = False
+
+        return len(indices)
+
+
+class EloRatings(RatingSystem):
+    """Elo ratings."""
+
+    k: float
+    initial_rating: float
+    scale: float
+
+    def __init__(
+        self,
+        metric: str = "rating",
+        k: float = 32,
+        initial_rating: float = 1500,
+        scale: float = 400,
+    ) -> None:
+        """Creates a new Elo rating system.
+
+        Args:
+            metric (str, optional): The agent result metric under which ratings are
+                written. Defaults to "rating".
+            k (float, optional): The maximum change in rating from a single game. Defaults to 32.
+            initial_rating (float, optional): The rating of a new agent. Defaults to 1500.
+            scale (float, optional): The rating difference at which the higher rated agent
+                is expected to win ten times as often. Defaults to 400.
+        """
+
+        self.k = k
+        self.initial_rating = initial_rating
+        self.scale = scale
+
+        super().__init__(metric)
+
+    def initial(self) -> float:
+        return self.initial_rating
+
+    def _apply(
+        self, first: "np.ndarray", second: "np.ndarray", scores: "np.ndarray"
+    ) -> None:
+        expected = 1 / (
+            1 + 10 ** ((self._ratings[second] - self._ratings[first]) / self.scale)
+        )
+
+        changes = self.k * (scores - expected)
+
+        deltas = self._np.zeros(len(self._ratings))
+        self._np.add.at(deltas, first, changes)
+        self._np.add.at(deltas, second, -changes)
+
+        self._ratings += deltas
+
+
+# converts between the Glicko rating scale and natural units
+GLICKO_Q = 0.0057565
+
+
+class GlickoRatings(RatingSystem):
+    """Glicko ratings, in which each agent also has a rating deviation measuring
+    how uncertain its rating is. Each batch of outcomes is treated as a rating period,
+    at the start of which the rating deviation of every rated agent grows, whether or
+    not it plays in the period.
+
+    Rating deviations are written under the "{metric}_deviation" metric.
+    """
+
+    initial_rating: float
+    initial_deviation: float
+    c: float
+    _deviations: "np.ndarray"
+
+    def __init__(
+        self,
+        metric: str = "rating",
+        initial_rating: float = 1500,
+        initial_deviation: float = 350,
+        c: float = 34.6,
+    ) -> None:
+        """Creates a new Glicko rating system.
+
+        Args:
+            metric (str, optional): The agent result metric under which ratings are
+                written. Defaults to "rating".
+            initial_rating (float, optional): The rating of a new agent. Defaults to 1500.
+            initial_deviation (float, optional): The rating deviation of a new agent, which is
+                also the maximum rating deviation. Defaults to 350.
+            c (float, optional): How much the rating deviation of an agent grows with each
+                rating period. Defaults to 34.6.
+        """
+
+        self.initial_rating = initial_rating
+        self.initial_deviation = initial_deviation
+        self.c = c
+
+        super().__init__(metric)
+
+        self._deviations = self._np.zeros(0)
+
+    def initial(self) -> float:
+        return self.initial_rating
+
+    def _grow(self, size: int) -> None:
+        self._deviations = self._np.concatenate(
+            [
+                self._deviations,
+                self._np.full(size - len(self._deviations), self.initial_deviation),
+            ]
+        )
+
+        super()._grow(size)
+
+    def deviation_of(self, agent_id: int) -> Optional[float]:
+        """Returns the rating deviation of an agent.
+
+        Args:
+            agent_id (int): The agent ID.
+
+        Returns:
+            Optional[float]: The rating deviation, or None if the agent has not been rated yet.
+        """
+
+        index = self._index.get(agent_id)
+        return float(self._deviations[index]) if index is not None else None
+
+    def set_rating(
+        self, agent_id: int, rating: float, deviation: Optional[float] = None
+    ) -> None:
+        super().set_rating(agent_id, rating)
+
+        if deviation is not None:
+            self._deviations[self._index[agent_id]] = deviation
+
+    def _start_period(self) -> None:
+        """Grows the rating deviation of every rated agent for a new rating period."""
+
+        deviations = self._deviations[: len(self._agent_ids)]
+        grown = deviations < self.initial_deviation
+
+        deviations[grown] = self._np.minimum(
+            self._np.sqrt(deviations[grown] ** 2 + self.c**2), self.initial_deviation
+        )
+        self._changed[: len(self._agent_ids)] |= grown
+
+    def update(self, outcomes: Iterable[Outcome]) -> int:
+        self._start_period()
+        return super().update(outcomes)
+
+    def _apply(
+        self, first: "np.ndarray", second: "np.ndarray", scores: "np.ndarray"
+    ) -> None:
+        np = self._np
+
+        # every game is seen from the perspective of both agents
+        players = np.concatenate([first, second])
+        opponents = np.concatenate([second, first])
+        scores = np.concatenate([scores, 1 - scores])
+
+        active = np.unique(players)
+
+        # deviations have already grown for this rating period
+        g = 1 / np.sqrt(
+            1 + 3 * GLICKO_Q**2 * self._deviations[opponents] ** 2 / np.pi**2
+        )
+        expected = 1 / (
+            1 + 10 ** (-g * (self._ratings[players] - self._ratings[opponents]) / 400)
+        )
+
+        information = np.zeros(len(self._ratings))
+        np.add.at(information, players, g**2 * expected * (1 - expected))
+        surprise = np.zeros(len(self._ratings))
+        np.add.at(surprise, players, g * (scores - expected))
+
+        # 1 / d^2 for each active agent
+        information = GLICKO_Q**2 * information[active]
+        precision = 1 / self._deviations[active] ** 2 + information
+
+        self._ratings[active] += GLICKO_Q / precision * surprise[active]
+        self._deviations[active] = np.sqrt(1 / precision)
+
+    def _get_results(self, indices: "np.ndarray") -> List[AgentResultUpdate]:
+        return super()._get_results(indices) + [
+            AgentResultUpdate(
+                self._agent_ids[index],
+                f"{self.metric}_deviation",
+                int(round(deviation)),
+            )
+            for index, deviation in zip(
+                indices.tolist(), self._deviations[indices].tolist()
+            )
+        ]
@@ -0,0 +1,275 @@
+import warnings
+from array import array
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence
+
+from doxa_competition.proto.umpire.evaluation import EvaluationResult
+from doxa_competition.utils import import_numpy
+
+if TYPE_CHECKING:
+    import numpy as np
+
+GROUP_BY_COLUMNS = ("evaluation_id", "agent_id", "metric")
+
+AGGREGATES = ("count", "sum", "mean", "min", "max")
+
+# timestamps are parsed in chunks so that their strings can be freed early on
+TIMESTAMP_CHUNK_SIZE = 10000
+
+
+def parse_timestamps(values: List[str]) -> "np.ndarray":
+    """Parses ISO 8601 timestamps (as sent by Umpire) into a datetime64 array,
+    with any timestamps that cannot be parsed set to NaT.
+
+    Args:
+        values (List[str]): The timestamps.
+
+    Returns:
+        np.ndarray: The parsed timestamps.
+    """
+
+    np = import_numpy()
+
+    # NumPy does not accept time zone designators, but Umpire timestamps are in UTC
+    values = [value[:-1] if value.endswith("Z") else value for value in values]
+
+    try:
+        # other time zone offsets are only parsed with a warning, so are handled below
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return np.array(values, dtype="datetime64[us]")
+    except (ValueError, Warning):
+        pass
+
+    timestamps = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[us]")
+    for i, value in enumerate(values):
+        try:
+            timestamp = datetime.fromisoformat(value)
+        except ValueError:
+            continue
+
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+        timestamps[i] = np.datetime64(timestamp, "us")
+
+    return timestamps
+
+
+class EvaluationResultTable:
+    """A compact, columnar view of evaluation results.
+
+    Rather than one message object per result, each field is kept in a NumPy
+    array, with metric names interned and stored as indices into `metrics`.
+
+    Attributes:
+        ids (np.ndarray): The result IDs.
+        evaluation_ids (np.ndarray): The evaluation IDs.
+        agent_ids (np.ndarray): The agent IDs.
+        metric_codes (np.ndarray): The index of each result's metric in `metrics`.
+        results (np.ndarray): The results.
+        created_at (np.ndarray): The times at which the results were created.
+        metrics (List[str]): The distinct metric names.
+    """
+
+    ids: "np.ndarray"
+    evaluation_ids: "np.ndarray"
+    agent_ids: "np.ndarray"
+    metric_codes: "np.ndarray"
+    results: "np.ndarray"
+    created_at: "np.ndarray"
+    metrics: List[str]
+
+    def __init__(
+        self,
+        ids: "np.ndarray",
+        evaluation_ids: "np.ndarray",
+        agent_ids: "np.ndarray",
+        metric_codes: "np.ndarray",
+        results: "np.ndarray",
+        created_at: "np.ndarray",
+        metrics: List[str],
+    ) -> None:
+        self.ids = ids
+        self.evaluation_ids = evaluation_ids
+        self.agent_ids = agent_ids
+        self.metric_codes = metric_codes
+        self.results = results
+        self.created_at = created_at
+        self.metrics = metrics
+
+    @classmethod
+    def from_results(
+        cls, results: Iterable[EvaluationResult]
+    ) -> "EvaluationResultTable":
+        """Creates a table from evaluation results, which may be consumed lazily
+        (e.g. as they are streamed from Umpire).
+
+        Args:
+            results (Iterable[EvaluationResult]): The evaluation results.
+
+        Returns:
+            EvaluationResultTable: The table.
+        """
+
+        np = import_numpy()
+
+        ids = array("q")
+        evaluation_ids = array("q")
+        agent_ids = array("q")
+        metric_codes = array("l")
+        values = array("q")
+        timestamps = []
+        pending_timestamps = []
+
+        metrics = []
+        metric_codes_by_name = {}
+
+        for result in results:
+            code = metric_codes_by_name.get(result.metric)
+            if code is None:
+                code = metric_codes_by_name[result.metric] = len(metrics)
+                metrics.append(result.metric)
+
+            ids.append(result.id)
+            evaluation_ids.append(result.evaluation_id)
+            agent_ids.append(result.agent_id)
+            metric_codes.append(code)
+            values.append(result.result)
+
+            pending_timestamps.append(result.created_at)
+            if len(pending_timestamps) >= TIMESTAMP_CHUNK_SIZE:
+                timestamps.append(parse_timestamps(pending_timestamps))
+                pending_timestamps = []
+
+        timestamps.append(parse_timestamps(pending_timestamps))
+
+        return cls(
+            ids=np.frombuffer(ids, dtype=np.int64),
+            evaluation_ids=np.frombuffer(evaluation_ids, dtype=np.int64),
+            agent_ids=np.frombuffer(agent_ids, dtype=np.int64),
+            metric_codes=np.array(metric_codes, dtype=np.int32),
+            results=np.frombuffer(values, dtype=np.int64),
+            created_at=np.concatenate(timestamps),
+            metrics=metrics,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def metric_code(self, metric: str) -> int:
+        """Returns the code of an interned metric name.
+
+        Args:
+            metric (str): The metric.
+
+        Returns:
+            int: The metric code, or -1 if there are no results for the metric.
+        """
+
+        try:
+            return self.metrics.index(metric)
+        except ValueError:
+            return -1
+
+    def select(self, mask: "np.ndarray") -> "EvaluationResultTable":
+        """Returns the rows selected by a boolean mask or an array of indices.
+
+        Args:
+            mask (np.ndarray): The mask or indices.
+
+        Returns:
+            EvaluationResultTable: A table containing the selected rows.
+        """
+
+        return EvaluationResultTable(
+            ids=self.ids[mask],
+            evaluation_ids=self.evaluation_ids[mask],
+            agent_ids=self.agent_ids[mask],
+            metric_codes=self.metric_codes[mask],
+            results=self.results[mask],
+            created_at=self.created_at[mask],
+            metrics=self.metrics,
+        )
+
+    def for_metric(self, metric: str) -> "EvaluationResultTable":
+        """Returns the results for a single metric.
+
+        Args:
+            metric (str): The metric.
+
+        Returns:
+            EvaluationResultTable: A table containing the results for the metric.
+        """
+
+        return self.select(self.metric_codes == self.metric_code(metric))
+
+    def group_by(
+        self,
+        by: Sequence[str] = ("agent_id", "metric"),
+        aggregate: str = "sum",
+    ) -> Dict[str, "np.ndarray"]:
+        """Aggregates results over groups of rows sharing the same values in some columns.
+
+        Args:
+            by (Sequence[str], optional): The columns to group by, out of "evaluation_id",
+                "agent_id" and "metric". Defaults to ("agent_id", "metric").
+            aggregate (str, optional): How the results in each group are aggregated, out of
+                "count", "sum", "mean", "min" and "max". Defaults to "sum".
+
+        Returns:
+            Dict[str, np.ndarray]: An array for each grouping column (with metric names rather
+                than codes) and an array named after the aggregate, with one entry per group.
+        """
+
+        np = import_numpy()
+
+        if not by or any(column not in GROUP_BY_COLUMNS for column in by):
+            raise ValueError(f"Results can only be grouped by {GROUP_BY_COLUMNS}.")
+
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"The aggregate must be one of {AGGREGATES}.")
+
+        columns = {
+            "evaluation_id": self.evaluation_ids,
+            "agent_id": self.agent_ids,
+            "metric": self.metric_codes,
+        }
+
+        keys, groups = np.unique(
+            np.stack([columns[column].astype(np.int64) for column in by], axis=1),
+            axis=0,
+            return_inverse=True,
+        )
+        groups = groups.reshape(-1)
+
+        grouped = {
+            column: (
+                np.array(self.metrics, dtype=object)[keys[:, i]]
+                if column == "metric"
+                else keys[:, i]
+            )
+            for i, column in enumerate(by)
+        }
+
+        counts = np.bincount(groups, minlength=len(keys))
+
+        if aggregate == "count":
+            values = counts
+        elif aggregate in ("sum", "mean"):
+            values = np.zeros(len(keys), dtype=np.int64)
+            np.add.at(values, groups, self.results)
+
+            if aggregate == "mean":
+                values = values / counts
+        else:
+            ufunc, initial = (
+                (np.minimum, np.iinfo(np.int64).max)
+                if aggregate == "min"
+                else (np.maximum, np.iinfo(np.int64).min)
+            )
+            values = np.full(len(keys), initial, dtype=np.int64)
+            ufunc.at(values, groups, self.results)
+
+        grouped[aggregate] = values
+        return grouped
@@ -0,0 +1,330 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from doxa_competition.proto.umpire.agent import AgentResult
+from doxa_competition.proto.umpire.scoreboard import (
+    AgentResults,
+    GetCompetitionResultsResponse,
+)
+
+
+@dataclass
+class AgentResultUpdate:
+    agent_id: int
+    metric: str
+    result: int
+
+
+ResultWriter = Callable[[List[AgentResultUpdate]], Awaitable]
+
+
+@dataclass
+class ResultBufferPolicy:
+    """Determines when buffered agent result writes are flushed to Umpire.
+
+    Writes are always flushed once the event handler that made them has finished.
+
+    Attributes:
+        max_size (int): The number of distinct agent results after which writes are flushed.
+        flush_interval (float): The maximum time in seconds a write is buffered for.
+    """
+
+    max_size: int = 1000
+    flush_interval: float = 1.0
+
+
+class ResultBuffer:
+    """A write-behind buffer for agent results that flushes through the batch Umpire RPCs.
+
+    Writes to the same agent and metric are merged: setting a result replaces any
+    earlier write, while additions are summed (and folded into an earlier set).
+    """
+
+    policy: ResultBufferPolicy
+    _set_results: ResultWriter
+    _add_to_results: ResultWriter
+    _writes: Dict[Tuple[int, str], Tuple[bool, int]]
+    _lock: Optional[asyncio.Lock] = None
+    _timer: Optional[asyncio.TimerHandle] = None
+
+    def __init__(
+        self,
+        set_results: ResultWriter,
+        add_to_results: ResultWriter,
+        policy: ResultBufferPolicy = None,
+    ) -> None:
+        """Creates a new result buffer.
+
+        Args:
+            set_results (ResultWriter): Sets a batch of agent results.
+            add_to_results (ResultWriter): Adds to a batch of agent results.
+            policy (ResultBufferPolicy, optional): When writes are flushed. Defaults to None.
+        """
+
+        self.policy = policy if policy is not None else ResultBufferPolicy()
+        self._set_results = set_results
+        self._add_to_results = add_to_results
+
+        # maps (agent ID, metric) to whether the result is set outright and its value
+        self._writes = {}
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def _apply(self, agent_id: int, results: Dict[str, int]) -> Dict[str, int]:
+        merged = dict(results)
+
+        for (write_agent_id, metric), (is_set, result) in self._writes.items():
+            if write_agent_id == agent_id:
+                merged[metric] = result if is_set else merged.get(metric, 0) + result
+
+        return merged
+
+    def has_pending(self, agent_id: Optional[int] = None) -> bool:
+        """Returns whether there are buffered writes, for an agent or for any agent.
+
+        Args:
+            agent_id (Optional[int], optional): The agent ID. Defaults to None.
+
+        Returns:
+            bool: Whether there are buffered writes.
+        """
+
+        if agent_id is None:
+            return bool(self._writes)
+
+        return any(key[0] == agent_id for key in self._writes)
+
+    async def wait_for_flush(self) -> None:
+        """Waits for any flush in progress to finish, so that its writes are
+        visible when reading from Umpire."""
+
+        if self._lock is not None and self._lock.locked():
+            async with self._lock:
+                pass
+
+    def apply_to_agent_results(
+        self, agent_id: int, results: List[AgentResult]
+    ) -> List[AgentResult]:
+        """Applies the buffered writes for an agent to its results read from Umpire,
+        rather than flushing every buffered write before each read.
+
+        Args:
+            agent_id (int): The agent ID.
+            results (List[AgentResult]): The agent's results, which are not modified.
+
+        Returns:
+            List[AgentResult]: The agent's results including the buffered writes.
+        """
+
+        if not self.has_pending(agent_id):
+            return results
+
+        merged = self._apply(
+            agent_id, {result.metric: result.result for result in results}
+        )
+
+        applied = []
+        for result in results:
+            if merged[result.metric] == result.result:
+                applied.append(result)
+            else:
+                applied.append(
+                    AgentResult(
+                        id=result.id,
+                        agent_id=result.agent_id,
+                        metric=result.metric,
+                        result=merged[result.metric],
+                        created_at=result.created_at,
+                        updated_at=result.updated_at,
+                    )
+                )
+
+        existing = {result.metric for result in results}
+        applied.extend(
+            AgentResult(agent_id=agent_id, metric=metric, result=result)
+            for metric, result in merged.items()
+            if metric not in existing
+        )
+
+        return applied
+
+    def apply_to_scoreboard(
+        self, scoreboard: GetCompetitionResultsResponse
+    ) -> GetCompetitionResultsResponse:
+        """Applies the buffered writes to a scoreboard read from Umpire.
+
+        Args:
+            scoreboard (GetCompetitionResultsResponse): The scoreboard, which is not modified.
+
+        Returns:
+            GetCompetitionResultsResponse: The scoreboard including the buffered writes.
+        """
+
+        agent_ids = {agent_id for agent_id, _ in self._writes}
+        if not agent_ids:
+            return scoreboard
+
+        return GetCompetitionResultsResponse(
+            scoreboard=[
+                AgentResults(
+                    agent_id=results.agent_id,
+                    results=self._apply(results.agent_id, results.results),
+                    activated_at=results.activated_at,
+                )
+                if results.agent_id in agent_ids
+                else results
+                for results in scoreboard.scoreboard
+            ]
+        )
+
+    def _merge(self, key: Tuple[int, str], is_set: bool, result: int) -> None:
+        if not is_set and key in self._writes:
+            previous_is_set, previous_result = self._writes[key]
+            self._writes[key] = (previous_is_set, previous_result + result)
+        else:
+            self._writes[key] = (is_set, result)
+
+    async def _write(self, updates: List[AgentResultUpdate], is_set: bool) -> None:
+        for update in updates:
+            self._merge((update.agent_id, update.metric), is_set, update.result)
+
+        if len(self._writes) >= self.policy.max_size:
+            # the writes stay buffered if this fails, so the error must not fail
+            # the handler, whose event would be redelivered and written again
+            await self.try_flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._timer is None and self._writes and self.policy.flush_interval > 0:
+            self._timer = asyncio.get_event_loop().call_later(
+                self.policy.flush_interval, self._on_timer
+            )
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        asyncio.ensure_future(self.try_flush())
+
+    async def try_flush(self) -> bool:
+        """Writes every buffered result to Umpire, logging rather than raising
+        any error, in which case the writes are retried later.
+
+        Returns:
+            bool: Whether the writes succeeded.
+        """
+
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"[ERROR] Unable to write agent results: {str(e)}")
+            return False
+
+        return True
+
+    async def set(self, agent_id: int, metric: str, result: int) -> None:
+        """Buffers setting an agent result.
+
+        Args:
+            agent_id (int): The agent ID.
+            metric (str): The metric.
+            result (int): The result.
+        """
+
+        await self._write([AgentResultUpdate(agent_id, metric, result)], True)
+
+    async def set_many(self, updates: List[AgentResultUpdate]) -> None:
+        """Buffers setting a batch of agent results, so that they are ordered with
+        respect to the other buffered writes to the same results.
+
+        Args:
+            updates (List[AgentResultUpdate]): The agent results.
+        """
+
+        await self._write(updates, True)
+
+    async def add(self, agent_id: int, metric: str, result: int) -> None:
+        """Buffers adding to an agent result.
+
+        Args:
+            agent_id (int): The agent ID.
+            metric (str): The metric.
+            result (int): The amount to add.
+        """
+
+        await self._write([AgentResultUpdate(agent_id, metric, result)], False)
+
+    async def add_many(self, updates: List[AgentResultUpdate]) -> None:
+        """Buffers adding to a batch of agent results.
+
+        Args:
+            updates (List[AgentResultUpdate]): The amounts to add.
+        """
+
+        await self._write(updates, False)
+
+    async def flush(self) -> None:
+        """Writes every buffered result to Umpire.
+
+        If the writes fail, they are merged back into the buffer (behind any writes
+        made in the meantime) so that they are retried on the next flush, which is
+        scheduled after the flush interval.
+
+        Raises:
+            Exception: Raised if the writes fail, which are then still buffered. The
+                events that made them must therefore not be redelivered, since their
+                additions would otherwise be applied twice.
+        """
+
+        # flushes are serialised so that their writes reach Umpire in order
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            if not self._writes:
+                return
+
+            writes, self._writes = self._writes, {}
+
+            sets = [
+                AgentResultUpdate(agent_id, metric, result)
+                for (agent_id, metric), (is_set, result) in writes.items()
+                if is_set
+            ]
+            additions = [
+                AgentResultUpdate(agent_id, metric, result)
+                for (agent_id, metric), (is_set, result) in writes.items()
+                if not is_set
+            ]
+
+            try:
+                if sets:
+                    await self._set_results(sets)
+                    sets = []
+
+                if additions:
+                    await self._add_to_results(additions)
+            except Exception:
+                self._restore(sets + additions, writes)
+                raise
+
+    def _restore(
+        self,
+        updates: List[AgentResultUpdate],
+        writes: Dict[Tuple[int, str], Tuple[bool, int]],
+    ) -> None:
+        newer, self._writes = self._writes, {}
+
+        for update in updates:
+            key = (update.agent_id, update.metric)
+            self._merge(key, *writes[key])
+
+        for key, (is_set, result) in newer.items():
+            self._merge(key, is_set, result)
+
+        self._schedule_flush()
@@ -0,0 +1,304 @@
+import asyncio
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from grpclib.const import Status
+from grpclib.exceptions import GRPCError, StreamTerminatedError
+
+T = TypeVar("T")
+
+# a call is made with the timeout for the attempt, or None for the default timeout
+Attempt = Callable[[Optional[float]], Awaitable[T]]
+
+
+@dataclass
+class RetryPolicy:
+    """Determines how calls are retried and hedged.
+
+    Only idempotent calls are retried or hedged. Retries are throttled by a budget,
+    as in gRPC: every failure spends a token and every success earns back a fraction
+    of one, and calls are only retried while more than half of the tokens remain.
+    This stops retries from piling extra load onto a server that is already failing.
+
+    Attributes:
+        timeout (Optional[float]): The total time in seconds for a call across
+            every attempt, if limited at all.
+        attempt_timeout (Optional[float]): The time in seconds after which an attempt
+            is cancelled, if at all (besides any default timeout of the stubs).
+        max_attempts (int): The maximum number of attempts for an idempotent call.
+        initial_backoff (float): The maximum delay in seconds before the first retry.
+        max_backoff (float): The maximum delay in seconds before any retry.
+        backoff_multiplier (float): The factor by which the maximum delay grows after each retry.
+        budget_tokens (float): The number of tokens in the retry budget.
+        budget_refill (float): The fraction of a token earned back by each success.
+        hedge_percentile (Optional[float]): The percentile of recent latencies (e.g. 0.95)
+            after which a second attempt is made alongside the first, if at all.
+        hedge_min_samples (int): The number of latencies recorded before hedging starts.
+        latency_window (int): The number of recent latencies kept for each method.
+        retryable_statuses (Tuple[Status, ...]): The gRPC statuses upon which calls are retried.
+    """
+
+    timeout: Optional[float] = None
+    attempt_timeout: Optional[float] = None
+    max_attempts: int = 3
+    initial_backoff: float = 0.05
+    max_backoff: float = 1.0
+    backoff_multiplier: float = 2.0
+    budget_tokens: float = 10.0
+    budget_refill: float = 0.1
+    hedge_percentile: Optional[float] = None
+    hedge_min_samples: int = 20
+    latency_window: int = 200
+    retryable_statuses: Tuple[Status, ...] = (
+        Status.UNAVAILABLE,
+        Status.DEADLINE_EXCEEDED,
+        Status.ABORTED,
+    )
+
+
+@dataclass
+class RetryCounters:
+    """Counts how calls have been retried and hedged.
+
+    Attributes:
+        calls (int): The number of calls made.
+        retries (int): The number of retries.
+        hedges (int): The number of hedged attempts.
+        hedges_won (int): The number of hedged attempts that finished first.
+        budget_exhausted (int): The number of calls not retried as the budget was spent.
+        failures (int): The number of calls that failed after any retries.
+    """
+
+    calls: int = 0
+    retries: int = 0
+    hedges: int = 0
+    hedges_won: int = 0
+    budget_exhausted: int = 0
+    failures: int = 0
+
+
+class RetryBudget:
+    """A token bucket throttling retries when many calls are failing."""
+
+    max_tokens: float
+    refill: float
+    tokens: float
+
+    def __init__(self, max_tokens: float, refill: float) -> None:
+        self.max_tokens = max_tokens
+        self.refill = refill
+        self.tokens = max_tokens
+
+    def record_success(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.refill)
+
+    def record_failure(self) -> None:
+        self.tokens = max(0.0, self.tokens - 1)
+
+    def allows_retry(self) -> bool:
+        return self.tokens > self.max_tokens / 2
+
+
+class LatencyTracker:
+    """Keeps the latencies of recent successful calls for each method."""
+
+    window: int
+    min_samples: int
+    _latencies: Dict[str, Deque[float]]
+
+    def __init__(self, window: int, min_samples: int) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies = {}
+
+    def record(self, key: str, latency: float) -> None:
+        latencies = self._latencies.get(key)
+        if latencies is None:
+            latencies = self._latencies[key] = deque(maxlen=self.window)
+
+        latencies.append(latency)
+
+    def percentile(self, key: str, percentile: float) -> Optional[float]:
+        """Returns a percentile of the recent latencies of a method.
+
+        Args:
+            key (str): The method.
+            percentile (float): The percentile, between 0 and 1.
+
+        Returns:
+            Optional[float]: The latency in seconds, or None if too few have been recorded.
+        """
+
+        latencies = self._latencies.get(key)
+        if latencies is None or len(latencies) < max(self.min_samples, 1):
+            return None
+
+        ordered = sorted(latencies)
+        return ordered[min(int(percentile * len(ordered)), len(ordered) - 1)]
+
+
+class Retrier:
+    """Makes calls with deadlines, retrying and hedging idempotent calls
+    according to a retry policy."""
+
+    policy: RetryPolicy
+    counters: RetryCounters
+    _budget: RetryBudget
+    _latencies: LatencyTracker
+
+    def __init__(self, policy: RetryPolicy) -> None:
+        """Creates a new retrier.
+
+        Args:
+            policy (RetryPolicy): The retry policy.
+        """
+
+        if policy.max_attempts < 1:
+            raise ValueError("The maximum number of attempts must be at least 1.")
+
+        self.policy = policy
+        self.counters = RetryCounters()
+        self._budget = RetryBudget(policy.budget_tokens, policy.budget_refill)
+        self._latencies = LatencyTracker(
+            policy.latency_window, policy.hedge_min_samples
+        )
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Returns whether a call may be retried after failing with an error.
+
+        Args:
+            error (BaseException): The error.
+
+        Returns:
+            bool: Whether the call may be retried.
+        """
+
+        if isinstance(error, GRPCError):
+            return error.status in self.policy.retryable_statuses
+
+        return isinstance(error, (asyncio.TimeoutError, StreamTerminatedError, OSError))
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> Optional[float]:
+        timeout = self.policy.attempt_timeout
+        if deadline is None:
+            return timeout
+
+        remaining = deadline - asyncio.get_event_loop().time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+
+        return remaining if timeout is None else min(timeout, remaining)
+
+    async def call(self, key: str, attempt: Attempt, idempotent: bool) -> T:
+        """Makes a call.
+
+        Args:
+            key (str): The method being called, by which latencies are tracked.
+            attempt (Attempt): Makes an attempt given its timeout.
+            idempotent (bool): Whether the call may safely be made more than once.
+
+        Returns:
+            T: The result of the first successful attempt.
+        """
+
+        loop = asyncio.get_event_loop()
+        policy = self.policy
+
+        self.counters.calls += 1
+
+        deadline = None if policy.timeout is None else loop.time() + policy.timeout
+        max_attempts = policy.max_attempts if idempotent else 1
+        backoff = policy.initial_backoff
+
+        for number in range(1, max_attempts + 1):
+            try:
+                timeout = self._attempt_timeout(deadline)
+
+                if idempotent and policy.hedge_percentile is not None:
+                    result = await self._hedge(key, attempt, timeout)
+                else:
+                    result = await self._time(key, attempt, timeout)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    self.counters.failures += 1
+                    raise
+
+                self._budget.record_failure()
+
+                if number == max_attempts:
+                    self.counters.failures += 1
+                    raise
+
+                if not self._budget.allows_retry():
+                    self.counters.budget_exhausted += 1
+                    self.counters.failures += 1
+                    raise
+
+                # full jitter spreads out retries from calls that failed together
+                delay = random.uniform(0, backoff)
+                backoff = min(backoff * policy.backoff_multiplier, policy.max_backoff)
+
+                if deadline is not None and loop.time() + delay >= deadline:
+                    self.counters.failures += 1
+                    raise
+
+                self.counters.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self._budget.record_success()
+            return result
+
+    async def _time(self, key: str, attempt: Attempt, timeout: Optional[float]) -> T:
+        loop = asyncio.get_event_loop()
+
+        start = loop.time()
+        result = await attempt(timeout)
+        self._latencies.record(key, loop.time() - start)
+
+        return result
+
+    async def _hedge(self, key: str, attempt: Attempt, timeout: Optional[float]) -> T:
+        delay = self._latencies.percentile(key, self.policy.hedge_percentile)
+        if delay is None or (timeout is not None and delay >= timeout):
+            return await self._time(key, attempt, timeout)
+
+        tasks = [asyncio.ensure_future(self._time(key, attempt, timeout))]
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._budget.allows_retry():
+                return await tasks[0]
+
+            self.counters.hedges += 1
+            tasks.append(
+                asyncio.ensure_future(
+                    self._time(
+                        key, attempt, None if timeout is None else timeout - delay
+                    )
+                )
+            )
+            hedge = tasks[1]
+
+            error = None
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    tasks.remove(task)
+
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters.hedges_won += 1
+
+                        return task.result()
+
+                    error = task.exception()
+
+            raise error
+        finally:
+            # whichever attempt is still running is no longer needed
+            for task in tasks:
+                task.cancel()
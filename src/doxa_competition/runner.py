@@ -1,36 +1,156 @@
+import asyncio
 import json
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
 
 import pulsar
 from _pulsar import ConsumerType
-from grpclib.client import Channel
 
+from doxa_competition.acknowledgement import (
+    ACK_ON_RECEIVE,
+    AcknowledgementPolicy,
+    Acknowledger,
+)
+from doxa_competition.coalescing import ReadCachePolicy
 from doxa_competition.competition import Competition
 from doxa_competition.context import CompetitionContext
 from doxa_competition.event import Event
+from doxa_competition.event.dispatcher import EventDispatcher
 from doxa_competition.event.router import EventRouter
 from doxa_competition.events import PulsarEvent
-from doxa_competition.utils import make_pulsar_client, make_umpire_channel
+from doxa_competition.producers import BatchingPolicy, ProducerPool
+from doxa_competition.results import ResultBufferPolicy
+from doxa_competition.retries import RetryPolicy
+from doxa_competition.scheduling import PriorityPolicy, SchedulingPolicy
+from doxa_competition.umpire import UmpireClient
+from doxa_competition.utils import make_pulsar_client, make_umpire_client
 
 
 class CompetitionRunner:
     """Handles the running of any number of registered competitions."""
 
     _competitions: Dict[str, Competition]
+    _contexts: Dict[str, CompetitionContext]
     _router: EventRouter
     _pulsar_client: pulsar.Client
-    _umpire_channel: Channel
+    _producer_pool: ProducerPool
+    _umpire: UmpireClient
+    _max_concurrency: int
+    _max_batch_size: Optional[int]
+    _max_batch_wait: float
+    _ack_policy: AcknowledgementPolicy
+    _consumer_type: ConsumerType
+    _result_buffering: Optional[ResultBufferPolicy]
+    _scoreboard_ttl: Optional[float]
+    _scheduling: Optional[SchedulingPolicy]
+    _read_cache: Optional[ReadCachePolicy]
+    _priority_scheduling: Optional[PriorityPolicy]
+    _stopping: Optional[asyncio.Event] = None
+    _stop_requested: bool = False
 
     def __init__(
         self,
         pulsar_path: str = None,
         umpire_host: str = "umpire",
         umpire_port: int = 80,
+        umpire_channels: int = 1,
+        umpire_timeout: Optional[float] = None,
+        umpire_keepalive: Optional[float] = None,
+        umpire_retry: Optional[RetryPolicy] = None,
+        max_concurrency: int = 1,
+        max_batch_size: Optional[int] = None,
+        max_batch_wait: float = 0.1,
+        ack_policy: AcknowledgementPolicy = ACK_ON_RECEIVE,
+        consumer_type: ConsumerType = ConsumerType.Shared,
+        publish_batching: Optional[BatchingPolicy] = None,
+        result_buffering: Optional[ResultBufferPolicy] = None,
+        scoreboard_ttl: Optional[float] = None,
+        scheduling: Optional[SchedulingPolicy] = None,
+        read_cache: Optional[ReadCachePolicy] = None,
+        priority_scheduling: Optional[PriorityPolicy] = None,
     ) -> None:
+        """Creates a new competition runner.
+
+        Args:
+            pulsar_path (str, optional): The path to a running Pulsar instance. Defaults to None.
+            umpire_host (str, optional): The host on which Umpire is running. Defaults to "umpire".
+            umpire_port (int, optional): The port on which Umpire is running. Defaults to 80.
+            umpire_channels (int, optional): The number of channels (i.e. HTTP/2 connections) over
+                which calls to Umpire are spread. Defaults to 1.
+            umpire_timeout (Optional[float], optional): The time in seconds after which calls to
+                Umpire are cancelled, if at all. Defaults to None.
+            umpire_keepalive (Optional[float], optional): The interval in seconds at which keepalive
+                pings are sent to Umpire, if at all. Defaults to None.
+            umpire_retry (Optional[RetryPolicy], optional): How calls to Umpire are retried and hedged,
+                if at all. Defaults to None.
+            max_concurrency (int, optional): The maximum number of events handled at once. Defaults to 1.
+            max_batch_size (Optional[int], optional): The maximum number of messages received at once,
+                enabling batch receiving if set. Defaults to None.
+            max_batch_wait (float, optional): The maximum time in seconds to wait for a batch to fill up.
+                Defaults to 0.1.
+            ack_policy (AcknowledgementPolicy, optional): When and how messages are acknowledged.
+                Defaults to acknowledging each message as soon as it is received.
+            consumer_type (ConsumerType, optional): The type of the competition service subscription.
+                Defaults to ConsumerType.Shared.
+            publish_batching (Optional[BatchingPolicy], optional): How events emitted asynchronously
+                by competitions are batched, if at all. Defaults to None.
+            result_buffering (Optional[ResultBufferPolicy], optional): When agent results written by
+                competitions are flushed to Umpire in batches, if buffered at all. Defaults to None.
+            scoreboard_ttl (Optional[float], optional): The time in seconds for which competition
+                scoreboards are cached, if at all. Defaults to None.
+            scheduling (Optional[SchedulingPolicy], optional): How evaluations scheduled concurrently
+                by competitions are coalesced into batches, if at all. Defaults to None.
+            read_cache (Optional[ReadCachePolicy], optional): How long agent results and scoreboards
+                read from Umpire are reused for, beyond sharing identical concurrent reads.
+                Defaults to None.
+            priority_scheduling (Optional[PriorityPolicy], optional): The priority lanes in which
+                evaluations scheduled by competitions are queued and the rate at which they are
+                submitted, if queued at all. Defaults to None.
+        """
+
+        if max_concurrency < 1:
+            raise ValueError("The maximum concurrency must be at least 1.")
+
+        if max_batch_size is not None and max_batch_size < 1:
+            raise ValueError("The maximum batch size must be at least 1.")
+
+        if ack_policy.cumulative:
+            if consumer_type not in (ConsumerType.Exclusive, ConsumerType.Failover):
+                raise ValueError(
+                    "Cumulative acknowledgements require an exclusive or failover subscription."
+                )
+
+            if max_concurrency != 1:
+                raise ValueError(
+                    "Cumulative acknowledgements require events to be handled one at a time."
+                )
+
+        self._max_concurrency = max_concurrency
+        self._max_batch_size = max_batch_size
+        self._max_batch_wait = max_batch_wait
+        self._ack_policy = ack_policy
+        self._consumer_type = consumer_type
+        self._result_buffering = result_buffering
+        self._scoreboard_ttl = scoreboard_ttl
+        self._scheduling = scheduling
+        self._read_cache = read_cache
+        self._priority_scheduling = priority_scheduling
         self._router = EventRouter()
         self._pulsar_client = make_pulsar_client(pulsar_path=pulsar_path)
-        self._umpire_channel = make_umpire_channel(host=umpire_host, port=umpire_port)
+        self._producer_pool = ProducerPool(
+            self._pulsar_client, batching=publish_batching
+        )
+        self._umpire = make_umpire_client(
+            host=umpire_host,
+            port=umpire_port,
+            channels=umpire_channels,
+            timeout=umpire_timeout,
+            keepalive_time=umpire_keepalive,
+            retry=umpire_retry,
+        )
         self._competitions = {}
+        self._contexts = {}
 
     def register(self, competition: Competition) -> None:
         """Registers a competition with the competition runner.
@@ -45,13 +165,24 @@ class CompetitionRunner:
             raise RuntimeError(f"The competition {tag} has already been registered.")
 
         # construct competition context
-        context = CompetitionContext(tag, self._pulsar_client, self._umpire_channel)
+        context = CompetitionContext(
+            tag,
+            self._pulsar_client,
+            self._umpire,
+            producer_pool=self._producer_pool,
+            result_buffering=self._result_buffering,
+            scoreboard_ttl=self._scoreboard_ttl,
+            scheduling=self._scheduling,
+            read_cache=self._read_cache,
+            priority_scheduling=self._priority_scheduling,
+        )
 
         # register competition event handlers, e.g. the agent event handler,
         # the evaluation event handler or handlers related to extensions
         competition.register_event_handlers(self._router, context)
 
         self._competitions[tag] = competition
+        self._contexts[tag] = context
 
     def _setup(self) -> None:
         """Sets up the competition runner."""
@@ -76,47 +207,266 @@ class CompetitionRunner:
         """
         return PulsarEvent(
             message_id=message.message_id().serialize(),
-            body=json.loads(message.value()),
+            body=json.loads(message.data()),
             properties=message.properties(),
             timestamp=message.publish_timestamp(),
         )
 
+    def _get_topic_name(self, message: pulsar.Message) -> str:
+        """Returns the topic name of a message, stripped of the
+        "persistent://public/default/" prefix.
+
+        Args:
+            message (pulsar.Message): The received pulsar message.
+
+        Returns:
+            str: The topic name.
+        """
+
+        _, topic_name = message.topic_name().rsplit("/", 1)
+        return topic_name
+
+    async def _route(
+        self,
+        dispatcher: EventDispatcher,
+        acknowledger: Acknowledger,
+        messages: List[pulsar.Message],
+    ) -> None:
+        """Routes received messages to their topic handlers.
+
+        Consecutive messages on the same topic are passed to the topic's batch
+        handler in one go if it has one, and are otherwise dispatched one by one.
+
+        Args:
+            dispatcher (EventDispatcher): The event dispatcher.
+            acknowledger (Acknowledger): The acknowledger for handled messages.
+            messages (List[pulsar.Message]): The received messages, in order.
+        """
+
+        for topic_name, run in groupby(messages, key=self._get_topic_name):
+            run, events = self._get_events(acknowledger, list(run))
+            if not run:
+                continue
+
+            batch_handler = self._router.resolve_batch(topic_name)
+            if batch_handler is not None:
+                await dispatcher.dispatch_batch(
+                    topic_name,
+                    batch_handler,
+                    events,
+                    callback=acknowledger.track(run),
+                )
+                continue
+
+            # resolve the topic handler
+            try:
+                topic_handler = self._router.resolve(topic_name)
+            except RuntimeError as e:
+                for message in run:
+                    self._discard(acknowledger, message, str(e))
+
+                continue
+
+            # events sharing a partition key (e.g. the same enrolment)
+            # are handled in order, while other events run in parallel
+            partition_key = self._router.resolve_partition_key(topic_name)
+
+            for message, event in zip(run, events):
+                try:
+                    key = partition_key(event) if partition_key else None
+                except Exception as e:
+                    self._discard(acknowledger, message, f"No partition key: {repr(e)}")
+                    continue
+
+                # schedule the topic handler, waiting for capacity if needed
+                await dispatcher.dispatch(
+                    topic_name,
+                    topic_handler,
+                    event,
+                    key=key,
+                    callback=acknowledger.track([message]),
+                )
+
+    def _get_events(
+        self, acknowledger: Acknowledger, messages: List[pulsar.Message]
+    ) -> Tuple[List[pulsar.Message], List[Event]]:
+        """Forms events from received messages, discarding any that are malformed.
+
+        Args:
+            acknowledger (Acknowledger): The acknowledger for handled messages.
+            messages (List[pulsar.Message]): The received messages, in order.
+
+        Returns:
+            Tuple[List[pulsar.Message], List[Event]]: The well-formed messages and their events.
+        """
+
+        valid, events = [], []
+
+        for message in messages:
+            try:
+                event = self._get_event(message)
+            except Exception as e:
+                self._discard(acknowledger, message, f"Malformed message: {repr(e)}")
+                continue
+
+            valid.append(message)
+            events.append(event)
+
+        return valid, events
+
+    def _discard(
+        self, acknowledger: Acknowledger, message: pulsar.Message, reason: str
+    ) -> None:
+        """Discards a message that can never be handled, acknowledging it so that it is
+        not redelivered (which would otherwise crash the runner over and over again).
+
+        Args:
+            acknowledger (Acknowledger): The acknowledger for handled messages.
+            message (pulsar.Message): The message.
+            reason (str): Why the message cannot be handled.
+        """
+
+        print(
+            f"[ERROR] Discarding a message on {message.topic_name()} that cannot be handled. {reason}"
+        )
+
+        # messages are otherwise acknowledged as soon as they are received
+        if self._ack_policy.after_processing:
+            acknowledger.acknowledge(message)
+
+    async def _evict_idle_producers(self) -> None:
+        """Periodically closes producers that are no longer being used until cancelled."""
+
+        loop = asyncio.get_event_loop()
+
+        while True:
+            await asyncio.sleep(self._producer_pool.idle_timeout)
+            await loop.run_in_executor(None, self._producer_pool.evict_idle)
+
     async def run(self):
         """Subscribes to Pulsar topics corresponding to the registered event
-        handlers and routes events accordingly."""
+        handlers and routes events accordingly.
+
+        Messages are received on a dedicated thread so that the event loop
+        is never blocked, and up to `max_concurrency` events are handled
+        concurrently. Events on routes with a partition key are handled in
+        order with respect to other events sharing the same key.
+
+        If a maximum batch size was given, messages are received in batches
+        and passed to batch topic handlers where these are implemented.
+
+        Messages are acknowledged according to the acknowledgement policy.
+        """
 
         self._setup()
 
+        # batch receiving (as well as cumulative acknowledgements on a
+        # consumer of several topics) requires pulsar-client 3.1 or later
+        options = {}
+        if self._max_batch_size is not None:
+            options["batch_receive_policy"] = pulsar.ConsumerBatchReceivePolicy(
+                self._max_batch_size, -1, int(self._max_batch_wait * 1000)
+            )
+
         # start listening to the various Pulsar sources
         consumer = self._pulsar_client.subscribe(
             topic=self._router.get_topics(),
             subscription_name="competition-service",
-            consumer_type=ConsumerType.Shared,
+            consumer_type=self._consumer_type,
             schema=pulsar.schema.BytesSchema(),
+            **options,
         )
 
+        loop = asyncio.get_event_loop()
+        dispatcher = EventDispatcher(max_concurrency=self._max_concurrency)
+        acknowledger = Acknowledger(consumer, self._ack_policy)
+
+        if self._ack_policy.window > 0:
+            acknowledgement_task = asyncio.ensure_future(acknowledger.run())
+
+        # the blocking receive call gets its own thread so that it can
+        # never starve the default executor used by topic handlers
+        receiver = ThreadPoolExecutor(max_workers=1)
+
+        self._stopping = asyncio.Event()
+        if self._stop_requested:
+            self._stopping.set()
+
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        eviction_task = asyncio.ensure_future(self._evict_idle_producers())
+
         print("[DOXA Competition Events] Started listening for Pulsar events")
 
         try:
             while True:
-                message = consumer.receive()
-                consumer.acknowledge(message)
+                receiving = loop.run_in_executor(
+                    receiver,
+                    consumer.batch_receive
+                    if self._max_batch_size is not None
+                    else consumer.receive,
+                )
 
-                try:
-                    # remove the "persistent://public/default/" prefix
-                    _, topic_name = message.topic_name().rsplit("/", 1)
+                await asyncio.wait(
+                    {receiving, stopping}, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not receiving.done():
+                    # anything received from here on is left unacknowledged
+                    # and so will be redelivered once the consumer is closed
+                    break
 
-                    # resolve the topic handler
-                    topic_handler = self._router.resolve(topic_name)
+                messages = receiving.result()
+                if self._max_batch_size is None:
+                    messages = [messages]
 
-                    # call the topic handler
-                    await topic_handler(self._get_event(message))
+                if not self._ack_policy.after_processing:
+                    for message in messages:
+                        acknowledger.acknowledge(message)
+
+                try:
+                    await self._route(dispatcher, acknowledger, messages)
                 except KeyboardInterrupt:
                     break
 
                     # TODO: determine whether we should break or
                     # attempt to keep processing other events
                     # for other exceptions
+
+            await dispatcher.join()
         finally:
+            stopping.cancel()
+            eviction_task.cancel()
+
+            if self._ack_policy.window > 0:
+                acknowledgement_task.cancel()
+
+                try:
+                    await acknowledger.flush()
+                except Exception as e:
+                    print(f"[ERROR] Unable to acknowledge messages: {str(e)}")
+
+            for tag, context in self._contexts.items():
+                try:
+                    await context.flush_results()
+                except Exception as e:
+                    print(f"[ERROR] Unable to write agent results for {tag}: {str(e)}")
+
+            receiver.shutdown(wait=False)
+            await loop.run_in_executor(None, self._producer_pool.close)
             self._pulsar_client.close()
-            self._umpire_channel.close()
+            self._umpire.close()
+
+            print("[DOXA Competition Events] Stopped listening for Pulsar events")
+
+    def stop(self) -> None:
+        """Stops the competition runner once any events currently being handled
+        have been handled.
+
+        This must be called from the thread running the event loop, e.g. from
+        a signal handler registered with `loop.add_signal_handler`.
+        """
+
+        self._stop_requested = True
+
+        if self._stopping is not None:
+            self._stopping.set()
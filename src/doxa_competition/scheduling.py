@@ -0,0 +1,572 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from doxa_competition.proto.umpire.scheduling import (
+    EvaluationSubmission,
+    ScheduleEvaluationBatchResponse,
+)
+
+# the default maximum gRPC message size is 4 MiB
+DEFAULT_MAX_BATCH_BYTES = 1024 * 1024
+
+# the priority lanes used by the framework itself
+LANE_ACTIVATION = "activation"
+LANE_DEFAULT = "default"
+LANE_BACKGROUND = "background"
+
+BatchSubmitter = Callable[
+    [List[EvaluationSubmission]], Awaitable[ScheduleEvaluationBatchResponse]
+]
+
+
+@dataclass
+class ScheduledEvaluations:
+    """The batches in which evaluations were submitted to Umpire, since evaluations
+    may be coalesced with others or split across several batches.
+
+    Attributes:
+        responses (List[ScheduleEvaluationBatchResponse]): The response for each batch
+            containing the evaluations, in order.
+    """
+
+    responses: List[ScheduleEvaluationBatchResponse] = field(default_factory=list)
+
+    @property
+    def batch_ids(self) -> List[int]:
+        """The ID of every batch containing the evaluations, in order."""
+
+        return [response.batch_id for response in self.responses]
+
+    @property
+    def batch_id(self) -> int:
+        """The ID of the first batch containing the evaluations, like the response
+        to a single batch request. Use `batch_ids` if they may have been split up."""
+
+        return self.responses[0].batch_id if self.responses else 0
+
+
+@dataclass
+class SchedulingPolicy:
+    """Determines how evaluations scheduled concurrently are coalesced into batches.
+
+    Attributes:
+        window (float): The time in seconds for which evaluations are gathered
+            before being submitted together.
+        max_batch_size (int): The maximum number of evaluations in a batch. Evaluations
+            are submitted straight away once this many have been gathered.
+        max_batch_bytes (int): The approximate maximum size of a batch request in bytes.
+    """
+
+    window: float = 0.01
+    max_batch_size: int = 1000
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES
+
+
+def estimate_submission_size(submission: EvaluationSubmission) -> int:
+    """Estimates the size of an evaluation submission within a batch request in bytes.
+
+    Args:
+        submission (EvaluationSubmission): The evaluation submission.
+
+    Returns:
+        int: The estimated size.
+    """
+
+    # agent IDs take up at most 5 bytes each, plus some overhead for the fields
+    return 5 * len(submission.agent_ids) + len(submission.metadata) + 16
+
+
+def chunk_submissions(
+    submissions: Iterable[EvaluationSubmission],
+    max_batch_size: int,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+) -> Iterator[List[EvaluationSubmission]]:
+    """Splits evaluation submissions into batches small enough to be sent in one request.
+
+    Args:
+        submissions (Iterable[EvaluationSubmission]): The evaluation submissions.
+        max_batch_size (int): The maximum number of evaluations in a batch.
+        max_batch_bytes (int, optional): The approximate maximum size of a batch in bytes.
+
+    Yields:
+        List[EvaluationSubmission]: The batches.
+    """
+
+    chunk = []
+    chunk_bytes = 0
+
+    for submission in submissions:
+        size = estimate_submission_size(submission)
+
+        if chunk and (
+            len(chunk) >= max_batch_size or chunk_bytes + size > max_batch_bytes
+        ):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+
+        chunk.append(submission)
+        chunk_bytes += size
+
+    if chunk:
+        yield chunk
+
+
+class SchedulingCoalescer:
+    """Gathers evaluations scheduled by concurrent event handlers and submits
+    them to Umpire together.
+
+    Each caller receives the responses for every batch containing its evaluations,
+    which are only split up if they exceed the maximum batch size.
+    """
+
+    policy: SchedulingPolicy
+    _submit: BatchSubmitter
+    _pending: List[Tuple[List[EvaluationSubmission], asyncio.Future]]
+    _pending_size: int
+    _timer: Optional[asyncio.TimerHandle] = None
+    _tasks: set
+
+    def __init__(self, submit: BatchSubmitter, policy: SchedulingPolicy = None) -> None:
+        """Creates a new scheduling coalescer.
+
+        Args:
+            submit (BatchSubmitter): Submits a batch of evaluations to Umpire.
+            policy (SchedulingPolicy, optional): How evaluations are coalesced. Defaults to None.
+        """
+
+        self.policy = policy if policy is not None else SchedulingPolicy()
+        self._submit = submit
+        self._pending = []
+        self._pending_size = 0
+        self._tasks = set()
+
+    async def schedule(
+        self, submissions: List[EvaluationSubmission]
+    ) -> ScheduledEvaluations:
+        """Schedules evaluations as part of the next batch.
+
+        Args:
+            submissions (List[EvaluationSubmission]): The evaluation submissions.
+
+        Returns:
+            ScheduledEvaluations: The batches containing the evaluations.
+        """
+
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+
+        self._pending.append((submissions, future))
+        self._pending_size += len(submissions)
+
+        if self._pending_size >= self.policy.max_batch_size:
+            self._submit_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.policy.window, self._submit_pending)
+
+        return await future
+
+    def _submit_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        self._pending_size = 0
+
+        task = asyncio.ensure_future(self._submit_all(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _submit_all(
+        self, pending: List[Tuple[List[EvaluationSubmission], asyncio.Future]]
+    ) -> None:
+        # the batch in which each caller's evaluations end
+        last_chunks: Dict[int, int] = {}
+        owners = []
+        for caller, (submissions, _) in enumerate(pending):
+            owners.extend(caller for _ in submissions)
+
+        chunks = list(
+            chunk_submissions(
+                (
+                    submission
+                    for submissions, _ in pending
+                    for submission in submissions
+                ),
+                self.policy.max_batch_size,
+                self.policy.max_batch_bytes,
+            )
+        )
+
+        chunk_callers = []
+        offset = 0
+        for i, chunk in enumerate(chunks):
+            callers = sorted(set(owners[offset : offset + len(chunk)]))
+            offset += len(chunk)
+
+            chunk_callers.append(callers)
+            for caller in callers:
+                last_chunks[caller] = i
+
+        responses: Dict[int, List[ScheduleEvaluationBatchResponse]] = {}
+        errors: Dict[int, Exception] = {}
+
+        for i, chunk in enumerate(chunks):
+            try:
+                response = await self._submit(chunk)
+            except Exception as e:
+                response = None
+                for caller in chunk_callers[i]:
+                    errors.setdefault(caller, e)
+
+            for caller in chunk_callers[i]:
+                if response is not None:
+                    responses.setdefault(caller, []).append(response)
+
+                if last_chunks[caller] == i:
+                    self._resolve(
+                        pending[caller][1], responses.get(caller), errors.get(caller)
+                    )
+
+        # callers that scheduled no evaluations at all
+        for caller, (submissions, future) in enumerate(pending):
+            if not submissions:
+                self._resolve(future, [], None)
+
+    def _resolve(
+        self,
+        future: asyncio.Future,
+        responses: Optional[List[ScheduleEvaluationBatchResponse]],
+        error: Optional[Exception],
+    ) -> None:
+        if future.done():
+            return
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(ScheduledEvaluations(responses or []))
+
+    async def flush(self) -> None:
+        """Submits any gathered evaluations straight away and waits for every
+        submission to complete."""
+
+        self._submit_pending()
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+@dataclass
+class PriorityPolicy:
+    """Determines how evaluations scheduled in different priority lanes are
+    submitted to Umpire.
+
+    Lanes are drained by weighted round robin, so that each lane receives a share of
+    every batch in proportion to its weight while it has evaluations waiting, and an
+    idle lane's share goes to the others.
+
+    Attributes:
+        lanes (Dict[str, int]): The weight of each lane, by name.
+        default_lane (str): The lane in which evaluations scheduled in a lane that is not
+            configured are queued (e.g. "activation" if only custom lanes are given), or
+            the first lane if this is not configured either.
+        rate (Optional[float]): The maximum number of evaluations submitted per second,
+            if limited at all.
+        burst (int): The maximum number of tokens saved up while idle when rate limited.
+        window (float): The maximum time in seconds for which tokens are left to build up
+            into a batch of every waiting evaluation (up to the maximum batch size) when
+            rate limited, so that a steady rate limit still yields full batches rather
+            than one RPC per evaluation, while fresh evaluations are never held back for
+            longer than this behind a sweep.
+        max_batch_size (int): The maximum number of evaluations in a batch.
+        max_batch_bytes (int): The approximate maximum size of a batch request in bytes.
+    """
+
+    lanes: Dict[str, int] = field(
+        default_factory=lambda: {
+            LANE_ACTIVATION: 8,
+            LANE_DEFAULT: 4,
+            LANE_BACKGROUND: 1,
+        }
+    )
+    default_lane: str = LANE_DEFAULT
+    rate: Optional[float] = None
+    burst: int = 1000
+    window: float = 0.1
+    max_batch_size: int = 1000
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES
+
+
+class TokenBucket:
+    """A token bucket limiting the rate at which evaluations are submitted."""
+
+    rate: float
+    capacity: float
+    _tokens: float
+    _updated_at: float
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        if rate <= 0:
+            raise ValueError("The rate must be positive.")
+
+        if capacity < 1:
+            raise ValueError("The capacity must be at least 1.")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def available(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+        return self._tokens
+
+    async def wait_for(self, tokens: float, timeout: Optional[float] = None) -> None:
+        """Waits until a number of tokens are available, without taking them.
+
+        Args:
+            tokens (float): The number of tokens, which is capped at the capacity.
+            timeout (Optional[float], optional): The maximum time in seconds to wait,
+                if limited at all. Defaults to None.
+        """
+
+        tokens = min(tokens, self.capacity)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while self.available() < tokens:
+            delay = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+
+                delay = min(delay, remaining)
+
+            await asyncio.sleep(delay)
+
+    def take(self, tokens: float) -> None:
+        self.available()
+        self._tokens -= tokens
+
+
+class _ScheduleRequest:
+    __slots__ = ("submissions", "future", "offset", "remaining", "responses", "error")
+
+    def __init__(
+        self, submissions: List[EvaluationSubmission], future: asyncio.Future
+    ) -> None:
+        self.submissions = submissions
+        self.future = future
+        self.offset = 0
+        self.remaining = len(submissions)
+        self.responses = []
+        self.error = None
+
+
+class PriorityScheduler:
+    """Queues evaluations in named priority lanes and submits them to Umpire in
+    batches, one batch at a time, draining the lanes by weighted round robin under
+    an optional rate limit.
+
+    Evaluations scheduled while a batch is being submitted are gathered into the
+    next batch, so fresh activations overtake a large background sweep that is
+    still waiting in the queue.
+
+    Each caller receives the responses for every batch containing its evaluations.
+    """
+
+    policy: PriorityPolicy
+    _submit: BatchSubmitter
+    _queues: Dict[str, Deque[_ScheduleRequest]]
+    _deficits: Dict[str, int]
+    _pending_size: int
+    _bucket: Optional[TokenBucket]
+    _fallback_lane: str
+    _drainer: Optional[asyncio.Future] = None
+
+    def __init__(self, submit: BatchSubmitter, policy: PriorityPolicy = None) -> None:
+        """Creates a new priority scheduler.
+
+        Args:
+            submit (BatchSubmitter): Submits a batch of evaluations to Umpire.
+            policy (PriorityPolicy, optional): The lanes and rate limit. Defaults to None.
+        """
+
+        self.policy = policy if policy is not None else PriorityPolicy()
+
+        if not self.policy.lanes or any(
+            weight < 1 for weight in self.policy.lanes.values()
+        ):
+            raise ValueError("There must be at least one lane, of weight at least 1.")
+
+        self._submit = submit
+        self._fallback_lane = (
+            self.policy.default_lane
+            if self.policy.default_lane in self.policy.lanes
+            else next(iter(self.policy.lanes))
+        )
+        self._queues = {lane: deque() for lane in self.policy.lanes}
+        self._deficits = {lane: 0 for lane in self.policy.lanes}
+        self._pending_size = 0
+        self._bucket = (
+            TokenBucket(self.policy.rate, self.policy.burst)
+            if self.policy.rate is not None
+            else None
+        )
+
+    def pending(self, lane: Optional[str] = None) -> int:
+        """Returns the number of evaluations waiting to be submitted.
+
+        Args:
+            lane (Optional[str], optional): The lane, or None for every lane. Defaults to None.
+
+        Returns:
+            int: The number of evaluations.
+        """
+
+        if lane is None:
+            return self._pending_size
+
+        return sum(request.remaining for request in self._queues[lane])
+
+    async def schedule(
+        self, submissions: List[EvaluationSubmission], lane: str = LANE_DEFAULT
+    ) -> ScheduledEvaluations:
+        """Queues evaluations in a lane and waits for them to be submitted.
+
+        Args:
+            submissions (List[EvaluationSubmission]): The evaluation submissions.
+            lane (str, optional): The name of the lane, falling back to the policy's default
+                lane if it is not configured. Defaults to "default".
+
+        Returns:
+            ScheduledEvaluations: The batches containing the evaluations.
+        """
+
+        if lane not in self._queues:
+            lane = self._fallback_lane
+
+        if not submissions:
+            return ScheduledEvaluations()
+
+        request = _ScheduleRequest(
+            submissions, asyncio.get_event_loop().create_future()
+        )
+        self._queues[lane].append(request)
+        self._pending_size += len(submissions)
+
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.ensure_future(self._drain())
+
+        return await request.future
+
+    def _take_batch(
+        self, limit: int
+    ) -> Tuple[List[EvaluationSubmission], List[Tuple[_ScheduleRequest, int]]]:
+        batch: List[EvaluationSubmission] = []
+        batch_bytes = 0
+        # the requests with evaluations in the batch and how many of each
+        parts: List[Tuple[_ScheduleRequest, int]] = []
+
+        while len(batch) < limit and self._pending_size > 0:
+            for lane, weight in self.policy.lanes.items():
+                queue = self._queues[lane]
+                if not queue:
+                    # idle lanes do not save up their share
+                    self._deficits[lane] = 0
+                    continue
+
+                self._deficits[lane] += weight
+
+                while queue and self._deficits[lane] > 0 and len(batch) < limit:
+                    request = queue[0]
+                    submission = request.submissions[request.offset]
+
+                    size = estimate_submission_size(submission)
+                    if batch and batch_bytes + size > self.policy.max_batch_bytes:
+                        return batch, parts
+
+                    batch.append(submission)
+                    batch_bytes += size
+                    request.offset += 1
+                    self._deficits[lane] -= 1
+                    self._pending_size -= 1
+
+                    if parts and parts[-1][0] is request:
+                        parts[-1] = (request, parts[-1][1] + 1)
+                    else:
+                        parts.append((request, 1))
+
+                    if request.offset == len(request.submissions):
+                        queue.popleft()
+
+                if len(batch) >= limit:
+                    break
+
+        return batch, parts
+
+    async def _drain(self) -> None:
+        while self._pending_size > 0:
+            limit = self.policy.max_batch_size
+
+            if self._bucket is not None:
+                await self._bucket.wait_for(1)
+
+                # under a steady rate limit the bucket never fills up, so tokens are
+                # left to build up for a while, or batches would hold one evaluation
+                await self._bucket.wait_for(
+                    min(self._pending_size, limit), timeout=self.policy.window
+                )
+                limit = min(limit, max(int(self._bucket.available()), 1))
+
+            batch, parts = self._take_batch(limit)
+            if not batch:
+                break
+
+            if self._bucket is not None:
+                self._bucket.take(len(batch))
+
+            try:
+                response, error = await self._submit(batch), None
+            except Exception as e:
+                response, error = None, e
+
+            for request, count in parts:
+                request.remaining -= count
+
+                if error is not None and request.error is None:
+                    request.error = error
+                elif response is not None:
+                    request.responses.append(response)
+
+                if request.remaining == 0 and not request.future.done():
+                    if request.error is not None:
+                        request.future.set_exception(request.error)
+                    else:
+                        request.future.set_result(
+                            ScheduledEvaluations(request.responses)
+                        )
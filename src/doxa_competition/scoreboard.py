@@ -0,0 +1,154 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from doxa_competition.leaderboard import Leaderboard
+from doxa_competition.proto.umpire.scoreboard import (
+    AgentResults,
+    GetCompetitionResultsResponse,
+)
+
+ScoreboardFetcher = Callable[[], Awaitable[GetCompetitionResultsResponse]]
+
+
+class ScoreboardCache:
+    """A cached view of a competition scoreboard.
+
+    The scoreboard is refetched once it is older than the TTL, with concurrent
+    callers sharing a single in-flight request. Results written through the
+    competition context are applied to the cached scoreboard straight away,
+    so that it stays fresh without being refetched.
+
+    The scoreboard returned is shared between callers and should not be modified.
+    """
+
+    ttl: float
+    _fetch: ScoreboardFetcher
+    _scoreboard: Optional[GetCompetitionResultsResponse] = None
+    _agents: Dict[int, AgentResults]
+    _leaderboards: Dict[str, Leaderboard]
+    _expires_at: float = 0.0
+    _refreshing: Optional[asyncio.Future] = None
+    _version: int = 0
+
+    def __init__(self, fetch: ScoreboardFetcher, ttl: float = 5.0) -> None:
+        """Creates a new scoreboard cache.
+
+        Args:
+            fetch (ScoreboardFetcher): Fetches the scoreboard from Umpire.
+            ttl (float, optional): The time in seconds for which the scoreboard
+                is cached. Defaults to 5.0.
+        """
+
+        self.ttl = ttl
+        self._fetch = fetch
+        self._agents = {}
+        self._leaderboards = {}
+
+    def is_fresh(self) -> bool:
+        """Returns whether the cached scoreboard can be used without being refetched.
+
+        Returns:
+            bool: Whether the cached scoreboard is fresh.
+        """
+
+        return self._scoreboard is not None and time.monotonic() < self._expires_at
+
+    async def get(self) -> GetCompetitionResultsResponse:
+        """Returns the scoreboard, refetching it if the cached scoreboard has expired.
+
+        Returns:
+            GetCompetitionResultsResponse: The scoreboard.
+        """
+
+        if self.is_fresh():
+            return self._scoreboard
+
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+
+        # a caller being cancelled must not cancel the refresh for everyone else
+        return await asyncio.shield(self._refreshing)
+
+    async def _refresh(self) -> GetCompetitionResultsResponse:
+        version = self._version
+
+        try:
+            scoreboard = await self._fetch()
+        finally:
+            self._refreshing = None
+
+        self._scoreboard = scoreboard
+        self._agents = {results.agent_id: results for results in scoreboard.scoreboard}
+        self._leaderboards = {}
+
+        # results written while the request was in flight may be missing from the
+        # response, so it is only used by the callers already waiting for it
+        self._expires_at = (
+            time.monotonic() + self.ttl if version == self._version else 0.0
+        )
+
+        return scoreboard
+
+    async def get_leaderboard(self, metric: str) -> Leaderboard:
+        """Returns a leaderboard for a metric, which is kept up to date as results
+        are written and rebuilt whenever the scoreboard is refetched.
+
+        Args:
+            metric (str): The metric by which agents are ranked.
+
+        Returns:
+            Leaderboard: The leaderboard.
+        """
+
+        await self.get()
+
+        if metric not in self._leaderboards:
+            self._leaderboards[metric] = Leaderboard.from_scoreboard(
+                list(self._agents.values()), metric
+            )
+
+        return self._leaderboards[metric]
+
+    def _update(self, agent_id: int, metric: str, result: int, is_set: bool) -> None:
+        self._version += 1
+
+        results = self._agents.get(agent_id)
+        if results is None:
+            # the agent is not on the cached scoreboard (e.g. it has just been activated)
+            self.invalidate()
+            return
+
+        results.results[metric] = (
+            result if is_set else results.results.get(metric, 0) + result
+        )
+
+        if metric in self._leaderboards:
+            self._leaderboards[metric].update(agent_id, results.results[metric])
+
+    def set_result(self, agent_id: int, metric: str, result: int) -> None:
+        """Applies setting an agent result to the cached scoreboard.
+
+        Args:
+            agent_id (int): The agent ID.
+            metric (str): The metric.
+            result (int): The result.
+        """
+
+        self._update(agent_id, metric, result, True)
+
+    def add_to_result(self, agent_id: int, metric: str, result: int) -> None:
+        """Applies adding to an agent result to the cached scoreboard.
+
+        Args:
+            agent_id (int): The agent ID.
+            metric (str): The metric.
+            result (int): The amount added.
+        """
+
+        self._update(agent_id, metric, result, False)
+
+    def invalidate(self) -> None:
+        """Ensures the scoreboard is refetched the next time it is requested."""
+
+        self._expires_at = 0.0
@@ -0,0 +1,390 @@
+import asyncio
+import multiprocessing
+import signal
+import time
+from pydoc import locate
+from typing import Dict, List, Optional
+
+import click
+from _pulsar import ConsumerType
+
+from doxa_competition.acknowledgement import ACK_AFTER_PROCESSING, ACK_ON_RECEIVE
+from doxa_competition.coalescing import ReadCachePolicy
+from doxa_competition.results import ResultBufferPolicy
+from doxa_competition.retries import RetryPolicy
+from doxa_competition.runner import CompetitionRunner
+from doxa_competition.scheduling import PriorityPolicy, SchedulingPolicy
+
+# a runner process that stays up for this long is considered to have
+# started successfully, resetting the delay before the next restart
+STABLE_PROCESS_TIME = 60
+
+MAX_RESTART_DELAY = 60
+
+SUBSCRIPTION_TYPES = {
+    "shared": ConsumerType.Shared,
+    "key-shared": ConsumerType.KeyShared,
+}
+
+
+def run_competition_runner(competitions: List[str], runner_options: dict) -> None:
+    """Runs a competition runner in the current process until it receives
+    SIGINT or SIGTERM, at which point it stops gracefully.
+
+    Args:
+        competitions (List[str]): The fully qualified class names of the competitions.
+        runner_options (dict): Keyword arguments for the competition runner, where
+            the subscription type is given by name so as to be picklable.
+    """
+
+    options = dict(runner_options)
+    options["consumer_type"] = SUBSCRIPTION_TYPES[options.pop("subscription_type")]
+
+    async def main():
+        runner = CompetitionRunner(**options)
+
+        for competition in competitions:
+            runner.register(locate(competition)())
+
+        loop = asyncio.get_event_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, runner.stop)
+
+        await runner.run()
+
+    asyncio.run(main())
+
+
+class RunnerSupervisor:
+    """Starts a number of competition runner processes sharing the competition
+    service subscription, restarting any that exit unexpectedly."""
+
+    processes: int
+    restart_delay: float
+    shutdown_timeout: float
+    _competitions: List[str]
+    _runner_options: dict
+    _context: multiprocessing.context.BaseContext
+    _workers: Dict[int, multiprocessing.Process]
+    _started_at: Dict[int, float]
+    _restart_delays: Dict[int, float]
+    _restart_at: Dict[int, float]
+    _stopping: bool
+
+    def __init__(
+        self,
+        competitions: List[str],
+        runner_options: dict,
+        processes: int = 1,
+        restart_delay: float = 1,
+        shutdown_timeout: float = 30,
+    ) -> None:
+        if processes < 1:
+            raise ValueError("At least one runner process is required.")
+
+        self.processes = processes
+        self.restart_delay = restart_delay
+        self.shutdown_timeout = shutdown_timeout
+        self._competitions = competitions
+        self._runner_options = runner_options
+
+        # the Pulsar client is not fork-safe, so each process starts from scratch
+        self._context = multiprocessing.get_context("spawn")
+
+        self._workers = {}
+        self._started_at = {}
+        self._restart_delays = {}
+        self._restart_at = {}
+        self._stopping = False
+
+    def _start(self, index: int) -> None:
+        process = self._context.Process(
+            target=run_competition_runner,
+            args=(self._competitions, self._runner_options),
+            name=f"doxa-competition-runner-{index}",
+        )
+        process.start()
+
+        self._workers[index] = process
+        self._started_at[index] = time.monotonic()
+
+        print(
+            f"[DOXA Competition Events] Started runner process {index} (PID {process.pid})"
+        )
+
+    def _check(self, index: int) -> None:
+        """Restarts a runner process if it has exited, backing off exponentially
+        if it keeps exiting shortly after being started."""
+
+        process = self._workers[index]
+        if process.is_alive() or self._stopping:
+            return
+
+        now = time.monotonic()
+
+        if index not in self._restart_at:
+            print(
+                f"[ERROR] Runner process {index} (PID {process.pid}) exited with code {process.exitcode}."
+            )
+
+            if now - self._started_at[index] >= STABLE_PROCESS_TIME:
+                self._restart_delays[index] = self.restart_delay
+            else:
+                self._restart_delays[index] = min(
+                    2 * self._restart_delays.get(index, self.restart_delay / 2),
+                    MAX_RESTART_DELAY,
+                )
+
+            self._restart_at[index] = now + self._restart_delays[index]
+
+        if now >= self._restart_at[index]:
+            del self._restart_at[index]
+            self._start(index)
+
+    def stop(self, *args) -> None:
+        """Requests that all runner processes are stopped."""
+
+        self._stopping = True
+
+    def _shutdown(self) -> None:
+        """Asks every runner process to stop gracefully, killing those that
+        do not stop within the shutdown timeout."""
+
+        for process in self._workers.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        for index, process in self._workers.items():
+            process.join(max(deadline - time.monotonic(), 0))
+
+            if process.is_alive():
+                print(f"[ERROR] Runner process {index} did not stop in time.")
+                process.kill()
+                process.join()
+
+    def run(self) -> None:
+        """Starts and supervises the runner processes until SIGINT or SIGTERM is received."""
+
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for index in range(self.processes):
+            self._start(index)
+
+        try:
+            while not self._stopping:
+                for index in range(self.processes):
+                    self._check(index)
+
+                time.sleep(0.5)
+        finally:
+            self._shutdown()
+
+        print("[DOXA Competition Events] All runner processes have stopped")
+
+
+@click.command()
+@click.option(
+    "--competition",
+    "-c",
+    type=str,
+    multiple=True,
+    help="The fully qualified class name of a competition to run.",
+)
+@click.option(
+    "--processes",
+    "-n",
+    type=int,
+    default=1,
+    help="Number of competition runner processes.",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=1,
+    help="The maximum number of events handled at once by each process.",
+)
+@click.option(
+    "--batch-size",
+    type=int,
+    default=None,
+    help="The maximum number of messages to receive at once, if receiving in batches.",
+)
+@click.option(
+    "--ack-after-processing",
+    is_flag=True,
+    default=False,
+    help="Only acknowledge messages once they have been handled successfully.",
+)
+@click.option(
+    "--buffer-results",
+    is_flag=True,
+    default=False,
+    help="Write agent results to Umpire in batches once each event has been handled.",
+)
+@click.option(
+    "--scoreboard-ttl",
+    type=float,
+    default=None,
+    help="The time in seconds for which competition scoreboards are cached, if at all.",
+)
+@click.option(
+    "--coalesce-scheduling",
+    is_flag=True,
+    default=False,
+    help="Submit evaluations scheduled concurrently to Umpire in batches.",
+)
+@click.option(
+    "--priority-scheduling",
+    is_flag=True,
+    default=False,
+    help="Queue evaluations in priority lanes, so that new agents are evaluated ahead of background sweeps.",
+)
+@click.option(
+    "--scheduling-rate",
+    type=float,
+    default=None,
+    help="The maximum number of evaluations submitted to Umpire per second with priority scheduling, if limited at all.",
+)
+@click.option(
+    "--read-cache-ttl",
+    type=float,
+    default=None,
+    help="The time in seconds for which agent results read from Umpire are reused, if at all.",
+)
+@click.option(
+    "--subscription-type",
+    type=click.Choice(["shared", "key-shared"]),
+    default="shared",
+    help="The competition service subscription type. Key-shared only orders events emitted with a partition key, which Umpire activation and deactivation events lack.",
+)
+@click.option(
+    "--pulsar-path",
+    type=str,
+    default="pulsar://pulsar:6650",
+    help="The path to a running Pulsar instance.",
+)
+@click.option(
+    "--umpire-host",
+    type=str,
+    default="umpire",
+    help="The host on which Umpire is running.",
+)
+@click.option(
+    "--umpire-port", type=int, default=80, help="The port on which Umpire is running."
+)
+@click.option(
+    "--umpire-channels",
+    type=int,
+    default=1,
+    help="The number of connections over which calls to Umpire are spread.",
+)
+@click.option(
+    "--umpire-timeout",
+    type=float,
+    default=None,
+    help="The time in seconds after which calls to Umpire are cancelled, if at all.",
+)
+@click.option(
+    "--umpire-keepalive",
+    type=float,
+    default=None,
+    help="The interval in seconds at which keepalive pings are sent to Umpire, if at all.",
+)
+@click.option(
+    "--umpire-retries",
+    type=int,
+    default=0,
+    help="The number of times idempotent calls to Umpire are retried upon failure.",
+)
+@click.option(
+    "--umpire-hedge-percentile",
+    type=float,
+    default=None,
+    help="The percentile of recent latencies (e.g. 0.95) after which idempotent calls to Umpire are hedged, if at all.",
+)
+@click.option(
+    "--shutdown-timeout",
+    type=float,
+    default=30,
+    help="The time in seconds to wait for runner processes to stop gracefully.",
+)
+def run(
+    competition: List[str],
+    processes: int,
+    concurrency: int,
+    batch_size: Optional[int],
+    ack_after_processing: bool,
+    buffer_results: bool,
+    scoreboard_ttl: Optional[float],
+    coalesce_scheduling: bool,
+    priority_scheduling: bool,
+    scheduling_rate: Optional[float],
+    read_cache_ttl: Optional[float],
+    subscription_type: str,
+    pulsar_path: str,
+    umpire_host: str,
+    umpire_port: int,
+    umpire_channels: int,
+    umpire_timeout: Optional[float],
+    umpire_keepalive: Optional[float],
+    umpire_retries: int,
+    umpire_hedge_percentile: Optional[float],
+    shutdown_timeout: float,
+):
+    """A CLI tool for running DOXA competition services across any number of processes.
+
+    With a key-shared subscription, messages with the same key (e.g. an enrolment ID)
+    are always delivered to the same process, so that they are handled in order.
+    However, the agent activation and deactivation events emitted by Umpire carry no
+    partition key, so they may still be handled out of order by different processes.
+    """
+
+    if len(competition) < 1:
+        raise RuntimeError("You must register at least one competition.")
+
+    for name in competition:
+        if locate(name) is None:
+            raise RuntimeError(f"The competition class {name} cannot be found.")
+
+    supervisor = RunnerSupervisor(
+        competitions=list(competition),
+        runner_options={
+            "pulsar_path": pulsar_path,
+            "umpire_host": umpire_host,
+            "umpire_port": umpire_port,
+            "umpire_channels": umpire_channels,
+            "umpire_timeout": umpire_timeout,
+            "umpire_keepalive": umpire_keepalive,
+            "umpire_retry": RetryPolicy(
+                max_attempts=umpire_retries + 1,
+                hedge_percentile=umpire_hedge_percentile,
+            )
+            if umpire_retries > 0 or umpire_hedge_percentile is not None
+            else None,
+            "max_concurrency": concurrency,
+            "max_batch_size": batch_size,
+            "ack_policy": ACK_AFTER_PROCESSING
+            if ack_after_processing
+            else ACK_ON_RECEIVE,
+            "subscription_type": subscription_type,
+            "result_buffering": ResultBufferPolicy() if buffer_results else None,
+            "scoreboard_ttl": scoreboard_ttl,
+            "scheduling": SchedulingPolicy() if coalesce_scheduling else None,
+            "priority_scheduling": PriorityPolicy(rate=scheduling_rate)
+            if priority_scheduling
+            else None,
+            "read_cache": ReadCachePolicy(ttl=read_cache_ttl)
+            if read_cache_ttl is not None
+            else None,
+        },
+        processes=processes,
+        shutdown_timeout=shutdown_timeout,
+    )
+
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    run()
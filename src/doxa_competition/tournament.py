@@ -0,0 +1,177 @@
+import asyncio
+import random
+import time
+from itertools import combinations, islice
+from typing import AbstractSet, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from doxa_competition.context import CompetitionContext, SchedulableEvaluation
+from doxa_competition.scheduling import LANE_BACKGROUND
+
+
+def round_robin(
+    agent_ids: List[int], size: int = 2, metadata: dict = None
+) -> Iterator[SchedulableEvaluation]:
+    """Generates an evaluation for every combination of agents.
+
+    Args:
+        agent_ids (List[int]): The agent IDs.
+        size (int, optional): The number of agents in each evaluation. Defaults to 2.
+        metadata (dict, optional): The metadata for every evaluation. Defaults to None.
+
+    Yields:
+        SchedulableEvaluation: The evaluations.
+    """
+
+    metadata = metadata if metadata is not None else {}
+
+    for agents in combinations(agent_ids, size):
+        yield SchedulableEvaluation(list(agents), metadata)
+
+
+def against_all(
+    agent_id: int, opponent_ids: Iterable[int], metadata: dict = None
+) -> Iterator[SchedulableEvaluation]:
+    """Generates an evaluation between an agent (e.g. one that has just been
+    activated) and every other agent.
+
+    Args:
+        agent_id (int): The agent ID.
+        opponent_ids (Iterable[int]): The agent IDs of the opponents.
+        metadata (dict, optional): The metadata for every evaluation. Defaults to None.
+
+    Yields:
+        SchedulableEvaluation: The evaluations.
+    """
+
+    metadata = metadata if metadata is not None else {}
+
+    for opponent_id in opponent_ids:
+        if opponent_id != agent_id:
+            yield SchedulableEvaluation([agent_id, opponent_id], metadata)
+
+
+def sample_opponents(
+    agent_ids: List[int],
+    k: int,
+    metadata: dict = None,
+    rng: Optional[random.Random] = None,
+) -> Iterator[SchedulableEvaluation]:
+    """Generates evaluations between every agent and k distinct opponents chosen at random.
+
+    Args:
+        agent_ids (List[int]): The agent IDs.
+        k (int): The number of opponents for each agent.
+        metadata (dict, optional): The metadata for every evaluation. Defaults to None.
+        rng (Optional[random.Random], optional): The random number generator. Defaults to None.
+
+    Yields:
+        SchedulableEvaluation: The evaluations.
+    """
+
+    metadata = metadata if metadata is not None else {}
+    rng = rng if rng is not None else random.Random()
+    k = min(k, len(agent_ids) - 1)
+
+    for i, agent_id in enumerate(agent_ids):
+        # sample from every other position, skipping over the agent itself
+        for j in rng.sample(range(len(agent_ids) - 1), k):
+            yield SchedulableEvaluation(
+                [agent_id, agent_ids[j if j < i else j + 1]], metadata
+            )
+
+
+def swiss_pairings(
+    standings: Iterable[Tuple[int, float]],
+    played: AbstractSet[FrozenSet[int]] = frozenset(),
+    metadata: dict = None,
+) -> Iterator[SchedulableEvaluation]:
+    """Generates a round of Swiss pairings, in which agents are paired with the
+    next highest ranked agent that they have not played yet.
+
+    If the number of agents is odd, the lowest ranked unpaired agent gets a bye.
+
+    Args:
+        standings (Iterable[Tuple[int, float]]): The agent IDs and scores,
+            e.g. from `Leaderboard.top_k`.
+        played (AbstractSet[FrozenSet[int]], optional): The pairs of agents that have
+            already played each other. Defaults to no pairs.
+        metadata (dict, optional): The metadata for every evaluation. Defaults to None.
+
+    Yields:
+        SchedulableEvaluation: The evaluations.
+    """
+
+    metadata = metadata if metadata is not None else {}
+    ranking = [
+        agent_id for agent_id, _ in sorted(standings, key=lambda standing: -standing[1])
+    ]
+    paired = [False] * len(ranking)
+
+    for i, agent_id in enumerate(ranking):
+        if paired[i]:
+            continue
+
+        # fall back to a rematch against the next unpaired agent if need be
+        opponent = None
+        for j in range(i + 1, len(ranking)):
+            if paired[j]:
+                continue
+
+            if opponent is None:
+                opponent = j
+
+            if frozenset((agent_id, ranking[j])) not in played:
+                opponent = j
+                break
+
+        if opponent is None:
+            break
+
+        paired[i] = paired[opponent] = True
+        yield SchedulableEvaluation([agent_id, ranking[opponent]], metadata)
+
+
+async def schedule_stream(
+    context: CompetitionContext,
+    evaluations: Iterable[SchedulableEvaluation],
+    chunk_size: int = 1000,
+    rate: Optional[float] = None,
+    lane: str = LANE_BACKGROUND,
+) -> int:
+    """Schedules evaluations from a (possibly lazily generated) iterable in chunks,
+    so that large tournaments never have to be held in memory all at once.
+
+    Args:
+        context (CompetitionContext): The competition context.
+        evaluations (Iterable[SchedulableEvaluation]): The evaluations.
+        chunk_size (int, optional): The number of evaluations scheduled at once. Defaults to 1000.
+        rate (Optional[float], optional): The maximum number of evaluations scheduled per second,
+            if limited at all. Defaults to None.
+        lane (str, optional): The priority lane in which the evaluations are queued, if
+            priority scheduling is enabled. Defaults to "background".
+
+    Returns:
+        int: The number of evaluations scheduled.
+    """
+
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be at least 1.")
+
+    evaluations = iter(evaluations)
+    started_at = time.monotonic()
+    scheduled = 0
+
+    while True:
+        chunk = list(islice(evaluations, chunk_size))
+        if not chunk:
+            break
+
+        if rate is not None:
+            await asyncio.sleep(
+                max(started_at + scheduled / rate - time.monotonic(), 0)
+            )
+
+        await context.schedule_evaluation_batch(chunk, lane=lane)
+        scheduled += len(chunk)
+
+    return scheduled
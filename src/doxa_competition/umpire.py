@@ -0,0 +1,187 @@
+from itertools import cycle
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar, Union
+
+import betterproto
+from grpclib.client import Channel
+
+from doxa_competition.proto.umpire.agent import UmpireAgentServiceStub
+from doxa_competition.proto.umpire.evaluation import UmpireEvaluationServiceStub
+from doxa_competition.proto.umpire.scheduling import UmpireSchedulingServiceStub
+from doxa_competition.proto.umpire.scoreboard import UmpireScoreboardServiceStub
+from doxa_competition.retries import Retrier, RetryCounters, RetryPolicy
+
+StubType = TypeVar("StubType", bound=betterproto.ServiceStub)
+
+# the methods that may safely be retried or hedged, as repeating them has no further effect
+IDEMPOTENT_METHODS = frozenset(
+    [
+        "get_agent_results",
+        "set_agent_result",
+        "set_agent_results",
+        "get_competition_evaluation_results",
+        "set_evaluation_result",
+        "get_competition_results",
+        "complete_evaluation",
+        "register_driver",
+        "deregister_driver",
+    ]
+)
+
+
+class UmpireClient:
+    """A client for Umpire spreading calls over a pool of gRPC channels.
+
+    Each channel is a single HTTP/2 connection, which limits the number of
+    concurrent streams, so calls are distributed over the channels in
+    round-robin order. Service stubs are created once per channel and reused.
+
+    Calls made through `call` may also be retried and hedged according to a retry
+    policy, with each attempt made on the next channel.
+    """
+
+    timeout: Optional[float]
+    retrier: Optional[Retrier]
+    _channels: List[Channel]
+    _next_channel: "cycle[int]"
+    _stubs: Dict[Tuple[type, int], betterproto.ServiceStub]
+    _owns_channels: bool
+
+    def __init__(
+        self,
+        channels: List[Channel],
+        timeout: Optional[float] = None,
+        owns_channels: bool = True,
+        retry: Optional[RetryPolicy] = None,
+    ) -> None:
+        """Creates a new Umpire client.
+
+        Args:
+            channels (List[Channel]): The channels to Umpire.
+            timeout (Optional[float], optional): The default time in seconds after which
+                calls are cancelled, if at all. Defaults to None.
+            owns_channels (bool, optional): Whether the channels are closed along with
+                the client. Defaults to True.
+            retry (Optional[RetryPolicy], optional): How calls are retried and hedged,
+                if at all. Defaults to None.
+        """
+
+        if not channels:
+            raise ValueError("The Umpire client requires at least one channel.")
+
+        self.timeout = timeout
+        self._channels = channels
+        self._next_channel = cycle(range(len(channels)))
+        self._stubs = {}
+        self._owns_channels = owns_channels
+        self.retrier = Retrier(retry) if retry is not None else None
+
+    @classmethod
+    def wrap(cls, umpire: Union["UmpireClient", Channel]) -> "UmpireClient":
+        """Returns an Umpire client for either an existing client or a single channel,
+        which is left open when the client is closed.
+
+        Args:
+            umpire (Union[UmpireClient, Channel]): The client or channel.
+
+        Returns:
+            UmpireClient: The client.
+        """
+
+        if isinstance(umpire, UmpireClient):
+            return umpire
+
+        return cls([umpire], owns_channels=False)
+
+    def channel(self) -> Channel:
+        """Returns the next channel in round-robin order.
+
+        Returns:
+            Channel: The channel.
+        """
+
+        return self._channels[next(self._next_channel)]
+
+    def stub(self, stub_type: Type[StubType]) -> StubType:
+        """Returns a service stub bound to the next channel in round-robin order.
+
+        Args:
+            stub_type (Type[StubType]): The type of service stub.
+
+        Returns:
+            StubType: The service stub.
+        """
+
+        index = next(self._next_channel)
+
+        stub = self._stubs.get((stub_type, index))
+        if stub is None:
+            stub = self._stubs[(stub_type, index)] = stub_type(
+                self._channels[index], timeout=self.timeout
+            )
+
+        return stub
+
+    @property
+    def agent(self) -> UmpireAgentServiceStub:
+        return self.stub(UmpireAgentServiceStub)
+
+    @property
+    def evaluation(self) -> UmpireEvaluationServiceStub:
+        return self.stub(UmpireEvaluationServiceStub)
+
+    @property
+    def scheduling(self) -> UmpireSchedulingServiceStub:
+        return self.stub(UmpireSchedulingServiceStub)
+
+    @property
+    def scoreboard(self) -> UmpireScoreboardServiceStub:
+        return self.stub(UmpireScoreboardServiceStub)
+
+    async def call(
+        self,
+        stub_type: Type[betterproto.ServiceStub],
+        method: str,
+        request: betterproto.Message,
+        idempotent: Optional[bool] = None,
+    ) -> Any:
+        """Makes a unary call to Umpire, applying the retry policy if there is one.
+
+        Args:
+            stub_type (Type[betterproto.ServiceStub]): The type of service stub.
+            method (str): The name of the stub method.
+            request (betterproto.Message): The request.
+            idempotent (Optional[bool], optional): Whether the call may safely be made more
+                than once. Defaults to whether the method is known to be idempotent.
+
+        Returns:
+            Any: The response.
+        """
+
+        if self.retrier is None:
+            return await getattr(self.stub(stub_type), method)(request)
+
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+
+        return await self.retrier.call(
+            method,
+            lambda timeout: getattr(self.stub(stub_type), method)(
+                request, timeout=timeout
+            ),
+            idempotent,
+        )
+
+    @property
+    def counters(self) -> Optional[RetryCounters]:
+        """The number of calls, retries and hedges made, if there is a retry policy."""
+
+        return self.retrier.counters if self.retrier is not None else None
+
+    def close(self) -> None:
+        """Closes the channels, if owned by the client."""
+
+        if not self._owns_channels:
+            return
+
+        for channel in self._channels:
+            channel.close()
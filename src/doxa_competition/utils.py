@@ -2,8 +2,14 @@ import json
 import logging
 import os
 
+from typing import Optional
+
 import pulsar
 from grpclib.client import Channel
+from grpclib.config import Configuration
+
+from doxa_competition.retries import RetryPolicy
+from doxa_competition.umpire import UmpireClient
 
 PULSAR_PATH = "pulsar://pulsar:6650"
 
@@ -12,6 +18,51 @@ def make_umpire_channel(host: str = "umpire", port: int = 80) -> Channel:
     return Channel(host=host, port=port)
 
 
+def make_umpire_client(
+    host: str = "umpire",
+    port: int = 80,
+    channels: int = 1,
+    timeout: Optional[float] = None,
+    keepalive_time: Optional[float] = None,
+    keepalive_timeout: float = 20.0,
+    retry: Optional[RetryPolicy] = None,
+) -> UmpireClient:
+    """Creates a new Umpire client with a pool of channels.
+
+    Args:
+        host (str, optional): The Umpire host. Defaults to "umpire".
+        port (int, optional): The Umpire port. Defaults to 80.
+        channels (int, optional): The number of channels (i.e. HTTP/2 connections)
+            over which calls are spread. Defaults to 1.
+        timeout (Optional[float], optional): The default time in seconds after which
+            calls are cancelled, if at all. Defaults to None.
+        keepalive_time (Optional[float], optional): The interval in seconds at which
+            keepalive pings are sent on each connection, if at all. Defaults to None.
+        keepalive_timeout (float, optional): The time in seconds after which a connection
+            is closed if a keepalive ping is not acknowledged. Defaults to 20.0.
+        retry (Optional[RetryPolicy], optional): How calls are retried and hedged,
+            if at all. Defaults to None.
+
+    Returns:
+        UmpireClient: The Umpire client.
+    """
+
+    if channels < 1:
+        raise ValueError("The Umpire client requires at least one channel.")
+
+    config = Configuration(
+        _keepalive_time=keepalive_time,
+        _keepalive_timeout=keepalive_timeout,
+        _keepalive_permit_without_calls=keepalive_time is not None,
+    )
+
+    return UmpireClient(
+        [Channel(host=host, port=port, config=config) for _ in range(channels)],
+        timeout=timeout,
+        retry=retry,
+    )
+
+
 def make_pulsar_client(pulsar_path: str = None) -> pulsar.Client:
     """Creates a new Pulsar client instance.
 
@@ -36,7 +87,11 @@ def make_pulsar_client(pulsar_path: str = None) -> pulsar.Client:
 
 
 def send_pulsar_message(
-    client: pulsar.Client, topic: str, body: dict, properties: dict
+    client: pulsar.Client,
+    topic: str,
+    body: dict,
+    properties: dict,
+    partition_key: str = None,
 ) -> None:
     """Sends a pulsar message for a given topic.
 
@@ -45,13 +100,35 @@ def send_pulsar_message(
         topic (str): The full topic name.
         body (dict): The JSON message to be encoded.
         properties (dict): Any additional message properties.
+        partition_key (str, optional): The message key, used to route messages
+            with the same key to the same consumer on key-shared subscriptions. Defaults to None.
     """
 
     producer = client.create_producer(topic)
-    producer.send(json.dumps(body).encode("utf-8"), properties)
+    producer.send(
+        json.dumps(body).encode("utf-8"), properties, partition_key=partition_key
+    )
     producer.close()
 
 
+def import_numpy():
+    """Imports NumPy, which is only required for some optional features
+    (e.g. computing ratings).
+
+    Returns:
+        module: The numpy module.
+    """
+
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError(
+            "NumPy is required for this feature: install doxa-competition[numpy]."
+        ) from e
+
+    return numpy
+
+
 def is_valid_filename(filename: str) -> bool:
     return bool(
         filename
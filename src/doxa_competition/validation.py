@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+TYPE_NAMES = {
+    bool: "a boolean",
+    int: "an integer",
+    float: "a number",
+    str: "a string",
+    list: "an array",
+    dict: "an object",
+}
+
+# the errors (if any) for a value at a path
+Validator = Callable[[Any, str], List["FieldError"]]
+
+
+@dataclass
+class FieldError:
+    """A reason why a field of a payload is not valid.
+
+    Attributes:
+        field (str): The path to the field, e.g. "participants[0].agent_id".
+        message (str): What is wrong with the field.
+    """
+
+    field: str
+    message: str
+
+
+class ValidationError(ValueError):
+    """Raised when a payload does not match its schema."""
+
+    errors: List[FieldError]
+
+    def __init__(self, errors: List[FieldError]) -> None:
+        super().__init__(
+            "; ".join(f"{error.field}: {error.message}" for error in errors)
+        )
+        self.errors = errors
+
+    def to_list(self) -> List[Dict[str, str]]:
+        return [
+            {"field": error.field, "message": error.message} for error in self.errors
+        ]
+
+
+class Field:
+    """A field in a schema.
+
+    Attributes:
+        name (str): The key of the field.
+        types (Tuple[type, ...]): The types that the value may have.
+        required (bool): Whether the field must be present.
+        items (Optional[Schema]): The schema of each item, for arrays of objects.
+        min_items (int): The minimum number of items, for arrays.
+        check (Optional[Callable[[Any], bool]]): Any further check of the value.
+        message (str): The error message if the further check fails.
+    """
+
+    __slots__ = ("name", "types", "required", "items", "min_items", "check", "message")
+
+    def __init__(
+        self,
+        name: str,
+        types: Union[type, Tuple[type, ...]],
+        required: bool = True,
+        items: Optional["Schema"] = None,
+        min_items: int = 0,
+        check: Optional[Callable[[Any], bool]] = None,
+        message: str = "is not valid",
+    ) -> None:
+        self.name = name
+        self.types = types if isinstance(types, tuple) else (types,)
+        self.required = required
+        self.items = items
+        self.min_items = min_items
+        self.check = check
+        self.message = message
+
+
+class Schema:
+    """A declarative schema for a JSON object, compiled into a validator.
+
+    Unlike assertions, the validator reports every field that is not valid
+    and still runs when Python is optimised (with -O).
+    """
+
+    fields: Sequence[Field]
+
+    def __init__(self, fields: Sequence[Field]) -> None:
+        self.fields = fields
+
+    def compile(self) -> Validator:
+        """Compiles the schema into a validator, so that the work of interpreting
+        the schema is only done once rather than for every payload.
+
+        Returns:
+            Validator: The validator, returning the errors for a payload at a path.
+        """
+
+        # booleans are integers in Python, but not in JSON
+        checks = tuple(
+            (
+                field.name,
+                field.types,
+                bool not in field.types and int in field.types,
+                " or ".join(TYPE_NAMES.get(t, t.__name__) for t in field.types),
+                field.required,
+                field.items.compile() if field.items is not None else None,
+                field.min_items,
+                field.check,
+                field.message,
+            )
+            for field in self.fields
+        )
+
+        def validate(payload: Any, path: str = "") -> List[FieldError]:
+            if type(payload) is not dict:
+                return [FieldError(path or "$", "must be an object")]
+
+            errors = []
+            prefix = f"{path}." if path else ""
+
+            for (
+                name,
+                types,
+                exclude_bool,
+                type_name,
+                required,
+                items,
+                min_items,
+                check,
+                message,
+            ) in checks:
+                if name not in payload:
+                    if required:
+                        errors.append(FieldError(prefix + name, "is required"))
+                    continue
+
+                value = payload[name]
+                if not isinstance(value, types) or (
+                    exclude_bool and type(value) is bool
+                ):
+                    errors.append(FieldError(prefix + name, f"must be {type_name}"))
+                    continue
+
+                if type(value) is list:
+                    if len(value) < min_items:
+                        errors.append(
+                            FieldError(
+                                prefix + name,
+                                f"must have at least {min_items} item(s)",
+                            )
+                        )
+
+                    if items is not None:
+                        for i, item in enumerate(value):
+                            errors.extend(items(item, f"{prefix}{name}[{i}]"))
+
+                if check is not None and not check(value):
+                    errors.append(FieldError(prefix + name, message))
+
+            return errors
+
+        return validate
@@ -1,9 +1,10 @@
 from pydoc import locate
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import click
 
 from doxa_competition.evaluation.server import make_server
+from doxa_competition.retries import RetryPolicy
 
 
 @click.command()
@@ -42,6 +43,60 @@ from doxa_competition.evaluation.server import make_server
 @click.option(
     "--umpire-port", type=int, default=80, help="The port on which Umpire is running."
 )
+@click.option(
+    "--umpire-channels",
+    type=int,
+    default=1,
+    help="The number of connections over which calls to Umpire are spread.",
+)
+@click.option(
+    "--umpire-timeout",
+    type=float,
+    default=None,
+    help="The time in seconds after which calls to Umpire are cancelled, if at all.",
+)
+@click.option(
+    "--umpire-keepalive",
+    type=float,
+    default=None,
+    help="The interval in seconds at which keepalive pings are sent to Umpire, if at all.",
+)
+@click.option(
+    "--umpire-retries",
+    type=int,
+    default=0,
+    help="The number of times idempotent calls to Umpire are retried upon failure.",
+)
+@click.option(
+    "--umpire-hedge-percentile",
+    type=float,
+    default=None,
+    help="The percentile of recent latencies (e.g. 0.95) after which idempotent calls to Umpire are hedged, if at all.",
+)
+@click.option(
+    "--max-evaluations",
+    type=int,
+    default=None,
+    help="The maximum number of evaluations run at once by each worker process, if limited at all.",
+)
+@click.option(
+    "--max-queued-evaluations",
+    type=int,
+    default=0,
+    help="The maximum number of evaluations waiting for a slot in each worker process.",
+)
+@click.option(
+    "--metrics-dir",
+    type=str,
+    default=None,
+    help="The directory in which worker processes share their metrics. Defaults to a temporary directory.",
+)
+@click.option(
+    "--metrics-interval",
+    type=float,
+    default=5.0,
+    help="The interval in seconds at which each worker process shares its metrics.",
+)
 def serve(
     competition: List[Tuple[str, str]],
     host: str,
@@ -51,6 +106,15 @@ def serve(
     pulsar_path: str,
     umpire_host: str,
     umpire_port: int,
+    umpire_channels: int,
+    umpire_timeout: Optional[float],
+    umpire_keepalive: Optional[float],
+    umpire_retries: int,
+    umpire_hedge_percentile: Optional[float],
+    max_evaluations: Optional[int],
+    max_queued_evaluations: int,
+    metrics_dir: Optional[str],
+    metrics_interval: float,
 ):
     """A CLI tool for spinning up DOXA competition driver worker instances."""
 
@@ -72,6 +136,19 @@ def serve(
         pulsar_path=pulsar_path,
         umpire_host=umpire_host,
         umpire_port=umpire_port,
+        umpire_channels=umpire_channels,
+        umpire_timeout=umpire_timeout,
+        umpire_keepalive=umpire_keepalive,
+        umpire_retry=RetryPolicy(
+            max_attempts=umpire_retries + 1,
+            hedge_percentile=umpire_hedge_percentile,
+        )
+        if umpire_retries > 0 or umpire_hedge_percentile is not None
+        else None,
+        max_evaluations=max_evaluations,
+        max_queued_evaluations=max_queued_evaluations,
+        metrics_dir=metrics_dir,
+        metrics_interval=metrics_interval,
     )
 
     app.run(host=host, port=port, workers=workers, access_log=False)
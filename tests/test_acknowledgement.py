@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+from doxa_competition.acknowledgement import (
+    ACK_AFTER_PROCESSING,
+    ACK_ON_RECEIVE,
+    AcknowledgementPolicy,
+    Acknowledger,
+)
+
+
+class FakeMessage:
+    def __init__(self, topic: str, message_id: bytes) -> None:
+        self._topic = topic
+        self._message_id = message_id
+
+    def topic_name(self) -> str:
+        return self._topic
+
+    def message_id(self):
+        return SimpleNamespace(serialize=lambda: self._message_id)
+
+
+class FakeConsumer:
+    def __init__(self) -> None:
+        self.acknowledged = []
+        self.cumulatively_acknowledged = []
+        self.negatively_acknowledged = []
+
+    def acknowledge(self, message) -> None:
+        self.acknowledged.append(message)
+
+    def acknowledge_cumulative(self, message) -> None:
+        self.cumulatively_acknowledged.append(message)
+
+    def negative_acknowledge(self, message) -> None:
+        self.negatively_acknowledged.append(message)
+
+
+def test_messages_are_not_tracked_when_acknowledged_on_receipt():
+    acknowledger = Acknowledger(FakeConsumer(), ACK_ON_RECEIVE)
+
+    assert acknowledger.track([FakeMessage("agent", b"1")]) is None
+
+
+def test_handled_messages_are_acknowledged_and_failed_ones_redelivered():
+    consumer = FakeConsumer()
+    acknowledger = Acknowledger(consumer, ACK_AFTER_PROCESSING)
+    handled = [FakeMessage("agent", b"1"), FakeMessage("agent", b"2")]
+    failed = FakeMessage("agent", b"3")
+
+    acknowledger.track(handled)(None)
+    acknowledger.track([failed])(ValueError("The event cannot be handled."))
+
+    assert consumer.acknowledged == handled
+    assert consumer.negatively_acknowledged == [failed]
+
+
+def test_windowed_acknowledgements_are_sent_on_flush():
+    async def run():
+        consumer = FakeConsumer()
+        acknowledger = Acknowledger(
+            consumer, AcknowledgementPolicy(after_processing=True, window=60)
+        )
+        messages = [FakeMessage("agent", b"1"), FakeMessage("evaluation", b"2")]
+
+        acknowledger.track(messages)(None)
+        assert consumer.acknowledged == []
+
+        await acknowledger.flush()
+        assert consumer.acknowledged == messages
+
+    asyncio.run(run())
+
+
+def test_cumulative_acknowledgements_never_cover_a_failed_message():
+    async def run():
+        consumer = FakeConsumer()
+        acknowledger = Acknowledger(
+            consumer,
+            AcknowledgementPolicy(after_processing=True, window=60, cumulative=True),
+        )
+        first, second, third = (
+            FakeMessage("agent", b"1"),
+            FakeMessage("agent", b"2"),
+            FakeMessage("agent", b"3"),
+        )
+
+        # acknowledging the third message cumulatively would also cover the first
+        acknowledger.track([first])(ValueError("The event cannot be handled."))
+        acknowledger.track([second, third])(None)
+        await acknowledger.flush()
+
+        assert consumer.cumulatively_acknowledged == []
+        assert consumer.acknowledged == [second, third]
+
+        # once the failed message has been handled, cumulative acknowledgements resume
+        acknowledger.track([first])(None)
+        fourth = FakeMessage("agent", b"4")
+        acknowledger.track([fourth])(None)
+        await acknowledger.flush()
+
+        assert consumer.cumulatively_acknowledged == [fourth]
+
+    asyncio.run(run())
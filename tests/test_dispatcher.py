@@ -0,0 +1,97 @@
+import asyncio
+
+from doxa_competition.event.dispatcher import EventDispatcher
+
+
+def test_events_sharing_a_key_are_handled_in_order():
+    async def run():
+        dispatcher = EventDispatcher(max_concurrency=8)
+        handled = []
+
+        async def handler(event) -> None:
+            # later events would overtake earlier ones if they ran concurrently
+            await asyncio.sleep(0.01 * (3 - event["n"]))
+            handled.append((event["key"], event["n"]))
+
+        for n in range(3):
+            for key in ("a", "b"):
+                await dispatcher.dispatch(
+                    "agent", handler, {"key": key, "n": n}, key=key
+                )
+
+        await dispatcher.join()
+
+        assert [n for key, n in handled if key == "a"] == [0, 1, 2]
+        assert [n for key, n in handled if key == "b"] == [0, 1, 2]
+
+    asyncio.run(run())
+
+
+def test_events_with_different_keys_run_in_parallel_within_the_limit():
+    async def run():
+        dispatcher = EventDispatcher(max_concurrency=2)
+        running = 0
+        most_running = 0
+
+        async def handler(event) -> None:
+            nonlocal running, most_running
+            running += 1
+            most_running = max(most_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        for n in range(6):
+            await dispatcher.dispatch("agent", handler, {}, key=n)
+
+        await dispatcher.join()
+
+        assert most_running == 2
+        assert dispatcher.in_flight() == 0
+
+    asyncio.run(run())
+
+
+def test_callbacks_receive_handler_errors_and_later_events_still_run():
+    async def run():
+        dispatcher = EventDispatcher()
+        outcomes = []
+
+        async def handler(event) -> None:
+            if event["fail"]:
+                raise ValueError("The event cannot be handled.")
+
+        for fail in (True, False):
+            await dispatcher.dispatch(
+                "agent",
+                handler,
+                {"fail": fail},
+                key="a",
+                callback=outcomes.append,
+            )
+
+        await dispatcher.join()
+
+        assert isinstance(outcomes[0], ValueError)
+        assert outcomes[1] is None
+
+    asyncio.run(run())
+
+
+def test_batches_wait_for_earlier_events():
+    async def run():
+        dispatcher = EventDispatcher(max_concurrency=4)
+        handled = []
+
+        async def handler(event) -> None:
+            await asyncio.sleep(0.02)
+            handled.append(event)
+
+        async def batch_handler(events) -> None:
+            handled.extend(events)
+
+        await dispatcher.dispatch("agent", handler, "first", key="a")
+        await dispatcher.dispatch_batch("agent", batch_handler, ["second", "third"])
+
+        assert handled == ["first", "second", "third"]
+
+    asyncio.run(run())
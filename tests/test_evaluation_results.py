@@ -0,0 +1,64 @@
+import asyncio
+
+from grpclib.const import Status
+from grpclib.exceptions import GRPCError
+
+from doxa_competition.evaluation_results import EvaluationResultCursor
+from doxa_competition.proto.umpire.evaluation import (
+    EvaluationResult,
+    GetCompetitionEvaluationResultsResponse,
+)
+from doxa_competition.retries import RetryPolicy
+from doxa_competition.umpire import UmpireClient
+
+
+class FlakyEvaluationStub:
+    """Serves pages of evaluation results, failing the first request for the second page."""
+
+    def __init__(self, result_ids) -> None:
+        self.result_ids = result_ids
+        self.failed = False
+
+    async def get_competition_evaluation_results(self, request, timeout=None):
+        if request.after_id > 0 and not self.failed:
+            self.failed = True
+            raise GRPCError(Status.UNAVAILABLE, "Umpire is unavailable.")
+
+        page = [
+            result_id for result_id in self.result_ids if result_id > request.after_id
+        ][: request.page_size]
+
+        return GetCompetitionEvaluationResultsResponse(
+            results=[
+                EvaluationResult(id=result_id, evaluation_id=result_id)
+                for result_id in page
+            ],
+            next_after_id=page[-1] if page else 0,
+        )
+
+
+class FakeUmpire(UmpireClient):
+    def __init__(self, stub, retry=None) -> None:
+        super().__init__([object()], owns_channels=False, retry=retry)
+        self._stub = stub
+
+    def stub(self, stub_type):
+        return self._stub
+
+
+def test_paged_reads_are_retried():
+    async def run():
+        stub = FlakyEvaluationStub([1, 2, 3, 4, 5])
+        cursor = EvaluationResultCursor(
+            "test",
+            FakeUmpire(stub, retry=RetryPolicy(initial_backoff=0)),
+            page_size=2,
+        )
+
+        result_ids = [result.id async for result in cursor]
+
+        assert stub.failed
+        assert result_ids == [1, 2, 3, 4, 5]
+        assert cursor.after_id == 5
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+import random
+
+from doxa_competition.leaderboard import Leaderboard
+from doxa_competition.proto.umpire.scoreboard import AgentResults
+
+
+def ranked(scores):
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_ranks_match_a_sorted_scoreboard_after_updates():
+    generator = random.Random(0)
+    leaderboard = Leaderboard("rating")
+    scores = {}
+
+    for _ in range(2000):
+        agent_id = generator.randrange(300)
+
+        if generator.random() < 0.1:
+            leaderboard.remove(agent_id)
+            scores.pop(agent_id, None)
+        else:
+            score = generator.randrange(100)
+            leaderboard.update(agent_id, score)
+            scores[agent_id] = score
+
+    expected = ranked(scores)
+
+    assert len(leaderboard) == len(scores)
+    assert leaderboard.top_k(len(scores) + 1) == expected
+    for rank, (agent_id, score) in enumerate(expected, 1):
+        assert leaderboard.rank_of(agent_id) == rank
+        assert leaderboard.score_of(agent_id) == score
+
+
+def test_queries_from_a_scoreboard():
+    scoreboard = [
+        AgentResults(agent_id=agent_id, results={"rating": 100 - agent_id})
+        for agent_id in range(10)
+    ] + [AgentResults(agent_id=99, results={"wins": 1})]
+
+    leaderboard = Leaderboard.from_scoreboard(scoreboard, "rating")
+
+    assert 99 not in leaderboard
+    assert leaderboard.rank_of(99) is None
+    assert leaderboard.top_k(2) == [(0, 100), (1, 99)]
+    assert leaderboard.neighbours(5, 1) == [(4, 96), (6, 94)]
+    assert leaderboard.neighbours(0, 2) == [(1, 99), (2, 98)]
+    assert leaderboard.range(93, 95) == [(5, 95), (6, 94), (7, 93)]
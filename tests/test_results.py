@@ -0,0 +1,233 @@
+import asyncio
+from types import SimpleNamespace
+
+from doxa_competition.acknowledgement import ACK_AFTER_PROCESSING, Acknowledger
+from doxa_competition.competition import flush_results_after
+from doxa_competition.context import CompetitionContext
+from doxa_competition.event.dispatcher import EventDispatcher
+from doxa_competition.results import (
+    AgentResultUpdate,
+    ResultBuffer,
+    ResultBufferPolicy,
+)
+from doxa_competition.umpire import UmpireClient
+
+
+class FakeMessage:
+    def __init__(self, message_id: bytes) -> None:
+        self._message_id = message_id
+
+    def topic_name(self) -> str:
+        return "persistent://public/default/competition-test-agent"
+
+    def message_id(self):
+        return SimpleNamespace(serialize=lambda: self._message_id)
+
+
+class FakeConsumer:
+    def __init__(self) -> None:
+        self.acknowledged = []
+        self.negatively_acknowledged = []
+
+    def acknowledge(self, message) -> None:
+        self.acknowledged.append(message)
+
+    def negative_acknowledge(self, message) -> None:
+        self.negatively_acknowledged.append(message)
+
+
+class FlakyUmpire:
+    """Applies agent result writes, failing the first `failures` batches of additions."""
+
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.results = {}
+
+    async def set_results(self, updates) -> None:
+        for update in updates:
+            self.results[(update.agent_id, update.metric)] = update.result
+
+    async def add_to_results(self, updates) -> None:
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("Umpire is unavailable.")
+
+        for update in updates:
+            key = (update.agent_id, update.metric)
+            self.results[key] = self.results.get(key, 0) + update.result
+
+
+class RecordingUmpire(UmpireClient):
+    """Records the agent results written by each call to Umpire."""
+
+    def __init__(self) -> None:
+        super().__init__([object()], owns_channels=False)
+        self.results = {}
+
+    async def call(self, stub_type, method, request, idempotent=None):
+        requests = request.results if hasattr(request, "results") else [request]
+
+        for update in requests:
+            key = (update.agent_id, update.metric)
+            if method.startswith("set_"):
+                self.results[key] = update.result
+            else:
+                self.results[key] = self.results.get(key, 0) + update.result
+
+
+def make_handler(buffer: ResultBuffer):
+    async def handler(event) -> None:
+        await buffer.add(event["agent_id"], "wins", 1)
+
+    return flush_results_after(
+        SimpleNamespace(try_flush_results=buffer.try_flush), handler
+    )
+
+
+def test_failed_additions_flush_is_acknowledged_and_retried_once():
+    async def run():
+        umpire = FlakyUmpire(failures=1)
+        buffer = ResultBuffer(
+            umpire.set_results,
+            umpire.add_to_results,
+            policy=ResultBufferPolicy(flush_interval=0),
+        )
+        handler = make_handler(buffer)
+
+        consumer = FakeConsumer()
+        acknowledger = Acknowledger(consumer, ACK_AFTER_PROCESSING)
+        dispatcher = EventDispatcher()
+
+        message = FakeMessage(b"1")
+        await dispatcher.dispatch(
+            "agent", handler, {"agent_id": 7}, callback=acknowledger.track([message])
+        )
+        await dispatcher.join()
+
+        # the message is not redelivered, since its writes are still buffered
+        assert consumer.acknowledged == [message]
+        assert consumer.negatively_acknowledged == []
+        assert umpire.results == {}
+        assert len(buffer) == 1
+
+        # the buffered addition is written along with the next event's
+        await dispatcher.dispatch(
+            "agent",
+            handler,
+            {"agent_id": 7},
+            callback=acknowledger.track([FakeMessage(b"2")]),
+        )
+        await dispatcher.join()
+
+        assert umpire.results == {(7, "wins"): 2}
+        assert len(buffer) == 0
+
+    asyncio.run(run())
+
+
+def test_failed_flush_is_retried_after_the_flush_interval():
+    async def run():
+        umpire = FlakyUmpire(failures=1)
+        buffer = ResultBuffer(
+            umpire.set_results,
+            umpire.add_to_results,
+            policy=ResultBufferPolicy(flush_interval=0.01),
+        )
+
+        await make_handler(buffer)({"agent_id": 7})
+        assert umpire.results == {}
+
+        await asyncio.sleep(0.05)
+        assert umpire.results == {(7, "wins"): 1}
+        assert len(buffer) == 0
+
+    asyncio.run(run())
+
+
+def test_batch_writes_are_ordered_after_buffered_writes():
+    async def run():
+        umpire = RecordingUmpire()
+        context = CompetitionContext(
+            "test",
+            None,
+            umpire,
+            result_buffering=ResultBufferPolicy(flush_interval=0),
+        )
+
+        await context.set_agent_result(7, "rating", 1000)
+        await context.set_agent_results([AgentResultUpdate(7, "rating", 1200)])
+        await context.add_to_agent_result(7, "wins", 1)
+        await context.add_to_agent_results([AgentResultUpdate(7, "wins", 2)])
+
+        # nothing is written until the buffer is flushed, when the newest set wins
+        assert umpire.results == {}
+
+        await context.flush_results()
+        assert umpire.results == {(7, "rating"): 1200, (7, "wins"): 3}
+
+    asyncio.run(run())
+
+
+def test_failed_flush_restores_writes_behind_newer_ones():
+    async def run():
+        umpire = FlakyUmpire(failures=1)
+        buffer = ResultBuffer(
+            umpire.set_results,
+            umpire.add_to_results,
+            policy=ResultBufferPolicy(flush_interval=0),
+        )
+
+        await buffer.set(7, "rating", 1000)
+        await buffer.add(7, "wins", 1)
+
+        # the sets are written before the additions fail, so only the additions remain
+        assert not await buffer.try_flush()
+        assert umpire.results == {(7, "rating"): 1000}
+        assert len(buffer) == 1
+
+        await buffer.add(7, "wins", 2)
+        await buffer.set(8, "rating", 1200)
+        await buffer.flush()
+
+        assert umpire.results == {
+            (7, "rating"): 1000,
+            (7, "wins"): 3,
+            (8, "rating"): 1200,
+        }
+        assert len(buffer) == 0
+
+    asyncio.run(run())
+
+
+def test_failed_flush_keeps_newer_sets():
+    async def run():
+        umpire = FlakyUmpire(failures=0)
+        failures = 1
+
+        async def set_results(updates) -> None:
+            nonlocal failures
+            if failures > 0:
+                failures -= 1
+                raise ConnectionError("Umpire is unavailable.")
+
+            await umpire.set_results(updates)
+
+        buffer = ResultBuffer(
+            set_results,
+            umpire.add_to_results,
+            policy=ResultBufferPolicy(flush_interval=0),
+        )
+
+        await buffer.set(7, "rating", 1000)
+        await buffer.add(7, "wins", 1)
+
+        assert not await buffer.try_flush()
+        assert umpire.results == {}
+        assert len(buffer) == 2
+
+        await buffer.set(7, "rating", 1100)
+        await buffer.flush()
+
+        assert umpire.results == {(7, "rating"): 1100, (7, "wins"): 1}
+
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from grpclib.const import Status
+from grpclib.exceptions import GRPCError
+
+from doxa_competition.retries import Retrier, RetryPolicy
+
+
+def make_attempt(outcomes):
+    """Makes an attempt that raises or returns each outcome in turn."""
+
+    calls = []
+
+    async def attempt(timeout):
+        calls.append(timeout)
+        outcome = outcomes[min(len(calls), len(outcomes)) - 1]
+
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        return outcome
+
+    return attempt, calls
+
+
+def test_idempotent_calls_are_retried_on_transient_errors():
+    async def run():
+        retrier = Retrier(RetryPolicy(initial_backoff=0))
+        attempt, calls = make_attempt([GRPCError(Status.UNAVAILABLE), "ok"])
+
+        assert await retrier.call("get", attempt, idempotent=True) == "ok"
+        assert len(calls) == 2
+        assert retrier.counters.retries == 1
+
+    asyncio.run(run())
+
+
+def test_non_idempotent_calls_and_permanent_errors_are_not_retried():
+    async def run():
+        retrier = Retrier(RetryPolicy(initial_backoff=0))
+
+        attempt, calls = make_attempt([GRPCError(Status.UNAVAILABLE), "ok"])
+        with pytest.raises(GRPCError):
+            await retrier.call("add", attempt, idempotent=False)
+        assert len(calls) == 1
+
+        attempt, calls = make_attempt([GRPCError(Status.INVALID_ARGUMENT), "ok"])
+        with pytest.raises(GRPCError):
+            await retrier.call("get", attempt, idempotent=True)
+        assert len(calls) == 1
+
+        assert retrier.counters.failures == 2
+
+    asyncio.run(run())
+
+
+def test_retries_stop_once_the_budget_is_spent():
+    async def run():
+        retrier = Retrier(
+            RetryPolicy(initial_backoff=0, max_attempts=10, budget_tokens=4)
+        )
+        attempt, calls = make_attempt([GRPCError(Status.UNAVAILABLE)])
+
+        with pytest.raises(GRPCError):
+            await retrier.call("get", attempt, idempotent=True)
+
+        # retries are only made while more than half of the tokens remain,
+        # so the second failure (leaving 2 of 4 tokens) is not retried
+        assert len(calls) == 2
+        assert retrier.counters.budget_exhausted == 1
+
+    asyncio.run(run())
+
+
+def test_slow_calls_are_hedged():
+    async def run():
+        retrier = Retrier(RetryPolicy(hedge_percentile=0.5, hedge_min_samples=3))
+        delays = [0.001, 0.001, 0.001, 1.0, 0.001]
+
+        async def attempt(timeout):
+            await asyncio.sleep(delays.pop(0))
+            return "ok"
+
+        for _ in range(4):
+            assert await retrier.call("get", attempt, idempotent=True) == "ok"
+
+        assert retrier.counters.hedges == 1
+        assert retrier.counters.hedges_won == 1
+
+    asyncio.run(run())
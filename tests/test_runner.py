@@ -0,0 +1,76 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from doxa_competition.acknowledgement import ACK_AFTER_PROCESSING, Acknowledger
+from doxa_competition.event.dispatcher import EventDispatcher
+from doxa_competition.runner import CompetitionRunner
+
+
+class FakeMessage:
+    def __init__(self, topic: str, message_id: bytes, data: bytes) -> None:
+        self._topic = topic
+        self._message_id = message_id
+        self._data = data
+
+    def topic_name(self) -> str:
+        return f"persistent://public/default/{self._topic}"
+
+    def message_id(self):
+        return SimpleNamespace(serialize=lambda: self._message_id)
+
+    def data(self) -> bytes:
+        return self._data
+
+    def properties(self) -> dict:
+        return {}
+
+    def publish_timestamp(self) -> int:
+        return 0
+
+
+class FakeConsumer:
+    def __init__(self) -> None:
+        self.acknowledged = []
+        self.negatively_acknowledged = []
+
+    def acknowledge(self, message) -> None:
+        self.acknowledged.append(message)
+
+    def negative_acknowledge(self, message) -> None:
+        self.negatively_acknowledged.append(message)
+
+
+def test_unhandleable_messages_are_acknowledged_without_stopping_the_batch():
+    async def run():
+        runner = CompetitionRunner(
+            pulsar_path="pulsar://localhost:6650", ack_policy=ACK_AFTER_PROCESSING
+        )
+
+        handled = []
+
+        async def handler(event) -> None:
+            handled.append(event.body["n"])
+
+        runner._router.add_route("agents", handler)
+
+        consumer = FakeConsumer()
+        acknowledger = Acknowledger(consumer, ACK_AFTER_PROCESSING)
+        dispatcher = EventDispatcher()
+
+        poison = FakeMessage("agents", b"1", b"{not json")
+        unrouted = FakeMessage("unknown", b"2", json.dumps({"n": 0}).encode())
+        valid = FakeMessage("agents", b"3", json.dumps({"n": 1}).encode())
+
+        try:
+            await runner._route(dispatcher, acknowledger, [poison, unrouted, valid])
+            await dispatcher.join()
+        finally:
+            runner._pulsar_client.close()
+            runner._umpire.close()
+
+        assert handled == [1]
+        assert consumer.acknowledged == [poison, unrouted, valid]
+        assert consumer.negatively_acknowledged == []
+
+    asyncio.run(run())
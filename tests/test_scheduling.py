@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from doxa_competition.proto.umpire.scheduling import (
+    EvaluationSubmission,
+    ScheduleEvaluationBatchResponse,
+)
+from doxa_competition.scheduling import (
+    LANE_ACTIVATION,
+    LANE_BACKGROUND,
+    PriorityPolicy,
+    PriorityScheduler,
+)
+
+
+def make_submissions(count: int, agent_id: int = 1):
+    return [EvaluationSubmission([agent_id], "{}") for _ in range(count)]
+
+
+class RecordingSubmitter:
+    def __init__(self) -> None:
+        self.batches = []
+
+    async def __call__(self, batch):
+        self.batches.append(batch)
+        return ScheduleEvaluationBatchResponse(batch_id=len(self.batches))
+
+
+def test_rate_limited_batches_fill_up_after_the_burst():
+    async def run():
+        submit = RecordingSubmitter()
+        scheduler = PriorityScheduler(
+            submit, PriorityPolicy(rate=200, burst=5, window=0.05)
+        )
+
+        scheduled = await scheduler.schedule(make_submissions(40))
+
+        sizes = [len(batch) for batch in submit.batches]
+        assert sum(sizes) == 40
+        assert sizes[0] == 5
+        # tokens build up for the window (10 at 200 per second) between batches
+        assert all(size >= 5 for size in sizes[1:-1])
+        assert scheduled.batch_ids == list(range(1, len(sizes) + 1))
+
+    asyncio.run(run())
+
+
+def test_activations_overtake_a_rate_limited_sweep():
+    async def run():
+        submit = RecordingSubmitter()
+        scheduler = PriorityScheduler(
+            submit, PriorityPolicy(rate=500, burst=10, window=0.05)
+        )
+
+        sweep = asyncio.ensure_future(
+            scheduler.schedule(make_submissions(1000), LANE_BACKGROUND)
+        )
+        await asyncio.sleep(0.1)
+
+        start = time.monotonic()
+        await scheduler.schedule(make_submissions(1, agent_id=2), LANE_ACTIVATION)
+
+        assert time.monotonic() - start < 0.2
+        assert scheduler.pending(LANE_BACKGROUND) > 0
+
+        sweep.cancel()
+
+    asyncio.run(run())
+
+
+def test_unknown_lanes_fall_back_to_the_default_lane():
+    async def run():
+        submit = RecordingSubmitter()
+        scheduler = PriorityScheduler(submit)
+
+        scheduled = await scheduler.schedule(make_submissions(2), "unknown")
+
+        assert scheduled.batch_ids == [1]
+        assert len(submit.batches[0]) == 2
+
+    asyncio.run(run())